@@ -0,0 +1 @@
+"""Benchmarks y comparación de resultados del motor de cálculo de bonos"""
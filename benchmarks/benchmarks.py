@@ -0,0 +1,152 @@
+"""Benchmarks con la convención de asv (time_* mide tiempo, track_* registra un valor)"""
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from bonos.batch import PaddedFlows, price_from_yield_universe, price_universe
+from bonos.risk import price_from_yield
+from bonos.schedule import BondSchedule
+from bonos.session import SolverSession
+from bonos.store import FlowStore, load_store, parse_flows, read_raw_workbook
+from bonos.timeseries import universe_series
+
+from benchmarks import reference
+from benchmarks.run import LIQUIDACION, check_golden
+from benchmarks.universe import generate_quotes, generate_universe, write_workbook
+
+
+@lru_cache(maxsize=None)
+def universe(n_bonds):
+    """Universo sintético y sus cotizaciones, generados una vez por tamaño"""
+    flows_df = generate_universe(n_bonds)
+    return flows_df, generate_quotes(flows_df, LIQUIDACION)
+
+
+class BatchSuite:
+    """Valuación en lote de todo el universo"""
+    params = [10, 1000, 100000]
+    param_names = ['bonos']
+    timeout = 600
+
+    def setup(self, n_bonds):
+        self.flows_df, self.quotes = universe(n_bonds)
+        self.padded = PaddedFlows(self.flows_df)
+        self.yields = self.quotes.assign(tir=price_universe(self.padded, self.quotes)['tir'].to_numpy())
+
+    def time_padded_flows(self, n_bonds):
+        PaddedFlows(self.flows_df)
+
+    def time_price_universe(self, n_bonds):
+        price_universe(self.padded, self.quotes)
+
+    def time_price_from_yield_universe(self, n_bonds):
+        price_from_yield_universe(self.padded, self.yields)
+
+
+class SingleBondSuite:
+    """Camino de la app: un bono por cálculo (actual y original)"""
+    params = ['mensual', 'trimestral', 'semestral']
+    param_names = ['periodicidad']
+    frecuencias = {'mensual': 12, 'trimestral': 4, 'semestral': 2}
+
+    def setup(self, periodicidad):
+        flows_df, quotes = universe(1000)
+        frequency = flows_df.groupby('nombre_bono', sort=False)['periodicidad'].first()
+        quotes = quotes[quotes['nombre_bono'].map(frequency) == self.frecuencias[periodicidad]]
+        self.bono, self.price = quotes.iloc[0][['nombre_bono', 'precio']]
+        self.bono_flows = flows_df[flows_df['nombre_bono'] == self.bono]
+        self.base = self.bono_flows['base_calculo'].iloc[0]
+        self.frequency = self.frecuencias[periodicidad]
+        self.settlement = pd.Timestamp(LIQUIDACION).date()
+        self.session = SolverSession.from_frame(self.bono_flows).set_settlement(self.settlement)
+        self.ytm = self.session.solve(self.price)
+        self.schedule = BondSchedule.from_frame(self.bono_flows)
+        self.cash_flows = reference.process_irregular_flows(self.bono_flows, self.settlement, self.price)
+
+    def time_ytm_cold(self, periodicidad):
+        SolverSession.from_frame(self.bono_flows).solve(self.price, self.settlement)
+
+    def time_ytm_warm(self, periodicidad):
+        self.session.solve(self.price + 0.05)
+
+    def time_duration(self, periodicidad):
+        price_from_yield(self.session.times[1:], self.session.amounts[1:], self.ytm)
+
+    def time_accrued_interest(self, periodicidad):
+        self.schedule.accrued_interest(self.settlement, self.base, frequency=self.frequency)
+
+    def time_reference_ytm(self, periodicidad):
+        cash_flows = reference.process_irregular_flows(self.bono_flows, self.settlement, self.price)
+        reference.calculate_ytm_irregular(cash_flows)
+
+    def time_reference_duration(self, periodicidad):
+        reference.calculate_duration_irregular(self.cash_flows, self.ytm, self.price)
+
+    def time_reference_accrued_interest(self, periodicidad):
+        reference.calculate_accrued_interest(self.bono_flows, self.settlement, self.base, self.frequency)
+
+
+class SeriesSuite:
+    """Series diarias de TIR y duraciones sobre un rango de días hábiles"""
+    params = [100, 1000]
+    param_names = ['bonos']
+    timeout = 600
+
+    def setup(self, n_bonds):
+        flows_df, quotes = universe(n_bonds)
+        self.store = FlowStore.from_frame(flows_df, [])
+        self.prices = dict(zip(quotes['nombre_bono'], quotes['precio']))
+
+    def time_universe_series_year(self, n_bonds):
+        universe_series(self.store, self.prices, LIQUIDACION, '2026-09-16')
+
+
+class LoaderSuite:
+    """Carga de la planilla: parseo, snapshot compilado y parseo original"""
+    params = [10, 1000]
+    param_names = ['bonos']
+    timeout = 600
+
+    def setup(self, n_bonds):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'universo.xlsx')
+        write_workbook(universe(n_bonds)[0], self.path)
+        load_store(self.path)
+
+    def teardown(self, n_bonds):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def time_parse_workbook(self, n_bonds):
+        parse_flows(read_raw_workbook(self.path))
+
+    def time_load_snapshot(self, n_bonds):
+        load_store(self.path)
+
+    def time_reference_load(self, n_bonds):
+        reference.load_flows(self.path)
+
+
+class AccuracySuite:
+    """Diferencias contra la implementación original y el set dorado de XIRR"""
+
+    def setup(self):
+        self.flows_df, quotes = universe(1000)
+        self.quotes = quotes.head(100)
+        self.batch = price_universe(self.flows_df, self.quotes)
+
+    def track_golden_xirr_error(self):
+        return check_golden()['actual']
+
+    def track_ytm_error_vs_reference(self):
+        settlement = pd.Timestamp(LIQUIDACION).date()
+        grouped = dict(tuple(self.flows_df.groupby('nombre_bono', sort=False)))
+        errors = []
+        for bono, price, ytm in zip(self.batch['nombre_bono'], self.batch['precio'], self.batch['tir']):
+            cash_flows = reference.process_irregular_flows(grouped[bono], settlement, price)
+            errors.append(abs(ytm - reference.calculate_ytm_irregular(cash_flows)))
+        return float(np.max(errors))
+
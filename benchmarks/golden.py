@@ -0,0 +1,64 @@
+"""Casos de TIR con resultado conocido (TIR.NO.PER / XIRR de Excel y soluciones cerradas)"""
+import datetime
+
+# (descripción, fechas, flujos, TIR esperada, base de conteo de días)
+XIRR_GOLDEN = [
+    (
+        "Ejemplo de la documentación de XIRR de Excel",
+        [datetime.date(2008, 1, 1), datetime.date(2008, 3, 1), datetime.date(2008, 10, 30),
+         datetime.date(2009, 2, 15), datetime.date(2009, 4, 1)],
+        [-10000, 2750, 4250, 3250, 2750],
+        # Excel muestra 0.373362535; raíz exacta calculada con precisión decimal
+        0.3733625335188315,
+        'ACT/365',
+    ),
+    # Casos con solución cerrada: XIRR descuenta con (días / 365)
+    (
+        "Cupón cero a 365 días",
+        [datetime.date(2025, 1, 1), datetime.date(2026, 1, 1)],
+        [-100, 110],
+        0.10,
+        'ACT/365',
+    ),
+    (
+        "Cupón cero a 730 días",
+        [datetime.date(2021, 1, 1), datetime.date(2023, 1, 1)],
+        [-100, 121],
+        0.10,
+        'ACT/365',
+    ),
+    (
+        "Bono a la par con cupón anual cada 365 días",
+        [datetime.date(2021, 1, 1), datetime.date(2022, 1, 1), datetime.date(2023, 1, 1),
+         datetime.date(2024, 1, 1)],
+        [-100, 8, 8, 108],
+        0.08,
+        'ACT/365',
+    ),
+    (
+        "Rendimiento negativo",
+        [datetime.date(2025, 1, 1), datetime.date(2026, 1, 1)],
+        [-100, 95],
+        -0.05,
+        'ACT/365',
+    ),
+    (
+        "Bono en default con rendimiento alto",
+        [datetime.date(2025, 1, 1), datetime.date(2026, 1, 1), datetime.date(2027, 1, 1)],
+        [-25, 5, 90],
+        1.0,
+        'ACT/365',
+    ),
+    # YPF 2028 liquidado a 39 días del vencimiento: (101.64 / 117.95) ** (360 / 39) - 1.
+    # La derivada es grande y el corte por paso de la versión original deja ~1.5e-10 de error
+    (
+        "Rendimiento muy negativo cerca del vencimiento (ACT/360)",
+        [datetime.date(2028, 9, 1), datetime.date(2028, 10, 10)],
+        [-117.95, 101.64],
+        -0.746845864680076,
+        'ACT/360',
+    ),
+]
+
+# Tolerancia: todas las TIR esperadas son exactas a precisión doble
+TOLERANCIA_GOLDEN = 1e-12
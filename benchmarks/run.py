@@ -0,0 +1,250 @@
+"""Mide cada etapa del cálculo sobre universos sintéticos y compara contra la implementación original
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.run --bonos 10 1000 100000
+    python -m benchmarks.run --salida actual.json --base anterior.json --umbral 1.25
+
+Termina con código 1 si algún resultado se aparta de la referencia o del set dorado, o si
+alguna etapa es más lenta que la corrida base por encima del umbral.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bonos.batch import PaddedFlows, price_from_yield_universe, price_universe
+from bonos.daycount import year_fraction
+from bonos.risk import price_from_yield
+from bonos.schedule import BondSchedule
+from bonos.session import SolverSession
+from bonos.solver import solve_ytm
+from bonos.store import load_store, parse_flows, read_raw_workbook, snapshot_dir
+
+from benchmarks import reference
+from benchmarks.golden import TOLERANCIA_GOLDEN, XIRR_GOLDEN
+from benchmarks.universe import generate_quotes, generate_universe, write_workbook
+
+LIQUIDACION = '2025-09-16'
+
+# Tolerancias contra la implementación original
+TOLERANCIAS = {
+    'tir': 1e-7,
+    'duracion_macaulay': 1e-6,
+    'intereses_corridos': 1e-9,
+}
+
+# Etapas por debajo de este tiempo no se comparan contra la corrida base (ruido)
+TIEMPO_MINIMO = 1e-3
+
+
+def timed(function, *args, repeat=1, **kwargs):
+    """Ejecuta la función y devuelve (mejor tiempo en segundos, resultado de la última corrida)"""
+    best = np.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def check_golden():
+    """Error máximo de la TIR actual y de la original sobre el set dorado de XIRR"""
+    errors = {'actual': 0.0, 'referencia': 0.0}
+    for _, fechas, flujos, esperado, base in XIRR_GOLDEN:
+        dates = np.array(fechas, dtype='datetime64[D]')
+        times = year_fraction(dates[0], dates, base)
+        errors['actual'] = max(errors['actual'], abs(solve_ytm(times, flujos) - esperado))
+
+        cash_flows = [{'Fecha': f, 'Flujo_Total': a, 'Días': (f - fechas[0]).days}
+                      for f, a in zip(fechas, flujos)]
+        errors['referencia'] = max(errors['referencia'],
+                                   abs(reference.calculate_ytm_irregular(cash_flows, base) - esperado))
+    return errors
+
+def single_bond_stages(flows_df, quotes, sample):
+    """Camino de la app bono por bono (actual y original) sobre una muestra de cotizaciones"""
+    settlement = pd.Timestamp(LIQUIDACION).date()
+    grouped = dict(tuple(flows_df.groupby('nombre_bono', sort=False)))
+    sample = quotes.head(sample)
+    timings = dict.fromkeys(['bono_tir', 'bono_duracion', 'bono_corridos',
+                             'referencia_tir', 'referencia_duracion', 'referencia_corridos'], 0.0)
+    rows = []
+
+    for bono, price in zip(sample['nombre_bono'], sample['precio']):
+        bono_flows = grouped[bono]
+        base = bono_flows['base_calculo'].iloc[0]
+        periodicidad = bono_flows['periodicidad'].iloc[0]
+
+        elapsed, session = timed(lambda: SolverSession.from_frame(bono_flows).set_settlement(settlement))
+        elapsed_solve, ytm = timed(session.solve, price)
+        timings['bono_tir'] += elapsed + elapsed_solve
+        elapsed, risk = timed(price_from_yield, session.times[1:], session.amounts[1:], ytm)
+        timings['bono_duracion'] += elapsed
+        elapsed, accrued = timed(lambda: BondSchedule.from_frame(bono_flows).accrued_interest(
+            settlement, base, frequency=periodicidad))
+        timings['bono_corridos'] += elapsed
+
+        start = time.perf_counter()
+        cash_flows = reference.process_irregular_flows(bono_flows, settlement, price, 'ACT/365')
+        legacy_ytm = reference.calculate_ytm_irregular(cash_flows, 'ACT/365')
+        timings['referencia_tir'] += time.perf_counter() - start
+        elapsed, (legacy_macaulay, _) = timed(reference.calculate_duration_irregular, cash_flows, legacy_ytm, price)
+        timings['referencia_duracion'] += elapsed
+        elapsed, legacy_accrued = timed(reference.calculate_accrued_interest, bono_flows, settlement, base, periodicidad)
+        timings['referencia_corridos'] += elapsed
+
+        rows.append((bono, base, ytm, legacy_ytm, float(risk.macaulay), legacy_macaulay, accrued, legacy_accrued))
+
+    comparison = pd.DataFrame(rows, columns=['nombre_bono', 'base_calculo', 'tir', 'tir_ref',
+                                             'duracion_macaulay', 'duracion_macaulay_ref',
+                                             'intereses_corridos', 'intereses_corridos_ref'])
+    return timings, comparison
+
+def max_errors(batch, comparison):
+    """Error máximo de la valuación en lote y del camino por bono contra la referencia"""
+    merged = comparison.merge(batch, on='nombre_bono', suffixes=('_bono', ''))
+    errors = {}
+    for column in TOLERANCIAS:
+        reference_values = merged[f'{column}_ref']
+        selected = np.ones(len(merged), dtype=bool)
+        if column == 'intereses_corridos':
+            # La referencia cuenta días reales también en 30/360: solo se comparan las bases ACT
+            selected = (merged['base_calculo'] != '30/360').to_numpy()
+        for key in (column, f'{column}_bono'):
+            difference = np.abs(merged[key].to_numpy() - reference_values.to_numpy())[selected]
+            errors[key] = float(np.max(difference, initial=0.0))
+    return errors
+
+def loader_stages(flows_df, directory):
+    """Tiempos de carga de la planilla: parseo actual, snapshot y parseo original"""
+    path = os.path.join(directory, 'universo.xlsx')
+    write_workbook(flows_df, path)
+    shutil.rmtree(snapshot_dir(path), ignore_errors=True)
+
+    timings = {}
+    timings['carga_planilla'], _ = timed(lambda: parse_flows(read_raw_workbook(path)))
+    timings['carga_snapshot_inicial'], store = timed(load_store, path)
+    timings['carga_snapshot'], _ = timed(load_store, path, repeat=3)
+    timings['carga_referencia'], legacy = timed(reference.load_flows, path)
+
+    parsed = store.to_frame()
+    equal = (len(parsed) == len(legacy)
+             and np.allclose(parsed['flujo_total'].to_numpy(), legacy['flujo_total'].to_numpy())
+             and (parsed['nombre_bono'].to_numpy() == legacy['nombre_bono'].to_numpy()).all())
+    return timings, equal
+
+def run_size(n_bonds, sample, loader_limit, seed=0):
+    """Corre todas las etapas para un universo de n_bonds bonos"""
+    result = {'bonos': n_bonds, 'tiempos': {}, 'errores': {}}
+    timings = result['tiempos']
+
+    timings['generar_universo'], flows_df = timed(generate_universe, n_bonds, seed)
+    quotes = generate_quotes(flows_df, LIQUIDACION, seed)
+    result['flujos'] = len(flows_df)
+    result['cotizaciones'] = len(quotes)
+
+    timings['flujos_padded'], padded = timed(PaddedFlows, flows_df)
+    timings['lote_tir'], batch = timed(price_universe, padded, quotes)
+    yields = quotes.assign(tir=batch['tir'].to_numpy())
+    timings['lote_precio'], repriced = timed(price_from_yield_universe, padded, yields)
+    result['errores']['lote_precio_vs_precio'] = float(np.nanmax(np.abs(repriced['precio'] - quotes['precio'])))
+
+    single, comparison = single_bond_stages(flows_df, quotes, sample)
+    timings.update(single)
+    result['muestra'] = len(comparison)
+    result['errores'].update(max_errors(batch, comparison))
+
+    if n_bonds <= loader_limit:
+        with tempfile.TemporaryDirectory() as directory:
+            loader, equal = loader_stages(flows_df, directory)
+        timings.update(loader)
+        result['carga_igual_referencia'] = bool(equal)
+
+    return result
+
+def failures(results, golden, baseline=None, threshold=1.25):
+    """Lista de problemas: diferencias contra la referencia, set dorado y regresiones de tiempo"""
+    problems = []
+    if golden['actual'] > TOLERANCIA_GOLDEN:
+        problems.append(f"set dorado XIRR: error {golden['actual']:.2e}")
+
+    previous = {r['bonos']: r for r in (baseline or {}).get('resultados', [])}
+    for result in results:
+        n = result['bonos']
+        for column, tolerance in TOLERANCIAS.items():
+            for key in (column, f'{column}_bono'):
+                if result['errores'].get(key, 0.0) > tolerance:
+                    problems.append(f"{n} bonos: {key} difiere de la referencia ({result['errores'][key]:.2e})")
+        if result['errores']['lote_precio_vs_precio'] > 1e-6:
+            problems.append(f"{n} bonos: precio desde TIR no reproduce el precio")
+        if result.get('carga_igual_referencia') is False:
+            problems.append(f"{n} bonos: la carga de la planilla difiere de la original")
+
+        for stage, elapsed in result['tiempos'].items():
+            before = previous.get(n, {}).get('tiempos', {}).get(stage)
+            if before and before >= TIEMPO_MINIMO and elapsed > before * threshold:
+                problems.append(f"{n} bonos: {stage} tardó {elapsed:.4f}s contra {before:.4f}s de la base")
+    return problems
+
+def print_report(results, golden):
+    print(f"Set dorado XIRR: error actual {golden['actual']:.2e}, original {golden['referencia']:.2e}")
+    for result in results:
+        print()
+        print(f"{result['bonos']} bonos, {result['flujos']} flujos, {result['cotizaciones']} cotizaciones "
+              f"(muestra por bono: {result['muestra']})")
+        for stage, elapsed in result['tiempos'].items():
+            print(f"  {stage:<24} {elapsed:10.4f} s")
+        for key, error in result['errores'].items():
+            print(f"  error {key:<28} {error:.2e}")
+        if 'carga_igual_referencia' in result:
+            print(f"  carga igual a la original: {'sí' if result['carga_igual_referencia'] else 'NO'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bonos', type=int, nargs='+', default=[10, 1000, 100000],
+                        help="tamaños de universo a medir")
+    parser.add_argument('--muestra', type=int, default=200,
+                        help="cotizaciones valuadas bono por bono y con la implementación original")
+    parser.add_argument('--limite-planilla', type=int, default=1000,
+                        help="tamaño máximo de universo para el que se escribe y carga la planilla")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="guardar los resultados en este JSON")
+    parser.add_argument('--base', help="JSON de una corrida anterior para detectar regresiones de tiempo")
+    parser.add_argument('--umbral', type=float, default=1.25,
+                        help="factor de tiempo tolerado contra la corrida base")
+    args = parser.parse_args(argv)
+
+    golden = check_golden()
+    results = [run_size(n, args.muestra, args.limite_planilla, args.semilla) for n in args.bonos]
+    print_report(results, golden)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'liquidacion': LIQUIDACION, 'set_dorado': golden, 'resultados': results},
+                      f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    problems = failures(results, golden, baseline, args.umbral)
+    print()
+    if problems:
+        print("PROBLEMAS:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("Sin diferencias ni regresiones")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
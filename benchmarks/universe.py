@@ -0,0 +1,101 @@
+"""Universos sintéticos de bonos para los benchmarks"""
+import numpy as np
+import pandas as pd
+
+# Periodicidades generadas: mensual, trimestral y semestral
+PERIODICIDADES = np.array([12, 4, 2])
+BASES = np.array(['ACT/365', 'ACT/360', '30/360'], dtype=object)
+TIPOS = np.array(['Soberano USD', 'Corporativo Ley ARG', 'Corporativo Ley NY'], dtype=object)
+
+
+def generate_universe(n_bonds, seed=0, issue_start='2018-01-01', issue_end='2025-06-30',
+                      min_years=2, max_years=10):
+    """Genera un DataFrame de flujos con el mismo esquema que la planilla
+
+    Cada bono tiene periodicidad mensual, trimestral o semestral, tasa fija entre 1% y 15% y
+    amortización bullet o lineal en las últimas cuotas. La primera fila es la emisión (tasa sin
+    cupón), como en bonos_flujos.xlsx.
+    """
+    rng = np.random.default_rng(seed)
+    frequency = rng.choice(PERIODICIDADES, n_bonds)
+    years = rng.integers(min_years, max_years + 1, n_bonds)
+    periods = years * frequency
+    rate = np.round(rng.uniform(0.01, 0.15, n_bonds), 4)
+    base = rng.choice(BASES, n_bonds)
+    tipo = rng.choice(TIPOS, n_bonds)
+
+    # Emisión en un día 1-28 para que todas las fechas de pago existan
+    first_month = np.datetime64(issue_start, 'M')
+    months_range = (np.datetime64(issue_end, 'M') - first_month).astype(np.int64)
+    issue_month = first_month + rng.integers(0, months_range + 1, n_bonds)
+    issue_day = rng.integers(0, 28, n_bonds)
+
+    # Cuotas de amortización: 1 (bullet) o las últimas k cuotas en partes iguales
+    amortizing = np.where(rng.random(n_bonds) < 0.5, 1, rng.integers(1, periods + 1))
+
+    # Una fila por fecha (emisión + períodos) y bono
+    rows = periods + 1
+    bond = np.repeat(np.arange(n_bonds), rows)
+    offsets = np.concatenate(([0], np.cumsum(rows)))
+    k = np.arange(offsets[-1]) - offsets[bond]
+
+    months = issue_month[bond] + k * (12 // frequency[bond])
+    fecha = months.astype('datetime64[D]') + issue_day[bond]
+
+    first_payment = periods[bond] - amortizing[bond] + 1
+    capital = np.where(k >= first_payment, 100.0 / amortizing[bond], 0.0)
+    paid_before = np.clip(k - first_payment, 0, None) * 100.0 / amortizing[bond]
+    cupon = np.where(k > 0, rate[bond] / frequency[bond] * (100.0 - paid_before), 0.0)
+
+    width = len(str(n_bonds))
+    nombres = np.array([f"SINT{i:0{width}d}" for i in range(n_bonds)], dtype=object)
+    return pd.DataFrame({
+        'nombre_bono': nombres[bond],
+        'base_calculo': base[bond],
+        'periodicidad': frequency[bond],
+        'tipo_bono': tipo[bond],
+        'fecha': fecha.astype('datetime64[ns]'),
+        'tasa_cupon': rate[bond],
+        'cupon_porcentaje': np.round(cupon, 6),
+        'pago_capital_porcentaje': np.round(capital, 6),
+        'flujo_total': np.round(cupon + capital, 6),
+    })
+
+def generate_quotes(flows_df, settlement, seed=0, low=0.02, high=0.40):
+    """Cotización por bono vigente: precio sucio (a 2 decimales) de una TIR aleatoria entre low y high"""
+    from bonos.batch import price_from_yield_universe
+
+    rng = np.random.default_rng(seed)
+    settlement = pd.Timestamp(settlement)
+    vigentes = flows_df.loc[flows_df['fecha'] > settlement, 'nombre_bono'].unique()
+    quotes = pd.DataFrame({
+        'nombre_bono': vigentes,
+        'fecha_liquidacion': settlement,
+        'tir': rng.uniform(low, high, len(vigentes)),
+    })
+    prices = price_from_yield_universe(flows_df, quotes)['precio'].to_numpy()
+    return quotes.drop(columns='tir').assign(precio=np.round(prices, 2))
+
+def write_workbook(flows_df, path, tipos=tuple(TIPOS)):
+    """Escribe el universo con el formato de bonos_flujos.xlsx (cabecera por bono y filas de flujos)"""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    # Columna J: bases en J1:J4 y tipos de bono en J6:J8, como la planilla original
+    column_j = ['ACT/365', 'ACT/360', 'ACT/ACT', '30/360', None] + list(tipos)
+
+    line = 0
+    for nombre, bono_flows in flows_df.groupby('nombre_bono', sort=False):
+        first = bono_flows.iloc[0]
+        rows = [[nombre, first['base_calculo'], int(first['periodicidad']), first['tipo_bono'], None]]
+        for fecha, tasa, cupon, capital, total in bono_flows[
+                ['fecha', 'tasa_cupon', 'cupon_porcentaje', 'pago_capital_porcentaje', 'flujo_total']
+        ].itertuples(index=False):
+            rows.append([fecha.to_pydatetime(), tasa, cupon or None, capital or None, total])
+        for row in rows:
+            extra = [None] * 4 + [column_j[line] if line < len(column_j) else None]
+            sheet.append(row + extra)
+            line += 1
+
+    workbook.save(path)
@@ -0,0 +1,68 @@
+"""Motor de cálculo de bonos sin dependencia de Streamlit
+
+Los nombres exportados se importan recién al usarlos: `import bonos` no carga pandas ni
+openpyxl, que solo hacen falta en los caminos de entrada/salida (planilla y DataFrames).
+"""
+import importlib
+
+# Nombre exportado -> módulo que lo define
+_EXPORTS = {
+    'solve_ytm': 'bonos.solver',
+    'solve_ytm_matrix': 'bonos.solver',
+    'price_from_yield': 'bonos.risk',
+    'RiskMeasures': 'bonos.risk',
+    'day_count': 'bonos.daycount',
+    'year_fraction': 'bonos.daycount',
+    'BondSchedule': 'bonos.schedule',
+    'ScheduleBook': 'bonos.schedule',
+    'SolverSession': 'bonos.session',
+    'CashFlows': 'bonos.cashflows',
+    'BondTerms': 'bonos.core',
+    'BondAnalytics': 'bonos.core',
+    'analyze_bond': 'bonos.core',
+    'ResultCache': 'bonos.cache',
+    'PaddedFlows': 'bonos.batch',
+    'price_universe': 'bonos.batch',
+    'price_from_yield_universe': 'bonos.batch',
+    'FlowStore': 'bonos.store',
+    'load_store': 'bonos.store',
+    'IngestReport': 'bonos.ingest',
+    'ingest_file': 'bonos.ingest',
+    'ZeroCurve': 'bonos.curve',
+    'QuoteFeed': 'bonos.feed',
+    'Quote': 'bonos.feed',
+    'bond_series': 'bonos.timeseries',
+    'universe_series': 'bonos.timeseries',
+    'ScenarioCube': 'bonos.scenarios',
+    'business_days': 'bonos.scenarios',
+    'scenario_cube': 'bonos.scenarios',
+    'METRICAS': 'bonos.metrics',
+    'Portfolio': 'bonos.portfolio',
+    'PortfolioRisk': 'bonos.portfolio',
+    'portfolio_risk': 'bonos.portfolio',
+    'cash_flow_ladder': 'bonos.portfolio',
+    'PricingService': 'bonos.service',
+    'IssueTerms': 'bonos.generator',
+    'generate_flows': 'bonos.generator',
+    'store_from_terms': 'bonos.generator',
+    'load_terms': 'bonos.generator',
+    'IndexSet': 'bonos.indices',
+    'load_indices': 'bonos.indices',
+    'project_store': 'bonos.indices',
+    'PLAZOS_CLAVE': 'bonos.krd',
+    'key_rate_durations': 'bonos.krd',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'bonos' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,209 @@
+import numpy as np
+
+from bonos.daycount import normalize_basis, year_fraction
+from bonos.metrics import timed
+from bonos.risk import price_from_yield
+from bonos.solver import solve_ytm_matrix
+
+# Relleno para posiciones sin flujo: nunca es posterior a una fecha de liquidación
+FECHA_VACIA = np.iinfo(np.int64).min
+
+COLUMNAS_RESULTADO = [
+    'nombre_bono', 'fecha_liquidacion', 'precio', 'precio_limpio', 'tir', 'tir_anualizada',
+    'duracion_macaulay', 'duracion_modificada', 'convexidad', 'dv01', 'pv01',
+    'intereses_corridos', 'capital_residual', 'valor_tecnico', 'paridad', 'vida_media', 'proximo_cupon'
+]
+
+
+class PaddedFlows:
+    """Flujos de todos los bonos en arrays 2-D (bonos x flujos) rellenados con ceros
+
+    Con ajuste (IndexAdjustment del store proyectado) el capital de los bonos CER/UVA se
+    divide por el coeficiente de cada fecha para llevar el cronograma de amortización a nominal.
+    """
+
+    def __init__(self, flows_df, ajuste=None):
+        import pandas as pd
+
+        codes, names = pd.factorize(flows_df['nombre_bono'])
+        dates = flows_df['fecha'].values.astype('datetime64[D]').astype(np.int64)
+
+        # Ordenar por bono y fecha para que cada fila quede cronológica
+        order = np.lexsort((dates, codes))
+        codes = codes[order]
+        counts = np.bincount(codes, minlength=len(names))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        position = np.arange(len(codes)) - offsets[codes]
+
+        shape = (len(names), counts.max() if len(counts) else 0)
+        self.names = np.asarray(names, dtype=object)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.counts = counts
+
+        self.dates = np.full(shape, FECHA_VACIA, dtype=np.int64)
+        self.dates[codes, position] = dates[order]
+        self.capital = np.zeros(shape)
+        self.cupon = np.zeros(shape)
+        self.tasa_cupon = np.zeros(shape)
+        for attr, column in (('capital', 'pago_capital_porcentaje'),
+                             ('cupon', 'cupon_porcentaje'),
+                             ('tasa_cupon', 'tasa_cupon')):
+            getattr(self, attr)[codes, position] = flows_df[column].to_numpy(dtype=np.float64)[order]
+
+        # Datos de cabecera de cada bono (primera fila de cada grupo)
+        first = order[offsets[:-1]]
+        self.base_calculo = flows_df['base_calculo'].to_numpy(dtype=object)[first]
+        self.periodicidad = flows_df['periodicidad'].to_numpy(dtype=np.float64)[first]
+
+        # Capital nominal (sin ajuste) para el residual y la vida media
+        self.ajuste = ajuste
+        self.capital_nominal = self.capital
+        if ajuste is not None and len(ajuste):
+            adjusted = np.isin(self.names, list(ajuste.bonds))
+            rows, cols = np.nonzero(adjusted[:, None] & (self.dates != FECHA_VACIA))
+            coefficient = np.ones(shape)
+            coefficient[rows, cols] = ajuste.coefficients(self.names[rows], self.dates[rows, cols])
+            self.capital_nominal = self.capital / coefficient
+
+    def rows(self, bonos):
+        """Devuelve el índice de fila de cada bono pedido"""
+        return np.fromiter((self.index[b] for b in bonos), dtype=np.int64, count=len(bonos))
+
+class QuoteFlows:
+    """Flujos futuros de cada cotización (una fila por cotización) y su estado a la liquidación"""
+
+    def __init__(self, padded, bonos, settlement, day_count_basis='ACT/365'):
+        self.bonos = bonos
+        self.settlement = settlement
+
+        # Una fila por cotización: flujos del bono correspondiente
+        rows = padded.rows(bonos)
+        dates = padded.dates[rows]
+        capital = padded.capital[rows]
+        nominal = padded.capital_nominal[rows]
+        cupon = padded.cupon[rows]
+        tasa_cupon = padded.tasa_cupon[rows]
+        valid = dates != FECHA_VACIA
+        before = valid & (dates < settlement[:, None])
+        self.periodicidad = padded.periodicidad[rows]
+
+        # Fracciones de año desde la liquidación según la base (posiciones vacías en cero)
+        flow_dates = np.where(valid, dates, settlement[:, None])
+        years = year_fraction(settlement[:, None], flow_dates, day_count_basis)
+
+        # Flujos futuros (posteriores a la liquidación)
+        future = dates > settlement[:, None]
+        self.amounts = np.where(future, capital + cupon, 0.0)
+        self.times = np.where(future, years, 0.0)
+        self.has_flows = future.any(axis=1)
+
+        # Intereses corridos: último cupón anterior a la liquidación sobre el capital residual
+        coupon_before = before & (tasa_cupon > 0)
+        has_coupon = coupon_before.any(axis=1)
+        last = dates.shape[1] - 1 - np.argmax(coupon_before[:, ::-1], axis=1)
+        row_index = np.arange(len(rows))
+        current_rate = np.where(has_coupon, tasa_cupon[row_index, last], 0.0)
+        last_coupon = np.where(has_coupon, dates[row_index, last], settlement)
+        # Residual nominal llevado a la liquidación con el coeficiente de ajuste (CER/UVA)
+        self.capital_residual = 100.0 - np.where(before, nominal, 0.0).sum(axis=1)
+        if padded.ajuste is not None:
+            self.capital_residual *= padded.ajuste.coefficients(bonos, settlement)
+
+        # Próximo pago de cupón desde la liquidación (inclusive); NaT si no quedan cupones
+        coupon_after = valid & ~before & (cupon > 0)
+        next_coupon = dates[row_index, np.argmax(coupon_after, axis=1)].astype('datetime64[D]')
+        self.next_coupon = np.where(coupon_after.any(axis=1), next_coupon, np.datetime64('NaT', 'D'))
+
+        # Fracción de año devengada según la base de cada bono
+        accrual_years = np.zeros(len(rows))
+        bases = padded.base_calculo[rows]
+        for base in set(bases):
+            selected = np.flatnonzero(bases == base)
+            if normalize_basis(base) == 'ACT/ACT ICMA':
+                # ICMA mide en períodos de cupón: cada bono con su propio cronograma
+                for i in selected:
+                    schedule = dates[i][valid[i] & (tasa_cupon[i] > 0)]
+                    accrual_years[i] = year_fraction(last_coupon[i], settlement[i], base,
+                                                     schedule=schedule, frequency=self.periodicidad[i])
+            else:
+                accrual_years[selected] = year_fraction(last_coupon[selected], settlement[selected], base)
+        self.accrued = current_rate * self.capital_residual * accrual_years
+
+        # Vida media: repagos de capital nominal desde la liquidación (inclusive)
+        amortization = np.where(valid & (dates >= settlement[:, None]) & (nominal > 0), nominal, 0.0)
+        total_capital = amortization.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.average_life = np.where(total_capital > 0, (amortization * years).sum(axis=1) / total_capital, 0.0)
+
+    def results(self, price, ytm):
+        """Arma el DataFrame de resultados a partir del precio sucio y la TIR de cada fila"""
+        import pandas as pd
+
+        risk = price_from_yield(self.times, self.amounts, ytm, self.accrued)
+        ytm_anualizada = self.periodicidad * ((1 + ytm) ** (1.0 / self.periodicidad) - 1)
+
+        # Paridad sobre valor técnico
+        clean_price = price - self.accrued
+        technical_value = self.capital_residual + self.accrued
+        with np.errstate(divide='ignore', invalid='ignore'):
+            parity = np.where(technical_value != 0, clean_price / technical_value, 0.0)
+
+        return pd.DataFrame({
+            'nombre_bono': self.bonos,
+            'fecha_liquidacion': self.settlement.astype('datetime64[D]'),
+            'precio': price,
+            'precio_limpio': clean_price,
+            'tir': ytm,
+            'tir_anualizada': ytm_anualizada,
+            'duracion_macaulay': risk.macaulay,
+            'duracion_modificada': risk.modified,
+            'convexidad': risk.convexity,
+            'dv01': risk.dv01,
+            'pv01': risk.pv01,
+            'intereses_corridos': self.accrued,
+            'capital_residual': self.capital_residual,
+            'valor_tecnico': technical_value,
+            'paridad': parity,
+            'vida_media': self.average_life,
+            'proximo_cupon': self.next_coupon,
+        }, columns=COLUMNAS_RESULTADO)
+
+
+def read_quotes(quotes, value_column):
+    """Normaliza las cotizaciones (DataFrame o lista de tuplas) a arrays de bono, liquidación y valor"""
+    import pandas as pd
+
+    if not isinstance(quotes, pd.DataFrame):
+        quotes = pd.DataFrame(list(quotes), columns=['nombre_bono', 'fecha_liquidacion', value_column])
+    bonos = quotes['nombre_bono'].to_numpy(dtype=object)
+    settlement = pd.to_datetime(quotes['fecha_liquidacion']).values.astype('datetime64[D]').astype(np.int64)
+    values = quotes[value_column].to_numpy(dtype=np.float64)
+    return bonos, settlement, values
+
+@timed('lote_tir')
+def price_universe(flows_df, quotes, day_count_basis='ACT/365'):
+    """Calcula TIR, duraciones, intereses corridos, paridad y vida media para un vector de cotizaciones"""
+    padded = flows_df if isinstance(flows_df, PaddedFlows) else PaddedFlows(flows_df)
+    bonos, settlement, price = read_quotes(quotes, 'precio')
+    flows = QuoteFlows(padded, bonos, settlement, day_count_basis)
+
+    # Resolver la TIR de todas las cotizaciones con el precio como flujo inicial
+    ytm = np.full(len(bonos), np.nan)
+    has_flows = flows.has_flows
+    if has_flows.any():
+        solve_times = np.column_stack((np.zeros(has_flows.sum()), flows.times[has_flows]))
+        solve_amounts = np.column_stack((-price[has_flows], flows.amounts[has_flows]))
+        ytm[has_flows] = solve_ytm_matrix(solve_times, solve_amounts)
+
+    return flows.results(price, ytm)
+
+@timed('lote_precio')
+def price_from_yield_universe(flows_df, quotes, day_count_basis='ACT/365'):
+    """Calcula precio sucio y limpio y medidas de riesgo a partir de (bono, liquidación, TIR)"""
+    padded = flows_df if isinstance(flows_df, PaddedFlows) else PaddedFlows(flows_df)
+    bonos, settlement, ytm = read_quotes(quotes, 'tir')
+    flows = QuoteFlows(padded, bonos, settlement, day_count_basis)
+
+    # Forma cerrada: el precio sucio es el valor presente de los flujos a la TIR
+    price = np.where(flows.has_flows, price_from_yield(flows.times, flows.amounts, ytm).dirty_price, np.nan)
+    return flows.results(price, ytm)
@@ -0,0 +1,201 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from bonos.core import BondAnalytics, analyze_bond
+from bonos.schedule import day_number
+
+# Precios que difieren en menos de un tick comparten resultado
+TICK_PRECIO = 1e-6
+
+# Escrituras en disco entre pasadas de limpieza por TTL y tamaño
+ESCRITURAS_POR_LIMPIEZA = 256
+
+
+def bond_hash(store, bono):
+    """Hash del contenido del bono: datos de cabecera y todas sus columnas de flujos"""
+    i = store.index[bono]
+    digest = hashlib.sha1()
+    digest.update(f"{bono}|{store.bases[i]}|{int(store.periodicidades[i])}".encode('utf-8'))
+    for column in store.bond_flows(bono):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return digest.hexdigest()
+
+def price_tick(price, tick=TICK_PRECIO):
+    """Precio redondeado al tick, como entero para usarlo en la clave"""
+    return int(round(float(price) / tick))
+
+
+class ResultCache:
+    """Caché de resultados por (contenido del bono, liquidación, tick de precio, bases)
+
+    Primer nivel: LRU en memoria del proceso. Segundo nivel opcional: SQLite en disco,
+    compartido entre procesos y reinicios. Las entradas vencen por TTL y cada nivel se recorta
+    a su tamaño máximo descartando las menos usadas. Al cambiar el archivo de flujos (su SHA-1)
+    se descartan las entradas calculadas con el archivo anterior.
+    """
+
+    def __init__(self, path=None, maxsize=4096, ttl=None, max_rows=1_000_000, tick=TICK_PRECIO):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.tick = tick
+
+        self._memory = OrderedDict()
+        self._store = None
+        self._hashes = {}
+        self._source = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = {'memoria': 0, 'disco': 0}
+        self.misses = 0
+
+        self._db = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                " clave TEXT PRIMARY KEY, origen TEXT, valor TEXT, creado REAL, usado REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado)")
+
+    def bind(self, store):
+        """Asocia la caché al store; si el archivo de origen cambió, invalida lo anterior"""
+        with self._lock:
+            if store is self._store:
+                return self
+            if store.sha1 != self._source:
+                self._memory.clear()
+                if self._db is not None and store.sha1 is not None:
+                    self._db.execute("DELETE FROM resultados WHERE origen != ?", (store.sha1,))
+            self._source = store.sha1
+            self._store = store
+            self._hashes = {}
+        return self
+
+    def key(self, store, bono, settlement, dirty_price, terms, day_count_basis):
+        """Clave de una consulta; el hash del bono se calcula una vez por store"""
+        self.bind(store)
+        digest = self._hashes.get(bono)
+        if digest is None:
+            digest = self._hashes[bono] = bond_hash(store, bono)
+        return (f"{digest}|{day_number(settlement)}|{price_tick(dirty_price, self.tick)}|"
+                f"{terms.base_calculo}|{terms.periodicidad}|{day_count_basis}")
+
+    def get(self, key):
+        """Busca en memoria y luego en disco; devuelve None si no está o venció"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if self.ttl is None or now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits['memoria'] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT valor, creado FROM resultados WHERE clave = ?", (key,)).fetchone()
+                if row is not None and (self.ttl is None or now - row[1] <= self.ttl):
+                    self._db.execute("UPDATE resultados SET usado = ? WHERE clave = ?", (now, key))
+                    value = decode_analytics(row[0])
+                    self._remember(key, value, row[1])
+                    self.hits['disco'] += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO resultados (clave, origen, valor, creado, usado) VALUES (?, ?, ?, ?, ?)",
+                    (key, self._source, encode_analytics(value), now, now))
+                self._writes += 1
+                if self._writes % ESCRITURAS_POR_LIMPIEZA == 0:
+                    self._evict_disk(now)
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM resultados WHERE creado < ?", (now - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        if count > self.max_rows:
+            self._db.execute(
+                "DELETE FROM resultados WHERE clave IN "
+                "(SELECT clave FROM resultados ORDER BY usado LIMIT ?)", (count - self.max_rows,))
+
+    def evict(self):
+        """Aplica TTL y tamaño máximo ahora, sin esperar a la próxima limpieza periódica"""
+        now = time.time()
+        with self._lock:
+            if self.ttl is not None:
+                expired = [k for k, (_, created) in self._memory.items() if now - created > self.ttl]
+                for k in expired:
+                    del self._memory[k]
+            if self._db is not None:
+                self._evict_disk(now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM resultados")
+
+    def analyze(self, store, bono, session, schedule, settlement_date, dirty_price, terms, state=None):
+        """analyze_bond con caché: solo calcula si la combinación no se resolvió antes"""
+        key = self.key(store, bono, settlement_date, dirty_price, terms, session.day_count_basis)
+        result = self.get(key)
+        if result is None:
+            result = analyze_bond(session, schedule, settlement_date, dirty_price, terms, state)
+            self.put(key, result)
+        return result
+
+    def stats(self):
+        """Aciertos por nivel, fallos y tasa de aciertos"""
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            'aciertos_memoria': self.hits['memoria'],
+            'aciertos_disco': self.hits['disco'],
+            'fallos': self.misses,
+            'tasa_aciertos': hits / total if total else 0.0,
+            'entradas_memoria': len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def encode_analytics(analytics):
+    values = analytics.to_dict()
+    if values['proximo_cupon'] is not None:
+        values['proximo_cupon'] = values['proximo_cupon'].isoformat()
+    return json.dumps(values)
+
+def decode_analytics(text):
+    values = json.loads(text)
+    if values['proximo_cupon'] is not None:
+        values['proximo_cupon'] = datetime.date.fromisoformat(values['proximo_cupon'])
+    return BondAnalytics(**values)
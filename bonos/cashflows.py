@@ -0,0 +1,101 @@
+import numpy as np
+
+from bonos.daycount import day_count, year_fraction
+from bonos.schedule import day_number
+
+
+class CashFlows:
+    """Flujos de un bono como arrays paralelos tipados, ordenados por fecha
+
+    fechas son días desde 1970-01-01 (int64); capital, cupon y total son float64 y dias
+    (opcional) los días desde la liquidación según la base. Los cortes por fecha devuelven
+    vistas de los mismos arrays, sin copiar.
+    """
+
+    __slots__ = ('fechas', 'capital', 'cupon', 'total', 'dias')
+
+    def __init__(self, fechas, capital, cupon, total=None, dias=None):
+        self.fechas = np.asarray(fechas, dtype=np.int64)
+        self.capital = np.asarray(capital, dtype=np.float64)
+        self.cupon = np.asarray(cupon, dtype=np.float64)
+        self.total = self.capital + self.cupon if total is None else np.asarray(total, dtype=np.float64)
+        self.dias = None if dias is None else np.asarray(dias, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, bono_flows):
+        """Arma los flujos a partir de las filas de un bono en el DataFrame de flujos"""
+        fechas = bono_flows['fecha'].values.astype('datetime64[D]').astype(np.int64)
+        order = np.argsort(fechas, kind='stable')
+        return cls(
+            fechas[order],
+            bono_flows['pago_capital_porcentaje'].to_numpy(dtype=np.float64)[order],
+            bono_flows['cupon_porcentaje'].to_numpy(dtype=np.float64)[order],
+        )
+
+    @classmethod
+    def from_store(cls, store, bono):
+        """Flujos de un bono del store compilado (vistas de sus columnas)"""
+        flows = store.bond_flows(bono)
+        return cls(flows.fechas, flows.pago_capital_porcentaje, flows.cupon_porcentaje)
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def __getitem__(self, key):
+        """Corte de los flujos; con un slice devuelve vistas de los mismos arrays"""
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 if key != -1 else None)
+        return CashFlows(self.fechas[key], self.capital[key], self.cupon[key], self.total[key],
+                         None if self.dias is None else self.dias[key])
+
+    def after(self, settlement):
+        """Flujos estrictamente posteriores a la liquidación (vista, sin copia)"""
+        return self[int(np.searchsorted(self.fechas, day_number(settlement), side='right')):]
+
+    def since(self, settlement):
+        """Flujos desde la liquidación inclusive (vista, sin copia)"""
+        return self[int(np.searchsorted(self.fechas, day_number(settlement), side='left')):]
+
+    def with_price(self, settlement, dirty_price, base_calculo='ACT/365'):
+        """Antepone el pago del precio sucio en la liquidación y calcula los días de cada flujo"""
+        settlement = day_number(settlement)
+        fechas = np.concatenate(([settlement], self.fechas))
+        return CashFlows(
+            fechas,
+            np.concatenate(([0.0], self.capital)),
+            np.concatenate(([0.0], self.cupon)),
+            np.concatenate(([-dirty_price], self.total)),
+            day_count(np.int64(settlement), fechas, base_calculo),
+        )
+
+    def times(self, day_count_basis='ACT/365'):
+        """Fracciones de año de cada flujo desde el primero (la liquidación si incluye el precio)"""
+        if len(self.fechas) == 0:
+            return np.zeros(0)
+        return year_fraction(self.fechas[0], self.fechas, day_count_basis)
+
+    @property
+    def nbytes(self):
+        arrays = (self.fechas, self.capital, self.cupon, self.total, self.dias)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def to_frame(self):
+        """DataFrame para mostrar, con las columnas de process_irregular_flows"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'Fecha': self.fechas.astype('datetime64[D]'),
+            'Pago_Capital': self.capital,
+            'Cupon': self.cupon,
+            'Flujo_Total': self.total,
+            'Días': self.dias if self.dias is not None else np.zeros(len(self.fechas), dtype=np.int64),
+        })
+
+    def to_records(self):
+        """Lista de dicts como la que devolvía process_irregular_flows"""
+        dias = self.dias if self.dias is not None else np.zeros(len(self.fechas), dtype=np.int64)
+        return [
+            {'Fecha': np.datetime64(int(f), 'D').astype(object), 'Pago_Capital': float(k),
+             'Cupon': float(c), 'Flujo_Total': float(t), 'Días': int(d)}
+            for f, k, c, t, d in zip(self.fechas, self.capital, self.cupon, self.total, dias)
+        ]
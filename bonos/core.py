@@ -0,0 +1,154 @@
+import datetime
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+
+from bonos.cashflows import CashFlows
+from bonos.daycount import day_count, year_fraction
+from bonos.metrics import timed
+from bonos.risk import price_from_yield
+from bonos.schedule import BondSchedule, day_to_date
+from bonos.solver import solve_ytm
+
+
+@dataclass(frozen=True)
+class BondTerms:
+    """Datos de cabecera del bono que afectan el cálculo"""
+    base_calculo: str = 'ACT/365'
+    periodicidad: int = 12
+
+
+@dataclass(frozen=True)
+class BondAnalytics:
+    """Resultados de un bono a una fecha de liquidación y precio sucio"""
+    precio: float
+    precio_limpio: float
+    tir: float
+    tir_anualizada: float
+    duracion_macaulay: float
+    duracion_modificada: float
+    convexidad: float
+    dv01: float
+    pv01: float
+    intereses_corridos: float
+    capital_residual: float
+    valor_tecnico: float
+    paridad: float
+    vida_media: float
+    cupon_vigente: float
+    proximo_cupon: Optional[datetime.date]
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@timed('calculo_bono')
+def analyze_bond(session, schedule, settlement_date, dirty_price, terms=BondTerms(), state=None):
+    """Calcula TIR, duraciones, riesgo, intereses corridos, paridad y vida media de un bono
+
+    session es la SolverSession del bono (arranca la TIR desde la última resuelta) y schedule
+    su BondSchedule; state permite pasar el estado del cronograma ya memoizado.
+    """
+    session.set_settlement(settlement_date)
+    ytm = session.solve(dirty_price)
+    risk = session.risk(ytm)
+    periodicidad = terms.periodicidad
+
+    # Fórmula: periodicidad * ((1 + TIR efectiva)^(1/periodicidad) - 1)
+    ytm_anualizada = periodicidad * ((1 + ytm) ** (1.0 / periodicidad) - 1)
+
+    # Estado del cronograma a la liquidación: último y próximo cupón, capital residual y tasa vigente
+    state = state or schedule.state(settlement_date)
+    accrued_interest = schedule.accrued_interest(settlement_date, terms.base_calculo, state, periodicidad)
+    average_life = schedule.average_life(settlement_date, session.day_count_basis, periodicidad)
+
+    clean_price = dirty_price - accrued_interest
+    technical_value = state.capital_residual + accrued_interest
+
+    return BondAnalytics(
+        precio=float(dirty_price),
+        precio_limpio=float(clean_price),
+        tir=float(ytm),
+        tir_anualizada=float(ytm_anualizada),
+        duracion_macaulay=float(risk.macaulay),
+        duracion_modificada=float(risk.modified),
+        convexidad=float(risk.convexity),
+        dv01=float(risk.dv01),
+        pv01=float(risk.pv01),
+        intereses_corridos=float(accrued_interest),
+        capital_residual=float(state.capital_residual),
+        valor_tecnico=float(technical_value),
+        paridad=calculate_parity(clean_price, technical_value),
+        vida_media=float(average_life),
+        cupon_vigente=float(state.coupon_rate),
+        proximo_cupon=day_to_date(state.next_coupon) if state.next_coupon is not None else None,
+    )
+
+
+# Funciones de la calculadora original, con la misma firma que tenían en app.py
+
+# Función para calcular días usando diferentes bases
+def days_calculation(start_date, end_date, base):
+    """Calcula días entre fechas usando diferentes bases"""
+    return int(day_count(start_date, end_date, base))
+
+# Función para procesar flujos irregulares
+def process_irregular_flows(flows_df, settlement_date, dirty_price, base_calculo="ACT/365"):
+    """Procesa flujos irregulares incluyendo el precio dirty como flujo inicial
+
+    Devuelve un CashFlows: el pago del precio en la liquidación seguido de los flujos futuros.
+    """
+    return CashFlows.from_frame(flows_df).after(settlement_date).with_price(settlement_date, dirty_price, base_calculo)
+
+# Función para pasar los flujos a arrays de tiempos (en años) y montos
+def cash_flow_arrays(cash_flows, day_count_basis='ACT/365'):
+    """Devuelve fracciones de año desde la liquidación y montos de los flujos como arrays"""
+    if isinstance(cash_flows, CashFlows):
+        return cash_flows.times(day_count_basis), cash_flows.total
+
+    # Lista de dicts con el formato anterior
+    count = len(cash_flows)
+    dates = np.array([cf['Fecha'] for cf in cash_flows], dtype='datetime64[D]')
+    amounts = np.fromiter((cf['Flujo_Total'] for cf in cash_flows), dtype=np.float64, count=count)
+    # El primer flujo es el pago del precio en la fecha de liquidación
+    times = year_fraction(dates[0], dates, day_count_basis)
+    return times, amounts
+
+# Función para calcular TIR
+def calculate_ytm_irregular(cash_flows, day_count_basis='ACT/365', max_iterations=100, tolerance=1e-8):
+    """Calcula la TIR usando Newton-Raphson para flujos irregulares (equivalente a TIR.NO.PER de Excel)"""
+    times, amounts = cash_flow_arrays(cash_flows, day_count_basis)
+    return solve_ytm(times, amounts, max_iterations=max_iterations, tolerance=tolerance)
+
+# Función para calcular duración
+def calculate_duration_irregular(cash_flows, ytm, price, day_count_basis='ACT/365'):
+    """Calcula duración Macaulay y modificada para flujos irregulares en años"""
+    times, amounts = cash_flow_arrays(cash_flows, day_count_basis)
+
+    # Solo incluir flujos positivos en el cálculo de duración
+    positive = amounts > 0
+    risk = price_from_yield(times[positive], amounts[positive], ytm)
+
+    return float(risk.macaulay), float(risk.modified)
+
+def calculate_average_life(bono_flows, settlement_date, day_count_basis):
+    """Calcula la vida media del bono considerando todos los repagos de capital desde liquidación hasta vencimiento"""
+    return BondSchedule.from_frame(bono_flows).average_life(settlement_date, day_count_basis)
+
+def calculate_parity(clean_price, technical_value):
+    """Calcula la paridad como precio limpio dividido por valor técnico"""
+    if technical_value == 0:
+        return 0.0
+    return clean_price / technical_value
+
+def find_next_coupon_date(bono_flows, settlement_date):
+    """Encuentra la próxima fecha de pago de cupón más cercana a la fecha de liquidación"""
+    import pandas as pd
+
+    next_coupon = BondSchedule.from_frame(bono_flows).state(settlement_date).next_coupon
+    return pd.Timestamp(day_to_date(next_coupon)) if next_coupon is not None else None
+
+def calculate_accrued_interest(bono_flows, settlement_date, base_calculo_bono, periodicidad):
+    """Calcula intereses corridos hasta la fecha de liquidación sobre el capital residual no amortizado"""
+    return BondSchedule.from_frame(bono_flows).accrued_interest(settlement_date, base_calculo_bono, frequency=periodicidad)
@@ -0,0 +1,330 @@
+import numpy as np
+
+from bonos.batch import PaddedFlows, QuoteFlows
+from bonos.schedule import day_number
+from bonos.solver import solve_ytm_matrix
+
+INTERPOLACIONES = ('log_linear', 'monotone_convex')
+
+
+def monotone_convex_integral(x, g0, g1):
+    """Integral entre 0 y x de la corrección g de Hagan-West sobre el forward discreto del tramo
+
+    g0 y g1 son los forwards instantáneos en los extremos del tramo menos el forward discreto;
+    la integral vale cero en x = 1, así que los nodos de la curva se respetan exactamente.
+    """
+    x, g0, g1 = np.broadcast_arrays(np.asarray(x, dtype=np.float64), g0, g1)
+    result = np.zeros(x.shape)
+
+    region_1 = (((g0 < 0) & (g1 >= -0.5 * g0) & (g1 <= -2 * g0))
+                | ((g0 > 0) & (g1 <= -0.5 * g0) & (g1 >= -2 * g0)))
+    region_2 = ~region_1 & (((g0 < 0) & (g1 > -2 * g0)) | ((g0 > 0) & (g1 < -2 * g0)))
+    region_3 = ~region_1 & (((g0 > 0) & (g1 < 0)) | ((g0 < 0) & (g1 > 0))) & ~region_2
+    region_4 = ~(region_1 | region_2 | region_3) & ((g0 != 0) | (g1 != 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # (i) polinomio cuadrático
+        r = region_1
+        result[r] = (g0[r] * (x[r] - 2 * x[r] ** 2 + x[r] ** 3)
+                     + g1[r] * (x[r] ** 3 - x[r] ** 2))
+
+        # (ii) constante hasta eta y cuadrático después
+        r = region_2
+        eta = (g1[r] + 2 * g0[r]) / (g1[r] - g0[r])
+        tail = np.maximum(x[r] - eta, 0.0)
+        result[r] = g0[r] * x[r] + (g1[r] - g0[r]) * tail ** 3 / (3 * (1 - eta) ** 2)
+
+        # (iii) cuadrático hasta eta y constante después
+        r = region_3
+        eta = 3 * g1[r] / (g1[r] - g0[r])
+        head = np.maximum(eta - x[r], 0.0) / eta
+        result[r] = g1[r] * x[r] + (g0[r] - g1[r]) * eta / 3 * (1 - head ** 3)
+
+        # (iv) dos cuadráticos unidos en eta con mínimo/máximo A
+        r = region_4
+        eta = g1[r] / (g1[r] + g0[r])
+        level = -g0[r] * g1[r] / (g0[r] + g1[r])
+        head = np.where(eta > 0, np.maximum(eta - x[r], 0.0) / eta, 0.0)
+        tail = np.maximum(x[r] - eta, 0.0)
+        tail_term = np.where(eta < 1, tail ** 3 / (3 * (1 - eta) ** 2), 0.0)
+        result[r] = (level * x[r] + (g0[r] - level) * eta / 3 * (1 - head ** 3)
+                     + (g1[r] - level) * tail_term)
+
+    return result
+
+def log_discount(t, node_times, node_logs, interpolation='log_linear'):
+    """Logaritmo del factor de descuento en los plazos t a partir de los nodos de la curva
+
+    node_times empieza en 0 con node_logs[0] = 0. Más allá del último nodo se extrapola con
+    el último forward discreto constante.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    node_times = np.asarray(node_times, dtype=np.float64)
+    node_logs = np.asarray(node_logs, dtype=np.float64)
+    n = len(node_times) - 1
+    if n < 1:
+        raise ValueError("La curva necesita al menos un nodo además del origen")
+
+    # Forwards discretos de cada tramo (t[i-1], t[i]]
+    h = np.diff(node_times)
+    forwards = -np.diff(node_logs) / h
+
+    i = np.clip(np.searchsorted(node_times, t, side='left'), 1, n)
+    x = (np.maximum(t, 0.0) - node_times[i - 1]) / h[i - 1]
+    beyond = x > 1
+    x = np.minimum(x, 1.0)
+
+    if interpolation == 'monotone_convex':
+        # Forwards instantáneos en los nodos (Hagan-West, sin restricción de positividad)
+        instant = np.empty(n + 1)
+        if n == 1:
+            instant[:] = forwards[0]
+        else:
+            instant[1:n] = (h[:-1] * forwards[1:] + h[1:] * forwards[:-1]) / (h[:-1] + h[1:])
+            instant[0] = forwards[0] - 0.5 * (instant[1] - forwards[0])
+            instant[n] = forwards[-1] - 0.5 * (instant[n - 1] - forwards[-1])
+        fd = forwards[i - 1]
+        correction = monotone_convex_integral(x, instant[i - 1] - fd, instant[i] - fd)
+        logs = node_logs[i - 1] - h[i - 1] * (fd * x + correction)
+    elif interpolation == 'log_linear':
+        logs = node_logs[i - 1] - h[i - 1] * forwards[i - 1] * x
+    else:
+        raise ValueError(f"Interpolación desconocida: {interpolation}")
+
+    return np.where(beyond, node_logs[n] - forwards[-1] * (t - node_times[n]), logs)
+
+
+class ZeroCurve:
+    """Curva cero construida por bootstrapping sobre los bonos del universo a una fecha de liquidación
+
+    quotes son los precios sucios de mercado (dict o Series por bono). Se toma un nodo por
+    vencimiento: ante vencimientos repetidos se usa el primer bono cotizado.
+    """
+
+    def __init__(self, flows_df, quotes, settlement, day_count_basis='ACT/365',
+                 interpolation='log_linear', tolerance=1e-12, max_passes=50):
+        if interpolation not in INTERPOLACIONES:
+            raise ValueError(f"Interpolación desconocida: {interpolation}")
+        self.padded = flows_df if isinstance(flows_df, PaddedFlows) else PaddedFlows(flows_df)
+        self.settlement = day_number(settlement)
+        self.day_count_basis = day_count_basis
+        self.interpolation = interpolation
+        self.tolerance = tolerance
+        self.max_passes = max_passes
+
+        # Flujos futuros de todos los bonos a la liquidación (una fila por bono)
+        names = self.padded.names
+        self.flows = QuoteFlows(self.padded, names, np.full(len(names), self.settlement, dtype=np.int64),
+                                day_count_basis)
+        self.maturity = self.flows.times.max(axis=1)
+
+        self.quotes = {}
+        self.pillars = []
+        self.node_times = np.zeros(1)
+        self.node_logs = np.zeros(1)
+        self._discount = None
+
+        for bono, price in dict(quotes).items():
+            self._set_quote(bono, price)
+        self._rebuild(0)
+
+    def _set_quote(self, bono, price):
+        """Registra la cotización y devuelve la posición del nodo que cambió (o None)"""
+        price = float(price)
+        row = self.padded.index[bono]
+        self.quotes[bono] = price
+        valid = self._valid_quote(row, price)
+        if bono in self.pillars:
+            k = self.pillars.index(bono)
+            if valid:
+                return k
+            # Precio inválido: el nodo sale de la curva y lo toma otro bono válido del mismo
+            # vencimiento si hay; los nodos siguientes se resuelven de nuevo en cualquier caso
+            del self.pillars[k]
+            self.node_times = np.delete(self.node_times, k + 1)
+            self.node_logs = np.delete(self.node_logs, k + 1)
+            for other, other_price in self.quotes.items():
+                other_row = self.padded.index[other]
+                if other != bono and self.maturity[other_row] == self.maturity[row] and \
+                        self._valid_quote(other_row, other_price):
+                    self._set_quote(other, other_price)
+                    break
+            return min(k, len(self.pillars))
+        if not valid:
+            return None
+
+        # Nodo nuevo solo si nadie cubre ya ese vencimiento
+        maturities = self.maturity[self.padded.rows(self.pillars)] if self.pillars else np.zeros(0)
+        if np.any(maturities == self.maturity[row]):
+            return None
+        k = int(np.searchsorted(maturities, self.maturity[row]))
+        self.pillars.insert(k, bono)
+        self.node_times = np.insert(self.node_times, k + 1, self.maturity[row])
+        self.node_logs = np.insert(self.node_logs, k + 1, np.nan)
+        return k
+
+    def _valid_quote(self, row, price):
+        """Un bono puede ser nodo si tiene flujos futuros y un precio positivo"""
+        return bool(self.flows.has_flows[row]) and np.isfinite(price) and price > 0
+
+    def update_quote(self, bono, price):
+        """Actualiza un precio y vuelve a resolver la curva desde el nodo afectado
+
+        Los nodos anteriores se reutilizan tal cual (log-lineal) o, con monotone convex, solo
+        se vuelven a resolver desde dos nodos antes del afectado, así que un cambio es incremental.
+        """
+        k = self._set_quote(bono, price)
+        if k is not None:
+            self._rebuild(k)
+        return self
+
+    def _rebuild(self, start):
+        """Resuelve los nodos desde start; monotone convex repite pasadas hasta converger"""
+        self._discount = None
+        if not self.pillars:
+            return
+        for k in range(start, len(self.pillars)):
+            self._solve_node(k, full=False)
+        if self.interpolation == 'log_linear':
+            return
+
+        # El nodo k usa los forwards instantáneos hasta el nodo k + 2, así que un cambio mueve
+        # los tramos vecinos: se itera desde dos nodos antes del primero que cambió y la
+        # ventana se extiende hacia atrás solo mientras su primer nodo se siga moviendo
+        low = max(0, start - 2)
+        for _ in range(self.max_passes):
+            previous = self.node_logs.copy()
+            for k in range(low, len(self.pillars)):
+                self._solve_node(k, full=True)
+            change = np.abs(self.node_logs - previous)
+            if np.max(change) < self.tolerance:
+                break
+            if low > 0 and change[low + 1] >= self.tolerance:
+                low -= 1
+
+    def _solve_node(self, k, full):
+        """Ajusta el log-descuento del nodo k para que el bono del nodo valga su precio (secante)"""
+        row = self.padded.index[self.pillars[k]]
+        future = self.flows.amounts[row] != 0
+        times = self.flows.times[row][future]
+        amounts = self.flows.amounts[row][future]
+        price = self.quotes[self.pillars[k]]
+        # Con full se incluye el nodo siguiente, que define el forward instantáneo del vencimiento
+        node_times = self.node_times[:k + 3] if full else self.node_times[:k + 2]
+        node_logs = self.node_logs[:k + 3] if full else self.node_logs[:k + 2]
+
+        def error(value):
+            node_logs[k + 1] = value
+            return np.dot(amounts, np.exp(log_discount(times, node_times, node_logs, self.interpolation))) - price
+
+        current = node_logs[k + 1]
+        if not np.isfinite(current):
+            # Punto de partida: forward plano del tramo anterior (o 5% para el primer nodo)
+            forward = 0.05
+            if k >= 1:
+                forward = (self.node_logs[k - 1] - self.node_logs[k]) / (self.node_times[k] - self.node_times[k - 1])
+            current = self.node_logs[k] - forward * (self.node_times[k + 1] - self.node_times[k])
+
+        x0, x1 = current, current - 1e-4
+        f0, f1 = error(x0), error(x1)
+        for _ in range(100):
+            if f1 == f0 or abs(f1) < self.tolerance * price:
+                break
+            x0, x1 = x1, x1 - f1 * (x1 - x0) / (f1 - f0)
+            f0, f1 = f1, error(x1)
+        node_logs[k + 1] = x1
+
+    def log_discount(self, t):
+        """Logaritmo del factor de descuento en los plazos t (años desde la liquidación)"""
+        return log_discount(t, self.node_times, self.node_logs, self.interpolation)
+
+    def discount(self, t):
+        """Factor de descuento en los plazos t (años desde la liquidación)"""
+        return np.exp(self.log_discount(t))
+
+    def zero_rate(self, t):
+        """Tasa cero efectiva anual en los plazos t"""
+        t = np.asarray(t, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(t > 0, np.expm1(-self.log_discount(t) / t), np.nan)
+
+    @property
+    def discount_factors(self):
+        """Factores de descuento de cada flujo futuro del universo (bonos x flujos), cacheados"""
+        if self._discount is None:
+            future = self.flows.amounts != 0
+            self._discount = np.where(future, self.discount(self.flows.times), 0.0)
+        return self._discount
+
+    def prices(self):
+        """Precio sucio teórico de cada bono descontado con la curva"""
+        import pandas as pd
+
+        price = (self.flows.amounts * self.discount_factors).sum(axis=1)
+        return pd.Series(np.where(self.flows.has_flows, price, np.nan), index=self.padded.names)
+
+    def price(self, bono):
+        """Precio sucio teórico de un bono descontado con la curva"""
+        row = self.padded.index[bono]
+        return float(np.dot(self.flows.amounts[row], self.discount_factors[row]))
+
+    def _rows_and_prices(self, bonos, prices):
+        bonos = list(self.quotes) if bonos is None else list(bonos)
+        if prices is None:
+            prices = [self.quotes[b] for b in bonos]
+        return bonos, self.padded.rows(bonos), np.asarray(prices, dtype=np.float64)
+
+    def z_spreads(self, bonos=None, prices=None, max_iterations=100):
+        """Spread continuo constante sobre la curva cero que reproduce cada precio
+
+        Con los flujos ya descontados por la curva, exp(-z t) = (1 + y) ** -t con z = log(1 + y):
+        se resuelve con el Newton acotado de solve_ytm_matrix, que bisecta si un paso sale del intervalo.
+        """
+        import pandas as pd
+
+        bonos, rows, prices = self._rows_and_prices(bonos, prices)
+        has_flows = self.flows.has_flows[rows]
+        spread = np.full(len(rows), np.nan)
+        if has_flows.any():
+            discounted = self.flows.amounts[rows][has_flows] * self.discount_factors[rows][has_flows]
+            solve_times = np.column_stack((np.zeros(has_flows.sum()), self.flows.times[rows][has_flows]))
+            solve_amounts = np.column_stack((-prices[has_flows], discounted))
+            spread[has_flows] = np.log1p(solve_ytm_matrix(solve_times, solve_amounts, guess=0.0,
+                                                          max_iterations=max_iterations,
+                                                          tolerance=self.tolerance))
+        return pd.Series(spread, index=bonos)
+
+    def i_spreads(self, bonos=None, prices=None):
+        """TIR de cada bono menos la tasa cero de la curva a su vencimiento"""
+        import pandas as pd
+
+        bonos, rows, prices = self._rows_and_prices(bonos, prices)
+        has_flows = self.flows.has_flows[rows]
+        ytm = np.full(len(rows), np.nan)
+        if has_flows.any():
+            solve_times = np.column_stack((np.zeros(has_flows.sum()), self.flows.times[rows][has_flows]))
+            solve_amounts = np.column_stack((-prices[has_flows], self.flows.amounts[rows][has_flows]))
+            ytm[has_flows] = solve_ytm_matrix(solve_times, solve_amounts)
+        return pd.Series(ytm - self.zero_rate(self.maturity[rows]), index=bonos)
+
+    def z_spread(self, bono, price=None):
+        """Z-spread de un bono (por defecto a su precio cotizado)"""
+        return float(self.z_spreads([bono], None if price is None else [price]).iloc[0])
+
+    def i_spread(self, bono, price=None):
+        """I-spread de un bono (por defecto a su precio cotizado)"""
+        return float(self.i_spreads([bono], None if price is None else [price]).iloc[0])
+
+    def nodes(self):
+        """Tabla de nodos: bono, vencimiento, plazo, factor de descuento y tasa cero"""
+        import pandas as pd
+
+        times = self.node_times[1:]
+        rows = self.padded.rows(self.pillars)
+        return pd.DataFrame({
+            'nombre_bono': self.pillars,
+            'vencimiento': self.padded.dates[rows].max(axis=1).astype('datetime64[D]'),
+            'plazo': times,
+            'factor_descuento': np.exp(self.node_logs[1:]),
+            'tasa_cero': self.zero_rate(times),
+        })
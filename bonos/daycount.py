@@ -0,0 +1,108 @@
+import numpy as np
+
+# Bases soportadas y sus alias (los nombres cortos son los que usa la planilla)
+BASES = {
+    '30/360': '30/360 US',
+    '30/360 US': '30/360 US',
+    '30E/360': '30E/360',
+    'ACT/360': 'ACT/360',
+    'ACT/365': 'ACT/365F',
+    'ACT/365F': 'ACT/365F',
+    'ACT/ACT': 'ACT/ACT ISDA',
+    'ACT/ACT ISDA': 'ACT/ACT ISDA',
+    'ACT/ACT ICMA': 'ACT/ACT ICMA',
+}
+
+# Días por año de las bases con divisor fijo
+DIVISORES = {
+    '30/360 US': 360.0,
+    '30E/360': 360.0,
+    'ACT/360': 360.0,
+    'ACT/365F': 365.0,
+}
+
+
+def normalize_basis(base):
+    """Devuelve el nombre canónico de la base; las desconocidas se tratan como ACT/365F"""
+    return BASES.get(str(base).strip().upper(), 'ACT/365F')
+
+def days_per_year(base):
+    """Divisor fijo de la base o None si la base no tiene divisor fijo (ACT/ACT)"""
+    return DIVISORES.get(normalize_basis(base))
+
+def as_datetime64(dates):
+    """Convierte fechas (datetime64, días enteros desde 1970-01-01, date o texto) a datetime64[D]"""
+    return np.asarray(dates).astype('datetime64[D]')
+
+def split_dates(dates):
+    """Descompone un array datetime64[D] en arrays de año, mes y día"""
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    year = years.astype(np.int64) + 1970
+    month = (months - years.astype('datetime64[M]')).astype(np.int64) + 1
+    day = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    return year, month, day
+
+def day_count(start, end, base):
+    """Días entre fechas según la base (30/360 cuenta meses de 30 días; ACT cuenta días reales)"""
+    start = as_datetime64(start)
+    end = as_datetime64(end)
+    base = normalize_basis(base)
+
+    if base in ('30/360 US', '30E/360'):
+        y1, m1, d1 = split_dates(start)
+        y2, m2, d2 = split_dates(end)
+        if base == '30/360 US':
+            # El día final solo se ajusta si el inicial es 30 o 31
+            d2 = np.where((d2 == 31) & (d1 >= 30), 30, d2)
+            d1 = np.minimum(d1, 30)
+        else:
+            d1 = np.minimum(d1, 30)
+            d2 = np.minimum(d2, 30)
+        return (y2 - y1) * 360 + (m2 - m1) * 30 + (d2 - d1)
+
+    return (end - start).astype(np.int64)
+
+def year_fraction(start, end, base, schedule=None, frequency=None):
+    """Fracción de año entre fechas (vectorizada sobre arrays datetime64)
+
+    ACT/ACT ICMA necesita las fechas de cupón del bono (schedule) y la frecuencia anual.
+    """
+    base = normalize_basis(base)
+
+    if base in DIVISORES:
+        return day_count(start, end, base) / DIVISORES[base]
+
+    start = as_datetime64(start)
+    end = as_datetime64(end)
+
+    if base == 'ACT/ACT ISDA':
+        # Días en cada año calendario divididos por la cantidad de días de ese año
+        y1 = start.astype('datetime64[Y]')
+        y2 = end.astype('datetime64[Y]')
+        next_year_1 = (y1 + 1).astype('datetime64[D]')
+        start_year_2 = y2.astype('datetime64[D]')
+        length_1 = (next_year_1 - y1.astype('datetime64[D]')).astype(np.int64)
+        length_2 = ((y2 + 1).astype('datetime64[D]') - start_year_2).astype(np.int64)
+        return ((y2 - y1).astype(np.int64) - 1
+                + (next_year_1 - start).astype(np.int64) / length_1
+                + (end - start_year_2).astype(np.int64) / length_2)
+
+    # ACT/ACT ICMA: cada período de cupón vale 1/frecuencia años
+    if schedule is None or frequency is None:
+        raise ValueError("ACT/ACT ICMA requiere las fechas de cupón y la frecuencia")
+    schedule = np.unique(as_datetime64(schedule).astype(np.int64))
+    return (coupon_periods(end, schedule) - coupon_periods(start, schedule)) / float(frequency)
+
+def coupon_periods(dates, schedule):
+    """Posición de cada fecha medida en períodos de cupón (k + fracción del período k)
+
+    Fuera del cronograma se extrapola con la longitud del primer o último período.
+    """
+    days = as_datetime64(dates).astype(np.int64)
+    if len(schedule) < 2:
+        raise ValueError("ACT/ACT ICMA requiere al menos dos fechas de cupón")
+    k = np.clip(np.searchsorted(schedule, days, side='right') - 1, 0, len(schedule) - 2)
+    period_start = schedule[k]
+    period_length = schedule[k + 1] - period_start
+    return k + (days - period_start) / period_length
@@ -0,0 +1,329 @@
+"""Modo servicio: recalcula los bonos a medida que llegan cotizaciones
+
+Uso: python -m bonos.feed --replay ticks.csv | --tail ticks.csv | --socket 127.0.0.1:9100
+
+Cada línea de cotización es `bono;precio` o `bono;precio;liquidación` (también se aceptan
+`fecha;bono;precio` con marca de tiempo al reproducir). Los resultados salen como JSON, uno
+por línea. Con --metricas PUERTO se exponen los tiempos y contadores del cálculo en
+/metrics (Prometheus) y /metrics.json.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from bonos.core import BondAnalytics, BondTerms, analyze_bond
+from bonos.metrics import count, register_cache, serve
+from bonos.schedule import ScheduleBook
+from bonos.session import SolverSession
+
+# Cotizaciones pendientes por suscriptor antes de descartar las más viejas
+RESULTADOS_POR_SUSCRIPTOR = 1024
+
+# Líneas leídas entre cesiones de control al reproducir sin esperas
+LINEAS_POR_RAFAGA = 256
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Cotización de un bono: precio sucio y, opcionalmente, su fecha de liquidación"""
+    bono: str
+    precio: float
+    liquidacion: Optional[datetime.date] = None
+    recibido: float = 0.0
+
+
+@dataclass(frozen=True)
+class FeedResult:
+    """Resultado publicado para una cotización (analytics es None si no se pudo calcular)"""
+    bono: str
+    precio: float
+    liquidacion: datetime.date
+    analytics: Optional[BondAnalytics]
+    error: Optional[str]
+    latencia: float
+
+    def to_dict(self):
+        result = {
+            'bono': self.bono,
+            'precio': self.precio,
+            'liquidacion': self.liquidacion.isoformat(),
+            'latencia_us': round(self.latencia * 1e6, 1),
+        }
+        if self.analytics is not None:
+            result.update(self.analytics.to_dict())
+            if result['proximo_cupon'] is not None:
+                result['proximo_cupon'] = result['proximo_cupon'].isoformat()
+        else:
+            result['error'] = self.error
+        return result
+
+
+def parse_quote(line, settlement=None):
+    """Interpreta una línea `bono;precio[;liquidación]`; devuelve None si no es una cotización"""
+    fields = [f.strip() for f in line.strip().split(';')]
+    if len(fields) < 2 or not fields[0]:
+        return None
+    try:
+        price = float(fields[1].replace(',', '.'))
+    except ValueError:
+        return None
+    if len(fields) > 2 and fields[2]:
+        try:
+            settlement = datetime.date.fromisoformat(fields[2])
+        except ValueError:
+            return None
+    return Quote(fields[0], price, settlement, time.perf_counter())
+
+
+class QuoteFeed:
+    """Recalcula TIR, duración, paridad y demás medidas de cada bono al llegar su precio
+
+    Las cotizaciones se acumulan por bono y el ciclo de cálculo solo resuelve la última de
+    cada uno: una ráfaga de precios del mismo bono se resuelve una vez. Cada bono conserva su
+    SolverSession, así que la TIR arranca desde la anterior y converge en pocas iteraciones.
+    """
+
+    def __init__(self, store, settlement, day_count_basis='ACT/365'):
+        self.store = store
+        self.settlement = settlement
+        self.day_count_basis = day_count_basis
+        self.schedules = ScheduleBook(store)
+        self.sessions = {}
+        self.subscribers = []
+
+        self._pending = {}
+        self._ready = asyncio.Event()
+        self.recibidas = 0
+        self.calculadas = 0
+
+    def subscribe(self, maxsize=RESULTADOS_POR_SUSCRIPTOR):
+        """Devuelve una cola donde se publican los resultados; si se llena se descartan los más viejos"""
+        queue = asyncio.Queue(maxsize)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.remove(queue)
+
+    def push(self, quote):
+        """Registra una cotización; reemplaza la pendiente del mismo bono si todavía no se calculó"""
+        if quote.recibido == 0.0:
+            quote = Quote(quote.bono, quote.precio, quote.liquidacion, time.perf_counter())
+        self.recibidas += 1
+        if quote.bono in self._pending:
+            count('feed_cotizaciones_reemplazadas')
+        self._pending[quote.bono] = quote
+        self._ready.set()
+
+    def price(self, quote):
+        """Calcula una cotización con la sesión del bono"""
+        settlement = quote.liquidacion or self.settlement
+        i = self.store.index.get(quote.bono)
+        if i is None:
+            return FeedResult(quote.bono, quote.precio, settlement, None, "Bono desconocido",
+                              time.perf_counter() - quote.recibido)
+
+        session = self.sessions.get(quote.bono)
+        if session is None:
+            session = self.sessions[quote.bono] = SolverSession.from_store(
+                self.store, quote.bono, self.day_count_basis)
+
+        analytics, error = None, None
+        if not session.set_settlement(settlement).has_flows:
+            error = "No hay flujos de caja futuros para la fecha de liquidación"
+        else:
+            try:
+                analytics = analyze_bond(
+                    session,
+                    self.schedules.schedule(quote.bono),
+                    settlement,
+                    quote.precio,
+                    BondTerms(self.store.bases[i], int(self.store.periodicidades[i])),
+                    self.schedules.state(quote.bono, settlement),
+                )
+            except Exception as e:
+                error = str(e)
+        return FeedResult(quote.bono, quote.precio, settlement, analytics, error,
+                          time.perf_counter() - quote.recibido)
+
+    def publish(self, result):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(result)
+
+    async def process(self):
+        """Ciclo de cálculo: espera cotizaciones, toma la última de cada bono y publica"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            pending, self._pending = self._pending, {}
+            for quote in pending.values():
+                self.publish(self.price(quote))
+                self.calculadas += 1
+            # Ceder el control para que las fuentes sigan encolando entre ráfagas
+            await asyncio.sleep(0)
+
+    async def run(self, *sources):
+        """Consume las fuentes (iteradores asíncronos de Quote) hasta que terminen todas"""
+        worker = asyncio.ensure_future(self.process())
+        try:
+            await asyncio.gather(*(self._consume(source) for source in sources))
+            # Vaciar lo que haya quedado pendiente
+            while self._pending:
+                await asyncio.sleep(0)
+        finally:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _consume(self, source):
+        async for quote in source:
+            self.push(quote)
+
+
+async def replay_source(path, settlement=None, speed=None):
+    """Reproduce un archivo de ticks; con speed respeta los tiempos de la columna de fecha
+
+    Las líneas pueden ser `bono;precio[;liquidación]` o `fecha_hora;bono;precio[;liquidación]`
+    con fecha_hora ISO; speed=2 reproduce al doble de velocidad y None lo más rápido posible.
+    """
+    previous = None
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            stamp = None
+            head, _, rest = line.partition(';')
+            try:
+                stamp = datetime.datetime.fromisoformat(head.strip())
+                line = rest
+            except ValueError:
+                pass
+
+            quote = parse_quote(line, settlement)
+            if quote is None:
+                continue
+            if speed and stamp is not None:
+                if previous is not None and stamp > previous:
+                    await asyncio.sleep((stamp - previous).total_seconds() / speed)
+                previous = stamp
+            elif number % LINEAS_POR_RAFAGA == 0:
+                # Sin esperas: ceder el control cada tanto para que el ciclo de cálculo avance
+                await asyncio.sleep(0)
+            yield quote
+
+async def tail_source(path, settlement=None, poll=0.05, from_start=False):
+    """Sigue un archivo al que otro proceso agrega cotizaciones, como tail -f"""
+    with open(path, encoding='utf-8') as f:
+        if not from_start:
+            f.seek(0, 2)
+        buffer = ''
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll)
+                continue
+            buffer += chunk
+            if not buffer.endswith('\n'):
+                # Línea a medio escribir: esperar el resto
+                continue
+            quote = parse_quote(buffer, settlement)
+            buffer = ''
+            if quote is not None:
+                yield quote
+
+async def socket_source(host='127.0.0.1', port=9100, settlement=None, path=None):
+    """Escucha conexiones TCP (o un socket Unix con path) que envían una cotización por línea"""
+    queue = asyncio.Queue()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                quote = parse_quote(line.decode('utf-8', errors='replace'), settlement)
+                if quote is not None:
+                    queue.put_nowait(quote)
+        except (ConnectionError, asyncio.CancelledError):
+            # Cliente caído o servidor cerrándose: se descarta la conexión
+            pass
+        finally:
+            writer.close()
+
+    if path is not None:
+        server = await asyncio.start_unix_server(handle, path)
+    else:
+        server = await asyncio.start_server(handle, host, port)
+    async with server:
+        while True:
+            yield await queue.get()
+
+
+async def print_results(queue, out=sys.stdout):
+    """Suscriptor de ejemplo: escribe cada resultado como una línea JSON"""
+    while True:
+        result = await queue.get()
+        out.write(json.dumps(result.to_dict(), ensure_ascii=False) + '\n')
+        out.flush()
+
+
+async def main(args):
+    from bonos.indices import load_indexed_store
+
+    store, errores = load_indexed_store(args.planilla, args.indices)
+    for bono, error in errores.items():
+        print(f"{bono}: {error}", file=sys.stderr)
+    settlement = datetime.date.fromisoformat(args.liquidacion)
+    feed = QuoteFeed(store, settlement, args.base)
+    if args.metricas:
+        register_cache('cronogramas', lambda: feed.schedules.cache_info()[:2])
+        serve(args.metricas)
+    printer = asyncio.ensure_future(print_results(feed.subscribe()))
+
+    sources = []
+    if args.replay:
+        sources.append(replay_source(args.replay, settlement, args.velocidad))
+    if args.tail:
+        sources.append(tail_source(args.tail, settlement))
+    if args.socket:
+        host, _, port = args.socket.rpartition(':')
+        sources.append(socket_source(host or '127.0.0.1', int(port), settlement))
+    if args.unix:
+        sources.append(socket_source(settlement=settlement, path=args.unix))
+    if not sources:
+        raise SystemExit("Indicar al menos una fuente: --replay, --tail, --socket o --unix")
+
+    try:
+        await feed.run(*sources)
+        # Dejar que el suscriptor escriba lo último publicado
+        await asyncio.sleep(0)
+    finally:
+        printer.cancel()
+    print(f"Cotizaciones recibidas: {feed.recibidas}, calculadas: {feed.calculadas}", file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recalcula los bonos al llegar cada cotización")
+    parser.add_argument('--planilla', default='bonos_flujos.xlsx')
+    parser.add_argument('--indices', help="fijaciones de CER, BADLAR y TAMAR para ajustar los bonos indexados")
+    parser.add_argument('--liquidacion', default=datetime.date.today().isoformat(),
+                        help="fecha de liquidación por defecto (AAAA-MM-DD)")
+    parser.add_argument('--base', default='ACT/365', help="base de cálculo de la TIR")
+    parser.add_argument('--replay', help="archivo de ticks a reproducir")
+    parser.add_argument('--velocidad', type=float, default=None,
+                        help="factor de velocidad de la reproducción (por defecto, sin esperas)")
+    parser.add_argument('--tail', help="archivo a seguir a medida que crece")
+    parser.add_argument('--socket', help="HOST:PUERTO donde escuchar cotizaciones")
+    parser.add_argument('--unix', help="socket Unix donde escuchar cotizaciones")
+    parser.add_argument('--metricas', type=int, help="puerto donde exponer las métricas del cálculo")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,332 @@
+"""Generación de flujos de bonos regulares a partir de sus condiciones de emisión
+
+En lugar de cargar cada flujo en la planilla, un bono plain-vanilla se describe con emisión,
+vencimiento, cupón, frecuencia, amortización (bullet, lineal o escalonada), regla de período
+irregular y ajuste por días hábiles. Los flujos se generan recién cuando se piden, como arrays
+tipados con el mismo formato que las filas del store, y quedan cacheados por condiciones.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from bonos.daycount import normalize_basis, year_fraction
+from bonos.metrics import register_cache, timed
+from bonos.schedule import day_number
+from bonos.store import BondFlows, FlowStore, file_hash, open_snapshot, save_snapshot
+
+AMORTIZACIONES = ('bullet', 'lineal', 'escalonada')
+
+# Período irregular: al inicio (cronograma hacia atrás desde el vencimiento) o al final
+STUBS = ('corto_inicial', 'largo_inicial', 'corto_final', 'largo_final')
+
+# Ajuste por días hábiles de las fechas de pago (roll de np.busday_offset)
+AJUSTES = {
+    'ninguno': None,
+    'siguiente': 'following',
+    'siguiente_modificado': 'modifiedfollowing',
+    'anterior': 'preceding',
+    'anterior_modificado': 'modifiedpreceding',
+}
+
+# Cronogramas generados que se mantienen en memoria
+MAX_CRONOGRAMAS = 65536
+
+# Columnas del store que un store generado arma recién cuando se piden
+COLUMNAS_FLUJOS = ('offsets', 'fechas', 'tasa_cupon', 'cupon_porcentaje', 'pago_capital_porcentaje', 'flujo_total')
+
+
+@dataclass(frozen=True)
+class IssueTerms:
+    """Condiciones de emisión de un bono regular
+
+    Fechas como datetime.date (o días desde 1970-01-01) y tasa_cupon anual en tanto por uno.
+    cuotas es la cantidad de cuotas iguales al final en la amortización lineal (todas las
+    fechas de pago si es 0) y pasos las cuotas ((fecha, porcentaje), ...) de la escalonada.
+    primer_cupon fija la primera fecha de pago. Si cae en la grilla hacia atrás desde el
+    vencimiento la recorta; si no (o con stub final), la grilla regular sigue desde el primer
+    cupón, el primer período va de la emisión a esa fecha y el vencimiento cierra un último
+    período corto (o largo con stub='largo_final').
+    indice es el ajuste del bono con la sintaxis de bonos.indices ('CER', 'BADLAR+5', ...).
+    """
+    nombre_bono: str
+    emision: object
+    vencimiento: object
+    tasa_cupon: float
+    periodicidad: int = 2
+    base_calculo: str = 'ACT/365'
+    amortizacion: str = 'bullet'
+    cuotas: int = 0
+    pasos: tuple = ()
+    stub: str = 'corto_inicial'
+    primer_cupon: object = None
+    ajuste: str = 'ninguno'
+    feriados: tuple = ()
+    tipo_bono: str = 'Generado'
+    indice: str = ''
+
+
+def add_months(day, months):
+    """Suma meses a una fecha (días desde 1970-01-01), vectorizado en months
+
+    Si el día no existe en el mes de destino se usa el último día del mes.
+    """
+    date = np.datetime64(int(day), 'D')
+    month = date.astype('datetime64[M]')
+    day_of_month = (date - month.astype('datetime64[D]')).astype(np.int64)
+    target = month + np.asarray(months, dtype=np.int64)
+    last_day = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64) - 1
+    return (target.astype('datetime64[D]') + np.minimum(day_of_month, last_day)).astype(np.int64)
+
+def coupon_dates(issue, maturity, frequency, stub='corto_inicial', first_coupon=None):
+    """Fechas de pago sin ajustar (posteriores a la emisión, la última es el vencimiento)
+
+    Devuelve también la grilla regular completa, que extiende el cronograma un período más
+    allá de cada extremo (la usa ACT/ACT ICMA para medir los períodos irregulares).
+    """
+    step = 12 // frequency
+    k = np.arange(months_between(issue, maturity) // step + 3)
+    backward = add_months(maturity, -step * k)[::-1]
+
+    if stub in ('corto_inicial', 'largo_inicial') and (first_coupon is None or first_coupon in backward):
+        # Hacia atrás desde el vencimiento: el período irregular queda al principio
+        grid = backward
+        dates = grid[grid > issue]
+        if first_coupon is not None:
+            dates = dates[dates >= first_coupon]
+        elif stub == 'largo_inicial' and len(dates) > 1 and add_months(dates[0], -step) < issue:
+            dates = dates[1:]
+        return dates, grid[np.searchsorted(grid, issue, side='right') - 1:]
+
+    if first_coupon is not None:
+        # Hacia adelante desde el primer cupón: la emisión y el vencimiento quedan fuera de grilla
+        grid = add_months(first_coupon, step * np.arange(-(months_between(issue, first_coupon) // step + 2), len(k)))
+        dates = np.append(grid[(grid >= first_coupon) & (grid < maturity)], maturity)
+        first = 1
+    else:
+        # Hacia adelante desde la emisión: el período irregular queda al final
+        grid = add_months(issue, step * k)
+        dates = np.append(grid[(grid > issue) & (grid < maturity)], maturity)
+        first = 0
+    if stub == 'largo_final' and len(dates) > first + 1 and add_months(dates[-2], step) > maturity:
+        dates = np.delete(dates, -2)
+    start = np.searchsorted(grid, issue, side='right') - 1
+    return dates, grid[start:np.searchsorted(grid, maturity, side='left') + 1]
+
+def months_between(start, end):
+    """Meses calendario entre dos fechas (días desde 1970-01-01)"""
+    return int((np.datetime64(int(end), 'D').astype('datetime64[M]')
+                - np.datetime64(int(start), 'D').astype('datetime64[M]')).astype(np.int64))
+
+def amortization(terms, dates):
+    """Pago de capital (por 100 de nominal) en cada fecha de pago sin ajustar"""
+    capital = np.zeros(len(dates))
+    if terms.amortizacion == 'bullet':
+        capital[-1] = 100.0
+    elif terms.amortizacion == 'lineal':
+        cuotas = terms.cuotas or len(dates)
+        if cuotas > len(dates):
+            raise ValueError(f"{terms.nombre_bono}: {cuotas} cuotas y solo {len(dates)} fechas de pago")
+        capital[-cuotas:] = 100.0 / cuotas
+    else:
+        steps = np.array([day_number(fecha) for fecha, _ in terms.pasos], dtype=np.int64)
+        position = np.searchsorted(dates, steps)
+        if len(steps) == 0 or (position >= len(dates)).any() or (dates[np.minimum(position, len(dates) - 1)] != steps).any():
+            raise ValueError(f"{terms.nombre_bono}: cada paso de amortización debe caer en una fecha de pago")
+        np.add.at(capital, position, [float(pct) for _, pct in terms.pasos])
+        if abs(capital.sum() - 100.0) > 1e-9:
+            raise ValueError(f"{terms.nombre_bono}: la amortización suma {capital.sum():g}, no 100")
+    return capital
+
+@lru_cache(maxsize=MAX_CRONOGRAMAS)
+def generate_flows(terms):
+    """Genera los flujos de un bono a partir de sus condiciones (cacheado por condiciones)
+
+    La primera fila es la emisión sin pagos, como en la planilla. Los cupones devengan entre
+    fechas sin ajustar sobre el capital residual y se pagan en la fecha ajustada por días hábiles.
+    """
+    issue, maturity = day_number(terms.emision), day_number(terms.vencimiento)
+    if maturity <= issue:
+        raise ValueError(f"{terms.nombre_bono}: el vencimiento debe ser posterior a la emisión")
+    if terms.periodicidad not in (1, 2, 3, 4, 6, 12):
+        raise ValueError(f"{terms.nombre_bono}: periodicidad {terms.periodicidad} no soportada")
+    if terms.amortizacion not in AMORTIZACIONES or terms.stub not in STUBS or terms.ajuste not in AJUSTES:
+        raise ValueError(f"{terms.nombre_bono}: amortización, stub o ajuste desconocidos")
+
+    first_coupon = None if terms.primer_cupon is None else day_number(terms.primer_cupon)
+    if first_coupon is not None and not issue < first_coupon <= maturity:
+        raise ValueError(f"{terms.nombre_bono}: el primer cupón debe caer entre la emisión y el vencimiento")
+    dates, grid = coupon_dates(issue, maturity, terms.periodicidad, terms.stub, first_coupon)
+    capital = amortization(terms, dates)
+
+    # Cupón de cada período sobre el capital residual al inicio del período
+    starts = np.concatenate(([issue], dates[:-1]))
+    residual = 100.0 - np.concatenate(([0.0], np.cumsum(capital)[:-1]))
+    if normalize_basis(terms.base_calculo) == 'ACT/ACT ICMA':
+        years = year_fraction(starts, dates, terms.base_calculo, schedule=grid, frequency=terms.periodicidad)
+    else:
+        years = year_fraction(starts, dates, terms.base_calculo)
+    cupon = terms.tasa_cupon * residual * years
+
+    roll = AJUSTES[terms.ajuste]
+    if roll is not None:
+        dates = np.busday_offset(dates.astype('datetime64[D]'), 0, roll=roll,
+                                 holidays=[np.datetime64(f, 'D') for f in terms.feriados]).astype(np.int64)
+
+    flows = BondFlows(
+        np.concatenate(([issue], dates)),
+        np.full(len(dates) + 1, float(terms.tasa_cupon)),
+        np.concatenate(([0.0], cupon)),
+        np.concatenate(([0.0], capital)),
+        np.concatenate(([0.0], cupon + capital)),
+    )
+    # Los arrays se comparten desde la caché: de solo lectura
+    for array in flows:
+        array.flags.writeable = False
+    return flows
+
+class GeneratedStore(FlowStore):
+    """Store de bonos generados desde sus condiciones: los flujos se generan al pedirlos
+
+    Los datos por bono están desde el principio. bond_flows genera solo el bono pedido (y
+    queda en la caché de generate_flows); las columnas completas (offsets, fechas, ...) se
+    arman la primera vez que se lee una de ellas, y entonces se llama a on_materialize.
+    Las condiciones inválidas se informan al generar ese bono.
+    """
+
+    def __init__(self, terms, tipos_disponibles=None, on_materialize=None):
+        self.terms = list(terms)
+        self.nombres = [t.nombre_bono for t in self.terms]
+        self.bases = [t.base_calculo for t in self.terms]
+        self.periodicidades = np.asarray([t.periodicidad for t in self.terms], dtype=np.int64)
+        self.tipos_bono = [t.tipo_bono for t in self.terms]
+        self.indices = [t.indice for t in self.terms]
+        self.tipos_disponibles = list(tipos_disponibles if tipos_disponibles is not None
+                                      else sorted(set(self.tipos_bono)))
+        self.sha1 = None
+        self.ajuste = None
+        self.index = {nombre: i for i, nombre in enumerate(self.nombres)}
+        self._frame = None
+        self.on_materialize = on_materialize
+
+    def __getattr__(self, name):
+        # Solo se llama si el atributo no existe: las columnas antes de generarlas
+        if name in COLUMNAS_FLUJOS and 'terms' in self.__dict__:
+            self._materialize()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    @timed('generacion_flujos')
+    def _materialize(self):
+        """Genera todos los bonos y arma las columnas del store"""
+        flows = [generate_flows(t) for t in self.terms]
+        offsets = np.concatenate(([0], np.cumsum([len(f.fechas) for f in flows]))).astype(np.int64)
+
+        def column(i, dtype):
+            return np.concatenate([f[i] for f in flows]).astype(dtype) if flows else np.zeros(0, dtype=dtype)
+
+        columns = dict(zip(COLUMNAS_FLUJOS, [offsets, column(0, np.int64)] +
+                           [column(i, np.float64) for i in range(1, len(BondFlows._fields))]))
+        self.__dict__.update(columns)
+        if self.on_materialize is not None:
+            self.on_materialize(self)
+
+    def bond_flows(self, bono):
+        """Flujos de un bono: generados solo para ese bono mientras el store no se armó completo"""
+        if 'fechas' in self.__dict__:
+            return super().bond_flows(bono)
+        return generate_flows(self.terms[self.index[bono]])
+
+def store_from_terms(terms, tipos_disponibles=None):
+    """Store de una lista de condiciones de emisión; los flujos se generan al pedirlos"""
+    terms = list(terms)
+    nombres = [t.nombre_bono for t in terms]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("Hay bonos repetidos en las condiciones de emisión")
+
+    register_cache('cronogramas_generados',
+                   lambda: (generate_flows.cache_info().hits, generate_flows.cache_info().misses))
+    return GeneratedStore(terms, tipos_disponibles)
+
+
+def parse_steps(text):
+    """Lee los pasos de amortización escalonada: 'AAAA-MM-DD:porcentaje|AAAA-MM-DD:porcentaje'"""
+    steps = []
+    for step in str(text or '').split('|'):
+        if step.strip():
+            fecha, _, pct = step.partition(':')
+            steps.append((day_number(fecha.strip()), float(pct.replace(',', '.'))))
+    return tuple(steps)
+
+def read_terms(path, feriados=()):
+    """Lee la tabla de condiciones de emisión (CSV con ';', Parquet o Excel con encabezados)
+
+    Columnas obligatorias: nombre_bono, emision, vencimiento, tasa_cupon. Opcionales:
+    periodicidad, base_calculo, amortizacion, cuotas, pasos, stub, primer_cupon, ajuste, tipo_bono
+    e indice.
+    feriados se aplica a todos los bonos al ajustar por días hábiles.
+    """
+    import pandas as pd
+
+    from bonos.ingest import parse_dates, parse_numbers
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        table = pd.read_parquet(path)
+    elif extension in ('.csv', '.txt'):
+        table = pd.read_csv(path, sep=';', dtype=str, keep_default_na=False)
+    else:
+        table = pd.read_excel(path, dtype=str, keep_default_na=False)
+
+    missing = {'nombre_bono', 'emision', 'vencimiento', 'tasa_cupon'} - set(table.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas en las condiciones de emisión: {', '.join(sorted(missing))}")
+
+    emision, valid_issue = parse_dates(table['emision'].to_numpy(dtype=object))
+    vencimiento, valid_maturity = parse_dates(table['vencimiento'].to_numpy(dtype=object))
+    tasa = parse_numbers(table['tasa_cupon'].to_numpy(dtype=object))
+    invalid = ~(valid_issue & valid_maturity & np.isfinite(tasa))
+    if invalid.any():
+        raise ValueError(f"Fechas o tasa inválidas en las filas {np.flatnonzero(invalid)[:10].tolist()}")
+
+    def optional(column, default, convert=str):
+        if column not in table.columns:
+            return [default] * len(table)
+        return [convert(v) if str(v).strip() not in ('', 'nan', 'None') else default
+                for v in table[column].to_numpy(dtype=object)]
+
+    feriados = tuple(sorted(day_number(f) for f in feriados))
+    return [
+        IssueTerms(str(nombre).strip(), int(issue), int(maturity), float(rate), periodicidad, base.strip(),
+                   amort.strip().lower(), cuotas, pasos, stub.strip().lower(), first, ajuste.strip().lower(),
+                   feriados, tipo.strip(), indice.strip())
+        for nombre, issue, maturity, rate, periodicidad, base, amort, cuotas, pasos, stub, first, ajuste, tipo, indice in zip(
+            table['nombre_bono'], emision, vencimiento, tasa,
+            optional('periodicidad', 2, lambda v: int(float(v))),
+            optional('base_calculo', 'ACT/365'),
+            optional('amortizacion', 'bullet'),
+            optional('cuotas', 0, lambda v: int(float(v))),
+            optional('pasos', (), parse_steps),
+            optional('stub', 'corto_inicial'),
+            optional('primer_cupon', None, lambda v: day_number(v.strip())),
+            optional('ajuste', 'ninguno'),
+            optional('tipo_bono', 'Generado'),
+            optional('indice', ''),
+        )
+    ]
+
+def load_terms(path, feriados=()):
+    """Carga un store desde la tabla de condiciones, con el mismo snapshot compilado que load_store"""
+    stat = os.stat(path)
+    extra = {'feriados': sorted(day_number(f) for f in feriados)}
+    store = open_snapshot(path, stat, extra)
+    if store is not None:
+        return store
+
+    # Sin snapshot vigente los flujos se generan al pedirlos; el snapshot se escribe cuando
+    # el store se arma completo
+    store = store_from_terms(read_terms(path, feriados))
+    store.sha1 = file_hash(path)
+    store.on_materialize = lambda generated: save_snapshot(generated, path, stat, extra)
+    return store
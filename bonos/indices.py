@@ -0,0 +1,366 @@
+"""Bonos ajustables por CER y de tasa variable (BADLAR, TAMAR): fijaciones y proyección
+
+El índice de cada bono se declara en la columna E de su fila de cabecera (o en la columna
+indice de CSV, Parquet y condiciones de emisión):
+
+    CER                          capital y cupones por CER(pago - 10 hábiles) / CER(emisión - 10 hábiles)
+    BADLAR+5                     cupón = promedio de BADLAR del período (10 hábiles antes) + 5%
+    TAMAR+3;piso=20;techo=60     tasa del cupón acotada entre 20% y 60%
+    BADLAR;rezago=5;promedio=0   fijación puntual 5 hábiles antes del inicio del período
+
+Fijaciones y proyección salen de un archivo local con columnas indice, fecha y valor (tasas en
+porcentaje anual). Pasada la última fecha las tasas quedan constantes y los índices de nivel
+crecen al ritmo de los últimos 30 días.
+"""
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from bonos.daycount import normalize_basis, year_fraction
+from bonos.metrics import register_cache, timed
+from bonos.schedule import day_number
+from bonos.store import FlowStore, file_hash
+
+# Tipo de los índices conocidos: 'nivel' ajusta capital y cupones, 'tasa' fija el cupón
+TIPOS_INDICE = {'CER': 'nivel', 'UVA': 'nivel', 'BADLAR': 'tasa', 'TAMAR': 'tasa'}
+
+# Rezago por defecto de las fijaciones, en días hábiles
+REZAGO_HABILES = 10
+
+# Días con los que se mide el crecimiento para extrapolar los índices de nivel
+DIAS_TENDENCIA = 30
+
+# Índice de un bono: nombre, margen, piso y techo en tanto por uno, rezago en días hábiles
+IndexSpec = namedtuple('IndexSpec', ['indice', 'margen', 'rezago', 'piso', 'techo', 'promedio'])
+
+
+def parse_percent(text):
+    return float(str(text).strip().rstrip('%').replace(',', '.')) / 100.0
+
+def parse_index_spec(text):
+    """Lee el índice de un bono ('BADLAR+5;piso=20', ...); None si el bono no ajusta
+
+    Margen, piso y techo se escriben en porcentaje anual.
+    """
+    text = str(text or '').strip()
+    if not text or text.lower() in ('nan', 'none'):
+        return None
+
+    head, *options = [part.strip() for part in text.split(';')]
+    match = re.fullmatch(r'([A-Za-z_]+)\s*(?:([+-])\s*([\d.,]+%?))?', head)
+    if match is None:
+        raise ValueError(f"Índice inválido: {text}")
+    values = dict((key.strip().lower(), value.strip()) for key, _, value in (o.partition('=') for o in options))
+    if set(values) - {'rezago', 'piso', 'techo', 'promedio'}:
+        raise ValueError(f"Opciones desconocidas en el índice: {text}")
+
+    try:
+        margen = 0.0 if match.group(2) is None else parse_percent(match.group(3))
+        return IndexSpec(
+            match.group(1).upper(),
+            -margen if match.group(2) == '-' else margen,
+            int(values.get('rezago', REZAGO_HABILES)),
+            parse_percent(values['piso']) if 'piso' in values else -np.inf,
+            parse_percent(values['techo']) if 'techo' in values else np.inf,
+            values.get('promedio', '1').lower() not in ('0', 'no', 'false'),
+        )
+    except ValueError:
+        raise ValueError(f"Índice inválido: {text}")
+
+
+class IndexSeries:
+    """Valores diarios de un índice (fijaciones y proyección) con búsquedas y promedios vectorizados"""
+
+    def __init__(self, nombre, fechas, valores, tipo='nivel'):
+        fechas = np.asarray(fechas, dtype=np.int64)
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(fechas) == 0:
+            raise ValueError(f"El índice {nombre} no tiene valores")
+        order = np.argsort(fechas, kind='stable')
+        fechas, valores = fechas[order], valores[order]
+
+        # Con fechas repetidas vale la última fila
+        last = np.append(fechas[1:] != fechas[:-1], True)
+        self.nombre = nombre
+        self.tipo = tipo
+        self.fechas = fechas[last]
+        self.valores = valores[last]
+
+        # Valor de cada día entre la primera y la última fecha: el último publicado
+        days = np.arange(self.fechas[0], self.fechas[-1] + 1)
+        self.diario = self.valores[np.searchsorted(self.fechas, days, side='right') - 1]
+        self.acumulado = np.concatenate(([0.0], np.cumsum(self.diario)))
+
+        # Crecimiento diario con el que se extrapolan los índices de nivel
+        window = min(DIAS_TENDENCIA, len(self.diario) - 1)
+        if tipo == 'nivel' and window > 0:
+            self.crecimiento = np.log(self.diario[-1] / self.diario[-1 - window]) / window
+        else:
+            self.crecimiento = 0.0
+
+    def check(self, days):
+        if len(days) and days.min() < self.fechas[0]:
+            raise ValueError(f"{self.nombre} no tiene valores antes de {day_to_iso(self.fechas[0])}")
+
+    def values_at(self, days):
+        """Valor del índice en cada fecha (días desde 1970-01-01)"""
+        days = np.asarray(days, dtype=np.int64)
+        self.check(days)
+        inside = np.minimum(days, self.fechas[-1]) - self.fechas[0]
+        beyond = np.maximum(days - self.fechas[-1], 0)
+        return self.diario[inside] * np.exp(self.crecimiento * beyond)
+
+    def averages(self, start, end):
+        """Promedio de los valores diarios en [start, end); el valor en start si el período está vacío
+
+        Después de la última fecha se promedia el último valor (pensado para índices de tasa).
+        """
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        self.check(start)
+        first, after = self.fechas[0], self.fechas[-1] + 1
+        total = (self.acumulado[np.clip(end, first, after) - first]
+                 - self.acumulado[np.clip(start, first, after) - first])
+        total += np.maximum(end - np.maximum(start, after), 0) * self.diario[-1]
+        length = end - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(length > 0, total / length, self.values_at(start))
+
+
+def day_to_iso(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+class IndexSet:
+    """Índices cargados y caché de fijaciones por (índice, fecha de fijación)"""
+
+    def __init__(self, series, feriados=(), sha1=None):
+        self.series = {s.nombre: s for s in series}
+        self.feriados = np.array(sorted(day_number(f) for f in feriados), dtype=np.int64).astype('datetime64[D]')
+        # SHA-1 del archivo de índices (None si no salió de un archivo)
+        self.sha1 = sha1
+        self._fijaciones = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, nombre):
+        return nombre in self.series
+
+    def lagged(self, days, lag):
+        """Fechas corridas lag días hábiles hacia atrás"""
+        days = np.asarray(days, dtype=np.int64)
+        if lag == 0:
+            return days
+        return np.busday_offset(days.astype('datetime64[D]'), -lag, roll='backward',
+                                holidays=self.feriados).astype(np.int64)
+
+    def fixings(self, nombre, start, end=None):
+        """Valor fijado de cada período: el índice en start o, con end, su promedio en [start, end)
+
+        Cada fijación se calcula una sola vez; las que faltan en la caché se resuelven juntas.
+        """
+        series = self.series.get(nombre)
+        if series is None:
+            raise KeyError(f"No hay valores cargados para el índice {nombre}")
+        start = np.asarray(start, dtype=np.int64)
+        ends = start if end is None else np.asarray(end, dtype=np.int64)
+
+        keys = list(zip([nombre] * len(start), start.tolist(), ends.tolist()))
+        values = np.array([self._fijaciones.get(key, np.nan) for key in keys], dtype=np.float64)
+        missing = np.flatnonzero(np.isnan(values))
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if len(missing):
+            if end is None:
+                computed = series.values_at(start[missing])
+            else:
+                computed = series.averages(start[missing], ends[missing])
+            values[missing] = computed
+            self._fijaciones.update(zip((keys[i] for i in missing), computed.tolist()))
+        return values
+
+    def cache_info(self):
+        return self.hits, self.misses, len(self._fijaciones)
+
+
+def load_indices(path, feriados=()):
+    """Lee fijaciones y proyección de un CSV (;) o Parquet con columnas indice, fecha y valor
+
+    Las tasas (BADLAR, TAMAR) van en porcentaje anual. Una columna tipo opcional ('nivel' o
+    'tasa') define el tipo de índices que no están en TIPOS_INDICE.
+    """
+    import pandas as pd
+
+    from bonos.ingest import parse_dates, parse_numbers
+
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        table = pd.read_parquet(path).astype(str)
+    else:
+        table = pd.read_csv(path, sep=';', dtype=str, keep_default_na=False)
+    missing = {'indice', 'fecha', 'valor'} - set(table.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas en el archivo de índices: {', '.join(sorted(missing))}")
+
+    nombres = table['indice'].str.strip().str.upper().to_numpy(dtype=object)
+    days, valid = parse_dates(table['fecha'].to_numpy(dtype=object))
+    values = parse_numbers(table['valor'].to_numpy(dtype=object))
+    valid = valid & np.isfinite(values)
+    tipos = table['tipo'].str.strip().str.lower().to_numpy(dtype=object) if 'tipo' in table.columns else None
+
+    series = []
+    for nombre in dict.fromkeys(nombres[valid]):
+        selected = valid & (nombres == nombre)
+        tipo = TIPOS_INDICE.get(nombre) or (tipos[selected][0] if tipos is not None else 'tasa')
+        scale = 0.01 if tipo == 'tasa' else 1.0
+        series.append(IndexSeries(nombre, days[selected], values[selected] * scale, tipo))
+
+    indices = IndexSet(series, feriados, file_hash(path))
+    register_cache('fijaciones_indices', lambda: indices.cache_info()[:2])
+    return indices
+
+
+class IndexAdjustment:
+    """Coeficiente de ajuste de los bonos indexados por nivel (CER, UVA) a cualquier fecha
+
+    Vale índice(fecha - rezago) / índice(emisión - rezago): el mismo coeficiente que multiplica
+    los flujos del bono, así que el capital ajustado dividido por el coeficiente de su fecha
+    vuelve al nominal. Antes de la emisión, y para los bonos que no ajustan, vale 1.
+    """
+
+    def __init__(self, indices):
+        self.indices = indices
+        # bono -> (índice, rezago, emisión, valor base)
+        self.bonds = {}
+
+    def __contains__(self, bono):
+        return bono in self.bonds
+
+    def __len__(self):
+        return len(self.bonds)
+
+    def add(self, bono, indice, rezago, emision, base):
+        self.bonds[bono] = (indice, rezago, int(emision), float(base))
+
+    def coefficients(self, bonos, days):
+        """Coeficiente de cada par (bono, fecha); bonos y days son arrays del mismo largo"""
+        bonos = np.asarray(bonos, dtype=object)
+        days = np.asarray(days, dtype=np.int64)
+        result = np.ones(len(days))
+        groups = {}
+        for bono in set(bonos.tolist()) & self.bonds.keys():
+            groups.setdefault(self.bonds[bono][:2], []).append(bono)
+
+        # Una búsqueda de fijaciones por índice y rezago, sobre las fechas distintas
+        for (indice, rezago), members in groups.items():
+            selected = np.flatnonzero(np.isin(bonos, members))
+            emision = np.array([self.bonds[b][2] for b in bonos[selected]], dtype=np.int64)
+            base = np.array([self.bonds[b][3] for b in bonos[selected]])
+            lagged = self.indices.lagged(np.maximum(days[selected], emision), rezago)
+            unique, inverse = np.unique(lagged, return_inverse=True)
+            result[selected] = self.indices.fixings(indice, unique)[inverse] / base
+        return result
+
+    def bond_coefficients(self, bono, days):
+        """Coeficiente de un bono en cada fecha"""
+        days = np.atleast_1d(np.asarray(days, dtype=np.int64))
+        return self.coefficients(np.full(len(days), bono, dtype=object), days)
+
+
+def project_flows(spec, indices, fechas, tasa_cupon, cupon, capital, base='ACT/365', periodicidad=2):
+    """Ajusta los flujos de un bono (filas ordenadas por fecha; la primera es la emisión)
+
+    Todos los cupones del bono se fijan con una sola operación sobre arrays. Devuelve
+    (tasa_cupon, cupon, capital) ajustados.
+    """
+    fechas = np.asarray(fechas, dtype=np.int64)
+    tasa_cupon = np.array(tasa_cupon, dtype=np.float64)
+    cupon = np.array(cupon, dtype=np.float64)
+    capital = np.array(capital, dtype=np.float64)
+    series = indices.series.get(spec.indice)
+    if series is None:
+        raise KeyError(f"No hay valores cargados para el índice {spec.indice}")
+
+    if series.tipo == 'nivel':
+        # Coeficiente de cada pago contra el valor del índice a la emisión
+        values = indices.fixings(spec.indice, indices.lagged(fechas, spec.rezago))
+        factor = values / values[0]
+        return tasa_cupon, cupon * factor, capital * factor
+
+    # Tasa variable: cada fila paga el período que empieza en la fila anterior. Los períodos
+    # anteriores a las fijaciones cargadas conservan el cupón de la planilla
+    starts, ends = indices.lagged(fechas[:-1], spec.rezago), indices.lagged(fechas[1:], spec.rezago)
+    known = np.flatnonzero(starts >= series.fechas[0]) + 1
+    if spec.promedio:
+        rate = indices.fixings(spec.indice, starts[known - 1], ends[known - 1])
+    else:
+        rate = indices.fixings(spec.indice, starts[known - 1])
+    rate = np.clip(rate + spec.margen, spec.piso, spec.techo)
+
+    # Cupón sobre el capital residual al inicio de cada período
+    residual = 100.0 - np.cumsum(capital)[known - 1]
+    if normalize_basis(base) == 'ACT/ACT ICMA':
+        years = year_fraction(fechas[known - 1], fechas[known], base, schedule=fechas, frequency=periodicidad)
+    else:
+        years = year_fraction(fechas[known - 1], fechas[known], base)
+    tasa_cupon[known] = rate
+    cupon[known] = rate * residual * years
+    if len(known) and known[0] == 1:
+        tasa_cupon[0] = rate[0]
+    return tasa_cupon, cupon, capital
+
+@timed('proyeccion_indices')
+def project_store(store, indices):
+    """Store con los flujos de los bonos indexados ajustados; devuelve (store, errores por bono)
+
+    Los bonos sin índice quedan igual. Los que no se pueden ajustar (índice sin valores o
+    emisión anterior a las fijaciones) conservan los flujos de la planilla y se informan.
+    """
+    projected = [(i, text) for i, text in enumerate(store.indices) if str(text).strip()]
+    if not projected:
+        return store, {}
+
+    columns = {name: np.array(getattr(store, name), dtype=np.float64)
+               for name in ('tasa_cupon', 'cupon_porcentaje', 'pago_capital_porcentaje', 'flujo_total')}
+    fechas = np.asarray(store.fechas)
+    errores = {}
+    adjustment = IndexAdjustment(indices)
+    for i, text in projected:
+        start, end = store.offsets[i], store.offsets[i + 1]
+        rows = start + np.argsort(fechas[start:end], kind='stable')
+        try:
+            spec = parse_index_spec(text)
+            tasa, cupon, capital = project_flows(
+                spec, indices, fechas[rows], columns['tasa_cupon'][rows],
+                columns['cupon_porcentaje'][rows], columns['pago_capital_porcentaje'][rows],
+                store.bases[i], int(store.periodicidades[i]))
+        except (KeyError, ValueError) as e:
+            errores[store.nombres[i]] = str(e).strip('"\'')
+            continue
+        if indices.series[spec.indice].tipo == 'nivel':
+            issue = fechas[rows[0]]
+            adjustment.add(store.nombres[i], spec.indice, spec.rezago, issue,
+                           indices.fixings(spec.indice, indices.lagged([issue], spec.rezago))[0])
+        columns['tasa_cupon'][rows] = tasa
+        columns['cupon_porcentaje'][rows] = cupon
+        columns['pago_capital_porcentaje'][rows] = capital
+        columns['flujo_total'][rows] = cupon + capital
+
+    # El origen combina planilla e índices: la caché de resultados se invalida si cambia cualquiera
+    sha1 = f"{store.sha1}|{indices.sha1}" if store.sha1 and indices.sha1 else None
+    return FlowStore(
+        store.nombres, store.bases, store.periodicidades, store.tipos_bono, store.offsets, fechas,
+        columns['tasa_cupon'], columns['cupon_porcentaje'], columns['pago_capital_porcentaje'],
+        columns['flujo_total'], store.tipos_disponibles, sha1, store.indices,
+        adjustment if len(adjustment) else None
+    ), errores
+
+def load_indexed_store(path, indices_path=None):
+    """load_store y, con un archivo de índices, los bonos indexados ajustados; devuelve (store, errores)"""
+    from bonos.store import load_store
+
+    store = load_store(path)
+    if indices_path is None or not any(store.indices):
+        return store, {}
+    return project_store(store, load_indices(indices_path))
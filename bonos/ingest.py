@@ -0,0 +1,409 @@
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from bonos.metrics import timed
+from bonos.store import (
+    COLUMNAS_NUMERICAS,
+    VERSION_SNAPSHOT,
+    FlowStore,
+    file_hash,
+    snapshot_dir,
+    write_snapshot_meta,
+)
+
+# Filas por bloque leído del archivo
+FILAS_POR_BLOQUE = 100_000
+
+# Periodicidades posibles al inferirla por la distancia entre fechas
+PERIODICIDADES = np.array([1, 2, 3, 4, 6, 12])
+
+# Columnas por flujo que se vuelcan a disco durante la ingesta
+COLUMNAS_INGESTA = {
+    'codigos': np.int64,
+    'fechas': np.int64,
+    'tasa_cupon': np.float64,
+    'cupon_porcentaje': np.float64,
+    'pago_capital_porcentaje': np.float64,
+    'flujo_total': np.float64,
+}
+
+
+class IngestReport:
+    """Resumen de una ingesta: filas leídas, aceptadas y rechazadas por motivo"""
+
+    def __init__(self):
+        self.filas = 0
+        self.validas = 0
+        self.rechazadas = Counter()
+
+    def __repr__(self):
+        return (f"IngestReport(filas={self.filas}, validas={self.validas}, "
+                f"rechazadas={dict(self.rechazadas)})")
+
+
+def parse_numbers(values):
+    """Convierte una columna a float aceptando coma decimal; vacíos en 0 y texto inválido en NaN"""
+    import pandas as pd
+
+    series = pd.Series(values, dtype=object)
+    text = series.astype(str).str.strip().str.replace(',', '.', regex=False)
+    empty = series.isna().to_numpy() | text.isin(['', 'nan', 'None']).to_numpy()
+    numbers = pd.to_numeric(text.where(~empty, '0'), errors='coerce').to_numpy(dtype=np.float64)
+    return numbers
+
+def parse_dates(values):
+    """Convierte una columna de fechas a días desde 1970-01-01; las inválidas quedan en None (máscara)"""
+    import pandas as pd
+
+    dates = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+    valid = dates.notna().to_numpy()
+    days = np.zeros(len(dates), dtype=np.int64)
+    days[valid] = dates[valid].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return days, valid
+
+
+class StoreWriter:
+    """Compila flujos que llegan por bloques en un snapshot del store sin tenerlos todos en memoria
+
+    Cada bloque validado se agrega a archivos binarios por columna; al cerrar se ordenan por
+    bono y fecha columna por columna sobre mapas de memoria y se escriben los .npy del snapshot.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.staging = os.path.join(directory, 'ingesta')
+        shutil.rmtree(self.staging, ignore_errors=True)
+        os.makedirs(self.staging)
+        self.files = {name: open(os.path.join(self.staging, f'{name}.bin'), 'wb')
+                      for name in COLUMNAS_INGESTA}
+        self.rows = 0
+
+        # Datos por bono (None si el archivo no los trae y hay que inferirlos)
+        self.codigos = {}
+        self.bases = []
+        self.periodicidades = []
+        self.tipos_bono = []
+        self.indices = []
+        self.report = IngestReport()
+
+    def _code(self, nombre, base, periodicidad, tipo, indice=None):
+        code = self.codigos.get(nombre)
+        if code is None:
+            code = self.codigos[nombre] = len(self.bases)
+            self.bases.append(base)
+            self.periodicidades.append(periodicidad)
+            self.tipos_bono.append(tipo)
+            self.indices.append(indice)
+        return code
+
+    def append_store(self, store):
+        """Agrega todos los flujos de un store ya compilado (para sumar archivos nuevos)"""
+        counts = np.diff(store.offsets)
+        codes = np.repeat(np.fromiter(
+            (self._code(n, b, int(p), t, i) for n, b, p, t, i in
+             zip(store.nombres, store.bases, store.periodicidades, store.tipos_bono, store.indices)),
+            dtype=np.int64, count=len(store.nombres)), counts)
+        self._write({
+            'codigos': codes,
+            'fechas': np.asarray(store.fechas),
+            **{name: np.asarray(getattr(store, name)) for name in COLUMNAS_NUMERICAS},
+        })
+
+    def append(self, nombres, fechas, pago_capital, cupon, tasa_cupon=None, flujo_total=None,
+               bases=None, periodicidades=None, tipos_bono=None, indices=None):
+        """Valida un bloque de filas y lo agrega; las rechazadas se cuentan en el reporte"""
+        n = len(nombres)
+        self.report.filas += n
+        nombres = np.array(['' if v is None else str(v).strip() for v in nombres], dtype=object)
+        days, valid_date = parse_dates(fechas)
+        capital = parse_numbers(pago_capital)
+        coupon = parse_numbers(cupon)
+        rate = parse_numbers(tasa_cupon) if tasa_cupon is not None else np.full(n, np.nan)
+        total = parse_numbers(flujo_total) if flujo_total is not None else capital + coupon
+
+        # Validación por fila, en orden: el primer motivo que falla es el que se cuenta
+        checks = [
+            ('nombre', (nombres != '') & (nombres != 'nan')),
+            ('fecha', valid_date),
+            ('numero', np.isfinite(capital) & np.isfinite(coupon) & np.isfinite(total)
+             & (np.isfinite(rate) | (tasa_cupon is None))),
+            ('negativo', (capital >= 0) & (coupon >= 0)),
+        ]
+        keep = np.ones(n, dtype=bool)
+        for reason, ok in checks:
+            self.report.rechazadas[reason] += int(np.count_nonzero(keep & ~ok))
+            keep &= ok
+        self.report.validas += int(np.count_nonzero(keep))
+        if not keep.any():
+            return
+
+        # Datos de cabecera por fila; los que falten se infieren al cerrar
+        selected = np.flatnonzero(keep)
+        missing = [None] * n
+        bases = missing if bases is None else bases
+        periodicidades = missing if periodicidades is None else periodicidades
+        tipos_bono = missing if tipos_bono is None else tipos_bono
+        indices = missing if indices is None else indices
+        codes = np.fromiter(
+            (self._code(nombres[i], bases[i], periodicidades[i], tipos_bono[i], indices[i]) for i in selected),
+            dtype=np.int64, count=len(selected))
+        self._write({
+            'codigos': codes,
+            'fechas': days[keep],
+            'tasa_cupon': rate[keep],
+            'cupon_porcentaje': coupon[keep],
+            'pago_capital_porcentaje': capital[keep],
+            'flujo_total': total[keep],
+        })
+
+    def _write(self, columns):
+        for name, dtype in COLUMNAS_INGESTA.items():
+            np.ascontiguousarray(columns[name], dtype=dtype).tofile(self.files[name])
+        self.rows += len(columns['codigos'])
+
+    def close(self, tipos_disponibles, key):
+        """Ordena por bono y fecha, completa los datos inferidos y escribe el snapshot
+
+        Las columnas se reordenan de a una, leyendo los archivos de la ingesta mapeados en
+        memoria y escribiendo cada .npy final mapeado también. Devuelve el store abierto.
+        """
+        for f in self.files.values():
+            f.close()
+        staged = {name: self._staged(name, dtype) for name, dtype in COLUMNAS_INGESTA.items()}
+
+        # Solo códigos, fechas y la permutación quedan enteros en memoria
+        codes = np.asarray(staged.pop('codigos'))
+        fechas = np.asarray(staged.pop('fechas'))
+        order = np.lexsort((fechas, codes))
+        counts = np.bincount(codes, minlength=len(self.bases))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        fechas = fechas[order]
+        del codes
+
+        np.save(os.path.join(self.staging, 'offsets.npy'), offsets)
+        np.save(os.path.join(self.staging, 'fechas.npy'), fechas)
+        for name in COLUMNAS_NUMERICAS:
+            column = open_memmap(os.path.join(self.staging, f'{name}.npy'), mode='w+',
+                                 dtype=np.float64, shape=(self.rows,))
+            column[:] = staged[name][order]
+            column.flush()
+            del column
+        del staged
+
+        periodicidades = infer_frequency(fechas, offsets, self.periodicidades)
+        fill_rate(self.staging, offsets, periodicidades)
+
+        # Se reemplazan archivos enteros: un store abierto sobre el snapshot anterior sigue
+        # leyendo sus columnas, y sin meta.json el snapshot a medio escribir no se usa
+        try:
+            os.remove(os.path.join(self.directory, 'meta.json'))
+        except FileNotFoundError:
+            pass
+        for name in ['offsets', 'fechas'] + COLUMNAS_NUMERICAS:
+            os.replace(os.path.join(self.staging, f'{name}.npy'), os.path.join(self.directory, f'{name}.npy'))
+
+        meta = dict(key)
+        meta.update({
+            'nombres': list(self.codigos),
+            'bases': [b if b else 'ACT/365' for b in self.bases],
+            'periodicidades': periodicidades.tolist(),
+            'tipos_bono': [t if t else 'Sin clasificar' for t in self.tipos_bono],
+            'indices': [str(i).strip() if i is not None and str(i).strip() not in ('nan', 'None') else ''
+                        for i in self.indices],
+            'tipos_disponibles': tipos_disponibles or ["Todos"],
+        })
+        # meta.json se escribe al final: si existe, el snapshot está completo
+        write_snapshot_meta(self.directory, meta)
+        shutil.rmtree(self.staging, ignore_errors=True)
+        return FlowStore.load(self.directory, meta)
+
+    def _staged(self, name, dtype):
+        if self.rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.staging, f'{name}.bin'), dtype=dtype, mode='r', shape=(self.rows,))
+
+
+def infer_frequency(fechas, offsets, known):
+    """Periodicidad de cada bono: la informada o la más cercana a la distancia mediana entre fechas"""
+    result = np.empty(len(known), dtype=np.int64)
+    for i, value in enumerate(known):
+        if value:
+            result[i] = int(value)
+            continue
+        gaps = np.diff(fechas[offsets[i]:offsets[i + 1]])
+        gaps = gaps[gaps > 0]
+        if len(gaps) == 0:
+            result[i] = 12
+            continue
+        per_year = 365.25 / np.median(gaps)
+        result[i] = PERIODICIDADES[np.argmin(np.abs(PERIODICIDADES - per_year))]
+    return result
+
+def fill_rate(directory, offsets, periodicidades):
+    """Completa en el snapshot la tasa de cupón faltante: cupón anualizado sobre el capital residual"""
+    rate = np.load(os.path.join(directory, 'tasa_cupon.npy'), mmap_mode='r+')
+    missing = np.isnan(rate)
+    if not missing.any():
+        return
+
+    capital = np.load(os.path.join(directory, 'pago_capital_porcentaje.npy'), mmap_mode='r')
+    coupon = np.load(os.path.join(directory, 'cupon_porcentaje.npy'), mmap_mode='r')
+    counts = np.diff(offsets)
+
+    # Capital pagado antes de cada flujo dentro de su bono
+    cumulative = np.cumsum(capital)
+    start = np.repeat(np.concatenate(([0.0], cumulative))[offsets[:-1]], counts)
+    residual = 100.0 - (cumulative - capital - start)
+
+    frequency = np.repeat(periodicidades, counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        implied = np.where(residual > 0, coupon * frequency / residual, 0.0)
+    rate[missing] = implied[missing]
+    rate.flush()
+
+
+def iter_csv_chunks(path, chunksize=FILAS_POR_BLOQUE, sep=';'):
+    """Lee el CSV por bloques (esquema de bonos_irregulares_ejemplo.csv, columnas extra opcionales)"""
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, sep=sep, dtype=str, chunksize=chunksize, keep_default_na=False):
+        yield chunk_columns(chunk)
+
+def iter_parquet_chunks(path, chunksize=FILAS_POR_BLOQUE):
+    """Lee el Parquet por lotes de filas (requiere pyarrow)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Leer Parquet requiere pyarrow (pip install pyarrow)")
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield chunk_columns(batch.to_pandas())
+
+def chunk_columns(chunk):
+    """Pasa un bloque tabular a los argumentos de StoreWriter.append"""
+    columns = {
+        'nombres': chunk['nombre_bono'].to_numpy(dtype=object),
+        'fechas': chunk['fecha'].to_numpy(dtype=object),
+        'pago_capital': chunk['pago_capital_porcentaje'].to_numpy(dtype=object),
+        'cupon': chunk['cupon_porcentaje'].to_numpy(dtype=object),
+    }
+    optional = {'tasa_cupon': 'tasa_cupon', 'flujo_total': 'flujo_total', 'bases': 'base_calculo',
+                'periodicidades': 'periodicidad', 'tipos_bono': 'tipo_bono', 'indices': 'indice'}
+    for argument, column in optional.items():
+        if column in chunk.columns:
+            values = chunk[column].to_numpy(dtype=object)
+            if argument == 'periodicidades':
+                values = [int(float(v)) if str(v).strip() not in ('', 'nan', 'None') else None for v in values]
+            columns[argument] = values
+    return columns
+
+def iter_excel_chunks(path, chunksize=FILAS_POR_BLOQUE, tipos=None):
+    """Lee la planilla con el formato de bonos_flujos.xlsx en modo read_only, por bloques
+
+    tipos (lista) recibe los tipos de bono de J6:J8 a medida que se leen.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        block = {key: [] for key in ('nombres', 'fechas', 'tasa_cupon', 'cupon', 'pago_capital',
+                                     'flujo_total', 'bases', 'periodicidades', 'tipos_bono', 'indices')}
+        current = None
+
+        for line, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+            row = tuple(row) + (None,) * max(0, 10 - len(row))
+            if tipos is not None and 6 <= line <= 8 and row[9] is not None and str(row[9]).strip():
+                tipos.append(str(row[9]).strip())
+
+            first = row[0]
+            if first is None or (isinstance(first, str) and not first.strip()):
+                continue
+            if not is_date(first):
+                # Cabecera de bono: nombre, base, periodicidad, tipo e índice
+                try:
+                    periodicidad = int(float(str(row[2]))) if row[2] is not None and str(row[2]).strip() else 12
+                except ValueError:
+                    periodicidad = 12
+                current = (str(first).strip(),
+                           str(row[1]).strip() if row[1] is not None else "ACT/365",
+                           periodicidad,
+                           str(row[3]).strip() if row[3] is not None else "Sin clasificar",
+                           str(row[4]).strip() if row[4] is not None else "")
+                continue
+            if current is None:
+                continue
+
+            block['nombres'].append(current[0])
+            block['bases'].append(current[1])
+            block['periodicidades'].append(current[2])
+            block['tipos_bono'].append(current[3])
+            block['indices'].append(current[4])
+            block['fechas'].append(first)
+            block['tasa_cupon'].append(row[1])
+            block['cupon'].append(row[2])
+            block['pago_capital'].append(row[3])
+            block['flujo_total'].append(row[4])
+
+            if len(block['nombres']) >= chunksize:
+                yield block
+                block = {key: [] for key in block}
+
+        if block['nombres']:
+            yield block
+    finally:
+        workbook.close()
+
+def is_date(value):
+    """Indica si la celda es una fecha, con el mismo criterio que parse_flows"""
+    import datetime
+
+    import pandas as pd
+
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return True
+    try:
+        pd.to_datetime(str(value).strip(), errors='raise')
+        return True
+    except:
+        return False
+
+
+@timed('ingesta')
+def ingest_file(path, directory=None, chunksize=FILAS_POR_BLOQUE, store=None):
+    """Ingesta en streaming un CSV (;), Parquet o Excel y compila el snapshot del store
+
+    Con store se agregan sus flujos antes de los del archivo; el resultado ya no es el snapshot
+    del archivo solo, así que va a un directorio propio. Devuelve (store, reporte).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if store is not None and (directory is None or os.path.abspath(directory) == snapshot_dir(path)):
+        raise ValueError("Para agregar a un store hace falta un directorio distinto del snapshot del archivo")
+    directory = directory or snapshot_dir(path)
+    writer = StoreWriter(directory)
+    tipos = []
+
+    if store is not None:
+        writer.append_store(store)
+        tipos = list(store.tipos_disponibles)
+
+    if extension in ('.csv', '.txt'):
+        chunks = iter_csv_chunks(path, chunksize)
+    elif extension in ('.parquet', '.pq'):
+        chunks = iter_parquet_chunks(path, chunksize)
+    elif extension in ('.xlsx', '.xlsm'):
+        chunks = iter_excel_chunks(path, chunksize, tipos)
+    else:
+        raise ValueError(f"Formato no soportado: {extension}")
+
+    for chunk in chunks:
+        writer.append(**chunk)
+
+    stat = os.stat(path)
+    key = {'version': VERSION_SNAPSHOT, 'mtime_ns': stat.st_mtime_ns,
+           'size': stat.st_size, 'sha1': file_hash(path)}
+    return writer.close(list(dict.fromkeys(tipos)), key), writer.report
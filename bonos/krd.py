@@ -0,0 +1,111 @@
+"""Duraciones por plazo clave (key-rate durations) de todo el universo de bonos
+
+Cada flujo futuro aporta t·VP/P a la duración y se reparte entre los dos plazos clave que lo
+rodean con pesos lineales. La matriz de KRD (cotizaciones x plazos) sale del producto entre
+las sensibilidades por flujo y los pesos por plazo, sin mover tasas ni re-valuar cada bono.
+"""
+import numpy as np
+
+from bonos.batch import PaddedFlows, QuoteFlows, read_quotes
+from bonos.daycount import normalize_basis
+from bonos.metrics import timed
+from bonos.risk import PUNTO_BASICO
+from bonos.schedule import day_number
+from bonos.solver import solve_ytm_matrix
+
+# Plazos clave por defecto, en años
+PLAZOS_CLAVE = (0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Tamaño máximo (en elementos) de la matriz de pesos flujos x plazos que se arma por bloque
+ELEMENTOS_POR_BLOQUE = 1 << 22
+
+
+def tenor_label(tenor):
+    """Nombre de un plazo clave: meses por debajo del año ('6m') y años desde ahí ('2a')"""
+    return f"{round(tenor * 12)}m" if tenor < 1 else f"{tenor:g}a"
+
+def tenor_weights(times, tenors):
+    """Peso de cada plazo clave en cada plazo de flujo (forma times.shape + (plazos,))
+
+    Entre dos plazos clave el peso es lineal; antes del primero y después del último todo el
+    flujo pesa en el extremo. Los pesos de cada flujo suman 1.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    tenors = np.asarray(tenors, dtype=np.float64)
+    flat = times.ravel()
+    weights = np.zeros((len(flat), len(tenors)))
+    if len(tenors) == 1:
+        weights[:] = 1.0
+        return weights.reshape(times.shape + (1,))
+
+    j = np.clip(np.searchsorted(tenors, flat, side='right') - 1, 0, len(tenors) - 2)
+    frac = np.clip((flat - tenors[j]) / (tenors[j + 1] - tenors[j]), 0.0, 1.0)
+    rows = np.arange(len(flat))
+    weights[rows, j] = 1.0 - frac
+    weights[rows, j + 1] += frac
+    return weights.reshape(times.shape + (len(tenors),))
+
+@timed('duraciones_clave')
+def key_rate_durations(flows_df, quotes, tenors=PLAZOS_CLAVE, day_count_basis='ACT/365', curve=None, dv01=False):
+    """KRD de cada cotización: sensibilidad del precio a la tasa cero continua en cada plazo clave
+
+    quotes es como en price_universe (nombre_bono, fecha_liquidacion, precio). Cada bono se
+    descuenta a su propia TIR o, con curve (ZeroCurve a la misma liquidación), con la curva.
+    Las KRD suman la duración de Macaulay; con dv01=True se devuelve el DV01 de cada plazo
+    (KRD x precio x 1pb), que suma el PV01.
+    """
+    import pandas as pd
+
+    padded = flows_df if isinstance(flows_df, PaddedFlows) else PaddedFlows(flows_df)
+    tenors = np.asarray(tenors, dtype=np.float64)
+    if len(tenors) == 0 or (tenors <= 0).any() or (np.diff(tenors) <= 0).any():
+        raise ValueError("Los plazos clave deben ser positivos y crecientes")
+    bonos, settlement, price = read_quotes(quotes, 'precio')
+    flows = QuoteFlows(padded, bonos, settlement, day_count_basis)
+
+    # TIR de cada cotización con el precio como flujo inicial
+    ytm = np.full(len(bonos), np.nan)
+    has_flows = flows.has_flows
+    if has_flows.any():
+        solve_times = np.column_stack((np.zeros(has_flows.sum()), flows.times[has_flows]))
+        solve_amounts = np.column_stack((-price[has_flows], flows.amounts[has_flows]))
+        ytm[has_flows] = solve_ytm_matrix(solve_times, solve_amounts)
+
+    # Valor presente de cada flujo: a la TIR del bono o con la curva
+    if curve is None:
+        with np.errstate(invalid='ignore'):
+            pv = flows.amounts * np.exp(-flows.times * np.log1p(ytm)[:, None])
+    else:
+        if (settlement != curve.settlement).any() or normalize_basis(day_count_basis) != normalize_basis(curve.day_count_basis):
+            raise ValueError(f"La curva es a {np.datetime64(day_number(curve.settlement), 'D')} con base "
+                             f"{curve.day_count_basis}: las cotizaciones deben usar la misma liquidación y base")
+        pv = np.where(flows.amounts != 0, flows.amounts * curve.discount(flows.times), 0.0)
+    value = pv.sum(axis=1)
+    sensitivity = flows.times * pv
+
+    # Producto de las sensibilidades por flujo con los pesos por plazo, por bloques de
+    # cotizaciones para acotar la matriz cotizaciones x flujos x plazos
+    exposure = np.zeros((len(bonos), len(tenors)))
+    block = max(1, ELEMENTOS_POR_BLOQUE // max(1, flows.times.shape[1] * len(tenors)))
+    for start in range(0, len(bonos), block):
+        stop = min(start + block, len(bonos))
+        weights = tenor_weights(flows.times[start:stop], tenors)
+        exposure[start:stop] = np.einsum('qf,qfk->qk', np.nan_to_num(sensitivity[start:stop]), weights)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if dv01:
+            matrix = exposure * PUNTO_BASICO
+        else:
+            matrix = np.where(value[:, None] > 0, exposure / value[:, None], np.nan)
+    matrix[~has_flows | ~np.isfinite(value)] = np.nan
+
+    prefix = 'dv01' if dv01 else 'krd'
+    columns = {f'{prefix}_{tenor_label(t)}': matrix[:, k] for k, t in enumerate(tenors)}
+    return pd.DataFrame({
+        'nombre_bono': bonos,
+        'fecha_liquidacion': settlement.astype('datetime64[D]'),
+        'precio': price,
+        'tir': ytm,
+        **columns,
+        f'{prefix}_total': matrix.sum(axis=1),
+    })
@@ -0,0 +1,192 @@
+"""Métricas del cálculo: tiempos por etapa, contadores del solver y tasas de acierto de cachés
+
+Sin Streamlit, serve() expone /metrics (texto de Prometheus) y /metrics.json desde el
+mismo proceso que calcula. Con BONOS_METRICAS=0 en el entorno no se registra nada.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefijo de los nombres exportados a Prometheus
+PREFIJO = 'bonos'
+
+
+class Registry:
+    """Acumula tiempos por etapa y contadores; lo comparten todos los hilos del proceso"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._caches = {}
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        """Registra una ejecución de la etapa: cantidad, total, mínimo y máximo en segundos"""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(stage)
+            if timer is None:
+                self._timers[stage] = [1, seconds, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = min(timer[2], seconds)
+                timer[3] = max(timer[3], seconds)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def count_many(self, values):
+        """Suma varios contadores con una sola toma del lock (para los caminos calientes)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, value in values:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Decorador que mide cada llamada a la función como la etapa dada"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def register_cache(self, name, stats):
+        """Registra una caché: stats() devuelve (aciertos, fallos) al momento de exportar"""
+        with self._lock:
+            self._caches[name] = stats
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Estado actual como dict (lo que devuelve el endpoint JSON)"""
+        with self._lock:
+            timers = {k: list(v) for k, v in self._timers.items()}
+            counters = dict(self._counters)
+            caches = dict(self._caches)
+
+        cache_rates = {}
+        for name, stats in caches.items():
+            try:
+                hits, misses = stats()
+            except Exception:
+                continue
+            total = hits + misses
+            cache_rates[name] = {'aciertos': hits, 'fallos': misses,
+                                 'tasa_aciertos': hits / total if total else 0.0}
+
+        return {
+            'desde': self.started,
+            'etapas': {stage: {'llamadas': n, 'segundos': total, 'promedio': total / n,
+                               'minimo': low, 'maximo': high}
+                       for stage, (n, total, low, high) in sorted(timers.items())},
+            'contadores': dict(sorted(counters.items())),
+            'caches': cache_rates,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Formato de texto de Prometheus"""
+        data = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP {PREFIJO}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIJO}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIJO}_{name}{labels} {value!r}")
+
+        stages = data['etapas'].items()
+        family('etapa_segundos_total', 'counter', "Tiempo acumulado por etapa",
+               [(label('etapa', s), v['segundos']) for s, v in stages])
+        family('etapa_llamadas_total', 'counter', "Ejecuciones de cada etapa",
+               [(label('etapa', s), v['llamadas']) for s, v in stages])
+        family('etapa_segundos_max', 'gauge', "Ejecución más lenta de cada etapa",
+               [(label('etapa', s), v['maximo']) for s, v in stages])
+        for name, value in data['contadores'].items():
+            family(f"{name}_total", 'counter', name.replace('_', ' ').capitalize(), [('', value)])
+
+        caches = data['caches'].items()
+        family('cache_aciertos_total', 'counter', "Aciertos de cada caché",
+               [(label('cache', c), v['aciertos']) for c, v in caches])
+        family('cache_fallos_total', 'counter', "Fallos de cada caché",
+               [(label('cache', c), v['fallos']) for c, v in caches])
+        family('cache_tasa_aciertos', 'gauge', "Proporción de aciertos de cada caché",
+               [(label('cache', c), v['tasa_aciertos']) for c, v in caches])
+        return '\n'.join(lines) + '\n'
+
+
+def label(name, value):
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'{{{name}="{escaped}"}}'
+
+
+# Registro del proceso
+METRICAS = Registry(enabled=os.environ.get('BONOS_METRICAS', '1') != '0')
+
+timer = METRICAS.timer
+timed = METRICAS.timed
+count = METRICAS.count
+count_many = METRICAS.count_many
+register_cache = METRICAS.register_cache
+
+
+def serve(port=9109, host='127.0.0.1', registry=METRICAS):
+    """Expone /metrics (Prometheus) y /metrics.json en un hilo; devuelve el servidor"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] in ('/metrics.json', '/json'):
+                body, kind = registry.to_json().encode('utf-8'), 'application/json; charset=utf-8'
+            elif self.path.split('?')[0] in ('/metrics', '/'):
+                body, kind = registry.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', kind)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
@@ -0,0 +1,198 @@
+"""Carteras: TIR, duración y convexidad ponderadas por valor de mercado y escalera de flujos
+
+Una cartera es una lista de posiciones (bono, nominal). Todas las agregaciones son sumas por
+segmento (np.bincount) sobre los arrays compilados del store: no se recorren las posiciones.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from bonos.batch import PaddedFlows, price_universe
+from bonos.metrics import timed
+
+
+@dataclass(frozen=True)
+class PortfolioRisk:
+    """Medidas de la cartera: promedios ponderados por valor de mercado y DV01 total
+
+    posiciones tiene una fila por bono en cartera con su nominal, valor de mercado, peso,
+    medidas y DV01/PV01 de la posición; las posiciones sin flujos futuros (TIR NaN) no entran
+    en los promedios.
+    """
+    nominal: float
+    valor_mercado: float
+    tir: float
+    duracion_macaulay: float
+    duracion_modificada: float
+    convexidad: float
+    dv01: float
+    pv01: float
+    posiciones: Any
+
+
+def read_holdings(holdings):
+    """Normaliza las posiciones (DataFrame o lista de tuplas) a arrays de bono, nominal y precio"""
+    import pandas as pd
+
+    if not isinstance(holdings, pd.DataFrame):
+        holdings = list(holdings)
+        columns = ['nombre_bono', 'nominal', 'precio'][:len(holdings[0]) if holdings else 2]
+        holdings = pd.DataFrame(holdings, columns=columns)
+    bonos = holdings['nombre_bono'].to_numpy(dtype=object)
+    nominal = holdings['nominal'].to_numpy(dtype=np.float64)
+    price = holdings['precio'].to_numpy(dtype=np.float64) if 'precio' in holdings.columns else None
+    return bonos, nominal, price
+
+
+class Portfolio:
+    """Cartera de posiciones (bono, nominal) sobre el store compilado
+
+    Los índices de bono y los flujos rellenados de los bonos en cartera se arman una vez; risk()
+    solo revalúa con los precios del momento y ladder() agrega los flujos futuros por mes.
+    """
+
+    def __init__(self, store, holdings, day_count_basis='ACT/365'):
+        import pandas as pd
+
+        self.store = store
+        self.day_count_basis = day_count_basis
+        bonos, self.nominal, self.prices = read_holdings(holdings)
+
+        codes = pd.Index(store.nombres).get_indexer(bonos)
+        if (codes < 0).any():
+            unknown = sorted(set(bonos[codes < 0]))
+            raise ValueError(f"Bonos desconocidos en la cartera: {', '.join(map(str, unknown[:10]))}")
+
+        # held: bonos distintos en cartera; position: fila de cada posición en held
+        self.held, self.position = np.unique(codes, return_inverse=True)
+        self.names = np.asarray(store.nombres, dtype=object)[self.held]
+        self.nominal_by_bond = np.bincount(self.position, weights=self.nominal, minlength=len(self.held))
+        self._padded = None
+
+    @property
+    def padded(self):
+        """Flujos rellenados solo de los bonos en cartera, armados al primer uso"""
+        if self._padded is None:
+            self._padded = PaddedFlows(self.store.to_frame(self.held), self.store.ajuste)
+        return self._padded
+
+    @timed('cartera_riesgo')
+    def risk(self, settlement, prices=None):
+        """TIR, duraciones y convexidad ponderadas por valor de mercado, y DV01/PV01 totales
+
+        prices es el precio sucio (base 100) por bono: dict o Series por nombre, o un array con
+        un precio por posición. Sin prices se usa la columna precio de las posiciones.
+        """
+        import pandas as pd
+
+        price = self.position_prices(prices)
+
+        # Una valuación por (bono, precio) distinto: las posiciones repetidas no se recalculan
+        quotes, inverse = np.unique(np.column_stack((self.position, price)), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        results = price_universe(self.padded, pd.DataFrame({
+            'nombre_bono': self.names[quotes[:, 0].astype(np.int64)],
+            'fecha_liquidacion': pd.Timestamp(settlement),
+            'precio': quotes[:, 1],
+        }), self.day_count_basis)
+
+        columns = ['tir', 'duracion_macaulay', 'duracion_modificada', 'convexidad', 'dv01', 'pv01']
+        measures = {c: results[c].to_numpy()[inverse] for c in columns}
+
+        # Valor de mercado de cada posición; las que no tienen precio o TIR no pesan en los promedios
+        market_value = self.nominal * price / 100.0
+        valid = np.isfinite(measures['tir']) & np.isfinite(market_value)
+        market_value = np.where(np.isfinite(market_value), market_value, 0.0)
+        weight = np.where(valid, market_value, 0.0)
+        total_weight = weight.sum()
+
+        def weighted(values):
+            return float(np.dot(weight, np.where(valid, values, 0.0)) / total_weight) if total_weight else np.nan
+
+        def total(values):
+            return float(np.dot(self.nominal / 100.0, np.where(valid, values, 0.0)))
+
+        # Agregado por bono con sumas por segmento sobre la fila de cada posición
+        def by_bond(values):
+            return np.bincount(self.position, weights=values, minlength=len(self.held))
+
+        bond_weight = by_bond(weight)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            posiciones = pd.DataFrame({
+                'nombre_bono': self.names,
+                'nominal': self.nominal_by_bond,
+                'valor_mercado': by_bond(market_value),
+                'peso': bond_weight / total_weight if total_weight else np.nan,
+                **{c: np.where(bond_weight > 0, by_bond(weight * np.where(valid, measures[c], 0.0)) / bond_weight, np.nan)
+                   for c in columns[:4]},
+                # DV01 y PV01 de la posición completa, no por 100 de nominal
+                **{c: by_bond(self.nominal / 100.0 * np.where(valid, measures[c], 0.0)) for c in columns[4:]},
+            })
+
+        return PortfolioRisk(
+            nominal=float(self.nominal.sum()),
+            valor_mercado=float(market_value.sum()),
+            tir=weighted(measures['tir']),
+            duracion_macaulay=weighted(measures['duracion_macaulay']),
+            duracion_modificada=weighted(measures['duracion_modificada']),
+            convexidad=weighted(measures['convexidad']),
+            dv01=total(measures['dv01']),
+            pv01=total(measures['pv01']),
+            posiciones=posiciones,
+        )
+
+    def position_prices(self, prices):
+        """Precio de cada posición a partir de un mapeo por bono, un array o la columna precio"""
+        import pandas as pd
+
+        if prices is None:
+            if self.prices is None:
+                raise ValueError("Faltan los precios: pasar prices o una columna precio en las posiciones")
+            return self.prices
+        if isinstance(prices, (dict, pd.Series)):
+            by_bond = pd.Series(prices, dtype=np.float64).reindex(self.names).to_numpy()
+            return by_bond[self.position]
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) != len(self.nominal):
+            raise ValueError(f"Se esperaban {len(self.nominal)} precios, uno por posición, y hay {len(prices)}")
+        return prices
+
+    @timed('cartera_escalera')
+    def ladder(self, settlement, frequency='M'):
+        """Flujos futuros de la cartera (capital, cupón y total por nominal) agrupados por mes
+
+        frequency es la unidad de datetime64 del agrupamiento: 'M' por mes, 'Y' por año.
+        """
+        import pandas as pd
+
+        store = self.store
+        settlement = np.datetime64(pd.Timestamp(settlement).date(), 'D').astype(np.int64)
+
+        # Flujos de los bonos en cartera, cada uno escalado por el nominal total del bono
+        rows, owner = store.flow_rows(self.held)
+        dates = np.asarray(store.fechas[rows])
+        future = dates > settlement
+        rows, scale, dates = rows[future], self.nominal_by_bond[owner[future]] / 100.0, dates[future]
+
+        buckets, bucket = np.unique(dates.astype('datetime64[D]').astype(f'datetime64[{frequency}]'),
+                                    return_inverse=True)
+        capital = np.bincount(bucket, weights=np.asarray(store.pago_capital_porcentaje[rows]) * scale,
+                              minlength=len(buckets))
+        cupon = np.bincount(bucket, weights=np.asarray(store.cupon_porcentaje[rows]) * scale,
+                            minlength=len(buckets))
+        return pd.DataFrame({
+            'periodo': buckets.astype('datetime64[D]'),
+            'capital': capital,
+            'cupon': cupon,
+            'flujo_total': capital + cupon,
+        })
+
+
+def portfolio_risk(store, holdings, settlement, prices=None, day_count_basis='ACT/365'):
+    """Medidas de la cartera en una llamada (ver Portfolio.risk)"""
+    return Portfolio(store, holdings, day_count_basis).risk(settlement, prices)
+
+def cash_flow_ladder(store, holdings, settlement, frequency='M'):
+    """Escalera de flujos futuros de la cartera por mes (ver Portfolio.ladder)"""
+    return Portfolio(store, holdings).ladder(settlement, frequency)
@@ -0,0 +1,40 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Un punto básico
+PUNTO_BASICO = 1e-4
+
+RiskMeasures = namedtuple(
+    'RiskMeasures',
+    ['dirty_price', 'clean_price', 'macaulay', 'modified', 'convexity', 'dv01', 'pv01']
+)
+
+
+def price_from_yield(times, amounts, ytm, accrued=0.0):
+    """Precio sucio y limpio, duraciones, convexidad, DV01 y PV01 a partir de la TIR
+
+    times y amounts son los flujos futuros en años desde la liquidación (1-D para un bono,
+    2-D con una fila por bono y ceros de relleno); ytm es la TIR efectiva anual de cada fila.
+    Todas las medidas salen de la misma pasada sobre los flujos descontados.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    ytm = np.asarray(ytm, dtype=np.float64)
+
+    pv_flows = amounts * np.exp(-times * np.log1p(ytm)[..., None])
+    dirty_price = pv_flows.sum(axis=-1)
+    time_weighted = (times * pv_flows).sum(axis=-1)
+    convexity_weighted = (times * (times + 1) * pv_flows).sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        macaulay = np.where(dirty_price > 0, time_weighted / dirty_price, 0.0)
+        modified = np.where(1 + ytm > 0, macaulay / (1 + ytm), 0.0)
+        convexity = np.where(dirty_price > 0, convexity_weighted / dirty_price / (1 + ytm) ** 2, 0.0)
+
+    # DV01: cambio de precio por 1pb de TIR efectiva
+    # PV01: cambio de precio por 1pb de desplazamiento paralelo de tasas continuas
+    dv01 = modified * dirty_price * PUNTO_BASICO
+    pv01 = time_weighted * PUNTO_BASICO
+
+    return RiskMeasures(dirty_price, dirty_price - accrued, macaulay, modified, convexity, dv01, pv01)
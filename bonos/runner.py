@@ -0,0 +1,246 @@
+"""Corrida en lote de fin de día: TIR, duraciones, corridos, paridad, vida media y próximo cupón
+
+Uso: python -m bonos.runner cotizaciones.parquet --salida resultados/ --procesos 8
+
+La entrada (CSV con ';' o Parquet con nombre_bono, fecha_liquidacion y precio) se lee por
+particiones de filas consecutivas que se reparten en un pool de procesos. Cada partición
+terminada se escribe como un Parquet propio (parte-00000.parquet, ...) y se anota en
+_manifiesto.json: con --reanudar la corrida sigue desde las particiones que faltan.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from bonos.batch import PaddedFlows, price_universe
+from bonos.ingest import parse_dates, parse_numbers
+from bonos.metrics import timer
+
+# Filas de cotizaciones por partición (una tarea y un archivo de salida cada una)
+FILAS_POR_PARTICION = 100_000
+
+# Tamaño máximo (cotizaciones x flujos) de las matrices que se arman por bloque de una partición
+ELEMENTOS_POR_BLOQUE = 1 << 22
+
+# Particiones en vuelo por proceso: la entrada se lee a medida que se liberan
+PARTICIONES_EN_VUELO = 2
+
+# Con prefijo '_' y '.' los lectores de Parquet (pd.read_parquet de la carpeta) ignoran el
+# manifiesto y las partes a medio escribir
+MANIFIESTO = '_manifiesto.json'
+COLUMNAS_COTIZACION = ['nombre_bono', 'fecha_liquidacion', 'precio']
+
+# Flujos rellenados del proceso; con fork los workers los heredan sin copiarlos
+_PADDED = None
+
+
+def part_name(number):
+    return f'parte-{number:05d}.parquet'
+
+def iter_partitions(path, rows, settlement=None, sep=';'):
+    """Lee las cotizaciones por particiones de rows filas (CSV con coma decimal o Parquet)"""
+    import pandas as pd
+
+    if str(path).lower().endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Leer Parquet requiere pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in COLUMNAS_COTIZACION if c in parquet.schema_arrow.names]
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=rows, columns=columns))
+    else:
+        chunks = pd.read_csv(path, sep=sep, dtype=str, chunksize=rows, keep_default_na=False,
+                             usecols=lambda c: c in COLUMNAS_COTIZACION)
+
+    for chunk in chunks:
+        missing = [c for c in COLUMNAS_COTIZACION if c not in chunk.columns and
+                   not (c == 'fecha_liquidacion' and settlement is not None)]
+        if missing:
+            raise ValueError(f"Faltan columnas en {path}: {', '.join(missing)}")
+        if 'fecha_liquidacion' in chunk.columns:
+            days, valid = parse_dates(chunk['fecha_liquidacion'].to_numpy(dtype=object))
+        else:
+            days = np.full(len(chunk), np.datetime64(settlement, 'D').astype(np.int64))
+            valid = np.ones(len(chunk), dtype=bool)
+        yield pd.DataFrame({
+            'nombre_bono': chunk['nombre_bono'].astype(str).str.strip().to_numpy(dtype=object),
+            'fecha_liquidacion': np.where(valid, days.astype('datetime64[D]'), np.datetime64('NaT', 'D')),
+            'precio': parse_numbers(chunk['precio'].to_numpy(dtype=object)),
+            'fecha_valida': valid,
+        })
+
+def value_partition(padded, quotes, day_count_basis='ACT/365'):
+    """Valúa una partición con price_universe por bloques; los errores quedan en la columna error
+
+    Las matrices de la valuación tienen una fila por cotización y una columna por flujo del
+    bono más largo: los bloques acotan la memoria de cada worker a ELEMENTOS_POR_BLOQUE.
+    """
+    import pandas as pd
+
+    quotes = quotes.reset_index(drop=True)
+    known = np.flatnonzero(quotes['nombre_bono'].isin(padded.index).to_numpy() & quotes['fecha_valida'].to_numpy())
+    block = max(1, ELEMENTOS_POR_BLOQUE // max(1, padded.dates.shape[1]))
+    results = pd.concat([
+        price_universe(padded, quotes.loc[known[start:start + block], COLUMNAS_COTIZACION], day_count_basis)
+        for start in range(0, max(len(known), 1), block)
+    ], ignore_index=True)
+
+    # Las filas no valuadas quedan vacías, en el orden de la entrada
+    frame = results.set_axis(known).reindex(quotes.index)
+    for c in COLUMNAS_COTIZACION:
+        frame[c] = quotes[c]
+
+    error = np.full(len(frame), None, dtype=object)
+    error[np.isnan(frame['tir'].to_numpy(dtype=np.float64))] = "No hay flujos de caja futuros para la fecha de liquidación"
+    error[~quotes['fecha_valida'].to_numpy()] = "Fecha de liquidación inválida"
+    error[~quotes['nombre_bono'].isin(padded.index).to_numpy()] = "Bono desconocido"
+    frame['error'] = error
+    return frame
+
+
+def _init_worker(path, indices_path):
+    """Sin fork cada worker carga el store desde el snapshot (mapeado en memoria)"""
+    global _PADDED
+    if _PADDED is None:
+        from bonos.indices import load_indexed_store
+
+        store = load_indexed_store(path, indices_path)[0]
+        _PADDED = PaddedFlows(store.to_frame(), store.ajuste)
+
+def _run_partition(number, quotes, directory, day_count_basis):
+    """Tarea de un worker: valúa la partición y la escribe de forma atómica"""
+    start = time.perf_counter()
+    with timer('corrida_particion'):
+        frame = value_partition(_PADDED, quotes, day_count_basis)
+    target = os.path.join(directory, part_name(number))
+    tmp = os.path.join(directory, '.' + part_name(number))
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    return number, {
+        'archivo': part_name(number),
+        'filas': len(frame),
+        'errores': int(frame['error'].notna().sum()),
+        'segundos': round(time.perf_counter() - start, 3),
+    }
+
+
+def input_signature(path):
+    stat = os.stat(path)
+    return {'archivo': os.path.abspath(path), 'tamano': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def write_manifest(directory, manifest):
+    tmp = os.path.join(directory, '.' + MANIFIESTO)
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(directory, MANIFIESTO))
+
+def open_manifest(directory, expected, resume):
+    """Manifiesto de la corrida: nuevo, o el existente si --reanudar y la corrida es la misma"""
+    path = os.path.join(directory, MANIFIESTO)
+    if not os.path.exists(path):
+        return dict(expected, partes={}, completa=False)
+    if not resume:
+        raise SystemExit(f"{directory} ya tiene una corrida: usar --reanudar o otra carpeta de salida")
+
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    changed = [k for k in expected if manifest.get(k) != expected[k]]
+    if changed:
+        raise SystemExit(f"No se puede reanudar: cambió {', '.join(changed)} desde la corrida anterior")
+    # Solo cuentan las partes cuyo archivo sigue en la carpeta
+    manifest['partes'] = {k: v for k, v in manifest['partes'].items()
+                          if os.path.exists(os.path.join(directory, v['archivo']))}
+    return manifest
+
+def run(quotes_path, directory, path='bonos_flujos.xlsx', processes=None, rows=FILAS_POR_PARTICION,
+        day_count_basis='ACT/365', settlement=None, indices_path=None, resume=False, sep=';'):
+    """Valúa todo el archivo de cotizaciones en particiones paralelas; devuelve el manifiesto"""
+    global _PADDED
+    from bonos.indices import load_indexed_store
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Escribir Parquet requiere pyarrow (pip install pyarrow)")
+
+    os.makedirs(directory, exist_ok=True)
+    store, errores = load_indexed_store(path, indices_path)
+    for bono, error in errores.items():
+        print(f"{bono}: {error}", file=sys.stderr)
+
+    expected = {
+        'entrada': input_signature(quotes_path),
+        'flujos': store.sha1,
+        'filas_por_particion': rows,
+        'base': day_count_basis,
+        'liquidacion': settlement and str(settlement),
+    }
+    manifest = open_manifest(directory, expected, resume)
+    done = set(manifest['partes'])
+    if done:
+        print(f"Reanudando: {len(done)} particiones ya escritas", file=sys.stderr)
+
+    # Los flujos rellenados se arman antes de crear el pool: con fork los workers comparten esas páginas
+    _PADDED = PaddedFlows(store.to_frame(), store.ajuste)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    workers = processes or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(path, indices_path)) as pool:
+        def collect(block):
+            finished, rest = wait(pending, return_when=block)
+            for future in finished:
+                number, part = future.result()
+                manifest['partes'][str(number)] = part
+                write_manifest(directory, manifest)
+                print(f"{part['archivo']}: {part['filas']} filas, {part['errores']} con error, "
+                      f"{part['segundos']:.2f}s", file=sys.stderr)
+            return rest
+
+        for number, quotes in enumerate(iter_partitions(quotes_path, rows, settlement, sep)):
+            if str(number) in done:
+                continue
+            # Lectura acotada: no se cargan más particiones que las que el pool puede tomar
+            if len(pending) >= workers * PARTICIONES_EN_VUELO:
+                pending = collect(FIRST_COMPLETED)
+            pending.add(pool.submit(_run_partition, number, quotes, directory, day_count_basis))
+        while pending:
+            pending = collect(FIRST_COMPLETED)
+
+    manifest['completa'] = True
+    manifest['filas'] = sum(p['filas'] for p in manifest['partes'].values())
+    manifest['errores'] = sum(p['errores'] for p in manifest['partes'].values())
+    write_manifest(directory, manifest)
+    print(f"{manifest['filas']} cotizaciones en {len(manifest['partes'])} particiones "
+          f"({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Valuación en lote de un archivo de cotizaciones")
+    parser.add_argument('cotizaciones', help="CSV (;) o Parquet con nombre_bono, fecha_liquidacion y precio")
+    parser.add_argument('--salida', required=True, help="carpeta de las partes Parquet y el manifiesto")
+    parser.add_argument('--planilla', default='bonos_flujos.xlsx')
+    parser.add_argument('--indices', help="fijaciones de CER, BADLAR y TAMAR para ajustar los bonos indexados")
+    parser.add_argument('--procesos', type=int, default=None, help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument('--filas', type=int, default=FILAS_POR_PARTICION, help="filas por partición")
+    parser.add_argument('--liquidacion', help="fecha de liquidación si el archivo no trae la columna (AAAA-MM-DD)")
+    parser.add_argument('--base', default='ACT/365', help="base de cálculo de la TIR")
+    parser.add_argument('--reanudar', action='store_true', help="seguir una corrida interrumpida en la misma carpeta")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run(args.cotizaciones, args.salida, args.planilla, args.procesos, args.filas, args.base,
+        args.liquidacion and datetime.date.fromisoformat(args.liquidacion), args.indices, args.reanudar)
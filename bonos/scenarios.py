@@ -0,0 +1,135 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from bonos.batch import FECHA_VACIA, PaddedFlows
+from bonos.daycount import as_datetime64, year_fraction
+from bonos.metrics import timed
+from bonos.risk import PUNTO_BASICO
+
+# Cubo de precios sucios: precios[bono, fecha de liquidación, shock]
+ScenarioCube = namedtuple('ScenarioCube', ['bonos', 'fechas', 'shocks_bp', 'precios'])
+
+# Tamaño máximo (en elementos) de la matriz de descuentos que se arma por bloque de bonos
+ELEMENTOS_POR_BLOQUE = 1 << 22
+
+
+def business_days(start, count, holidays=None):
+    """Devuelve los primeros count días hábiles desde start (inclusive)"""
+    first = np.busday_offset(np.datetime64(start, 'D'), 0, roll='forward', holidays=holidays or [])
+    return np.busday_offset(first, np.arange(count), holidays=holidays or [])
+
+def reprice_dates(dates, amounts, yields, settlement_days, shocks_bp, day_count_basis, out):
+    """Valúa todos los bonos para cada fecha de liquidación y shock: out[bono, fecha, shock]"""
+    n_bonds, n_flows = dates.shape
+    shocks = np.asarray(shocks_bp, dtype=np.float64) * PUNTO_BASICO
+    block = max(1, ELEMENTOS_POR_BLOQUE // max(1, len(shocks) * n_flows))
+    valid = dates != FECHA_VACIA
+
+    for j, settlement in enumerate(settlement_days):
+        future = valid & (dates > settlement)
+        years = year_fraction(settlement, np.where(valid, dates, settlement), day_count_basis)
+        times = np.where(future, years, 0.0)
+        flows = np.where(future, amounts, 0.0)
+
+        # Por bloques de bonos para acotar la memoria de la matriz bonos x flujos x shocks
+        for start in range(0, n_bonds, block):
+            stop = min(start + block, n_bonds)
+            with np.errstate(invalid='ignore'):
+                growth = np.log1p(yields[start:stop, None] + shocks[None, :])
+            discount = np.exp(-times[start:stop, :, None] * growth[:, None, :])
+            out[start:stop, j, :] = np.einsum('bf,bfk->bk', flows[start:stop], discount)
+
+
+def share_array(array):
+    """Copia un array a memoria compartida y devuelve el bloque y su descripción para los workers"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+def attach_array(spec):
+    """Abre en un worker un array publicado con share_array
+
+    Los workers del pool comparten el resource tracker del proceso principal, que es
+    quien libera los bloques al terminar.
+    """
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def _reprice_task(specs, date_range, settlement_days, shocks_bp, day_count_basis):
+    """Tarea de un worker: valúa un rango de fechas escribiendo directo en el cubo compartido"""
+    blocks = []
+    try:
+        arrays = []
+        for spec in specs:
+            block, array = attach_array(spec)
+            blocks.append(block)
+            arrays.append(array)
+        dates, amounts, yields, prices = arrays
+        first, last = date_range
+        reprice_dates(dates, amounts, yields, settlement_days, shocks_bp, day_count_basis,
+                      prices[:, first:last, :])
+        return last - first
+    finally:
+        for block in blocks:
+            block.close()
+
+@timed('escenarios')
+def scenario_cube(flows_df, base_yields, shocks_bp, settlement_dates, day_count_basis='ACT/365', max_workers=None):
+    """Revalúa todo el universo bajo una grilla de shocks paralelos de TIR y fechas de liquidación
+
+    base_yields es la TIR de cada bono (dict o Series por nombre, o array en el orden del
+    universo). El resultado es un cubo float32 de precios sucios (bonos x fechas x shocks).
+    """
+    padded = flows_df if isinstance(flows_df, PaddedFlows) else PaddedFlows(flows_df)
+
+    if isinstance(base_yields, dict) or hasattr(base_yields, 'get'):
+        yields = np.array([base_yields.get(name, np.nan) for name in padded.names], dtype=np.float64)
+    else:
+        yields = np.asarray(base_yields, dtype=np.float64)
+
+    shocks_bp = np.asarray(shocks_bp, dtype=np.float64)
+    fechas = as_datetime64(settlement_dates).ravel()
+    settlement_days = fechas.astype(np.int64)
+    amounts = padded.capital + padded.cupon
+    shape = (len(padded.names), len(settlement_days), len(shocks_bp))
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(settlement_days) < 2:
+        prices = np.empty(shape, dtype=np.float32)
+        reprice_dates(padded.dates, amounts, yields, settlement_days, shocks_bp, day_count_basis, prices)
+        return ScenarioCube(padded.names, fechas, shocks_bp, prices)
+
+    # Flujos, TIRs y cubo de salida en memoria compartida: los workers no reciben copias
+    blocks = []
+    try:
+        specs = []
+        for array in (padded.dates, amounts, yields, np.zeros(shape, dtype=np.float32)):
+            block, spec = share_array(array)
+            blocks.append(block)
+            specs.append(spec)
+
+        # Varias tareas por worker para balancear la carga
+        n_tasks = min(len(settlement_days), workers * 4)
+        bounds = np.linspace(0, len(settlement_days), n_tasks + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_reprice_task, specs, (first, last),
+                            settlement_days[first:last], shocks_bp, day_count_basis)
+                for first, last in zip(bounds[:-1], bounds[1:]) if last > first
+            ]
+            for future in futures:
+                future.result()
+
+        prices = np.ndarray(shape, dtype=np.float32, buffer=blocks[3].buf).copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return ScenarioCube(padded.names, fechas, shocks_bp, prices)
@@ -0,0 +1,156 @@
+from collections import namedtuple
+from functools import lru_cache, partial
+
+import numpy as np
+
+from bonos.daycount import year_fraction
+
+# Estado del cronograma a una fecha de liquidación
+ScheduleState = namedtuple(
+    'ScheduleState',
+    ['last_coupon', 'next_coupon', 'capital_residual', 'coupon_rate']
+)
+
+
+def day_number(value):
+    """Convierte una fecha (date, datetime, Timestamp, datetime64 o texto) a días desde 1970-01-01"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+def day_to_date(day):
+    """Convierte días desde 1970-01-01 a datetime.date"""
+    return np.datetime64(int(day), 'D').astype(object)
+
+
+class BondSchedule:
+    """Cronograma de un bono: fechas ordenadas, amortización acumulada y tasa de cupón escalonada
+
+    ajuste es una función de días a coeficiente de ajuste (bonos CER/UVA): la amortización se
+    acumula en nominal y el residual se lleva a cada fecha con su coeficiente.
+    """
+
+    def __init__(self, fechas, tasa_cupon, cupon_porcentaje, pago_capital_porcentaje, ajuste=None):
+        fechas = np.asarray(fechas, dtype=np.int64)
+        order = np.argsort(fechas, kind='stable')
+        self.fechas = fechas[order]
+        tasa_cupon = np.asarray(tasa_cupon, dtype=np.float64)[order]
+        cupon = np.asarray(cupon_porcentaje, dtype=np.float64)[order]
+        capital = np.asarray(pago_capital_porcentaje, dtype=np.float64)[order]
+
+        self.capital = capital
+        self.cupon = cupon
+        self.ajuste = ajuste
+        self.capital_nominal = capital / self.coefficients(self.fechas) if ajuste is not None else capital
+
+        # Amortización acumulada: amortizacion[k] = capital nominal pagado en las primeras k fechas
+        self.amortizacion = np.concatenate(([0.0], np.cumsum(self.capital_nominal)))
+
+        # Función escalonada de la tasa: vale tasas[k] desde fechas_tasa[k]
+        has_rate = tasa_cupon > 0
+        self.fechas_tasa = self.fechas[has_rate]
+        self.tasas = tasa_cupon[has_rate]
+
+        # Fechas con pago efectivo de cupón
+        self.fechas_cupon = self.fechas[cupon > 0]
+
+        # Repagos de capital para la vida media
+        has_capital = capital > 0
+        self.fechas_capital = self.fechas[has_capital]
+        self.montos_capital = self.capital_nominal[has_capital]
+
+    @classmethod
+    def from_frame(cls, bono_flows):
+        """Arma el cronograma a partir de las filas de un bono en el DataFrame de flujos"""
+        return cls(
+            bono_flows['fecha'].values.astype('datetime64[D]').astype(np.int64),
+            bono_flows['tasa_cupon'].to_numpy(dtype=np.float64),
+            bono_flows['cupon_porcentaje'].to_numpy(dtype=np.float64),
+            bono_flows['pago_capital_porcentaje'].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def from_store(cls, store, bono):
+        """Arma el cronograma de un bono a partir del store compilado"""
+        flows = store.bond_flows(bono)
+        ajuste = getattr(store, 'ajuste', None)
+        return cls(
+            flows.fechas,
+            flows.tasa_cupon,
+            flows.cupon_porcentaje,
+            flows.pago_capital_porcentaje,
+            partial(ajuste.bond_coefficients, bono) if ajuste is not None and bono in ajuste else None,
+        )
+
+    def coefficients(self, days):
+        """Coeficiente de ajuste en cada día (1 si el bono no ajusta)"""
+        days = np.asarray(days, dtype=np.int64)
+        if self.ajuste is None:
+            return np.ones(days.shape)
+        return np.asarray(self.ajuste(days), dtype=np.float64).reshape(days.shape)
+
+    def state(self, settlement):
+        """Último cupón, próximo cupón, capital residual y tasa vigente a la fecha de liquidación"""
+        settlement = day_number(settlement)
+
+        # Último cupón con tasa estrictamente anterior a la liquidación
+        k = np.searchsorted(self.fechas_tasa, settlement, side='left') - 1
+        last_coupon = int(self.fechas_tasa[k]) if k >= 0 else None
+        coupon_rate = float(self.tasas[k]) if k >= 0 else 0.0
+
+        # Próximo pago de cupón desde la liquidación (inclusive)
+        j = np.searchsorted(self.fechas_cupon, settlement, side='left')
+        next_coupon = int(self.fechas_cupon[j]) if j < len(self.fechas_cupon) else None
+
+        # Capital amortizado en fechas anteriores a la liquidación
+        paid = np.searchsorted(self.fechas, settlement, side='left')
+        capital_residual = (100.0 - float(self.amortizacion[paid])) * float(self.coefficients(settlement))
+
+        return ScheduleState(last_coupon, next_coupon, capital_residual, coupon_rate)
+
+    def accrued_interest(self, settlement, base_calculo_bono, state=None, frequency=None):
+        """Intereses corridos desde el último cupón sobre el capital residual"""
+        state = state or self.state(settlement)
+        if state.last_coupon is None:
+            return 0.0
+        years = year_fraction(state.last_coupon, day_number(settlement), base_calculo_bono,
+                              schedule=self.fechas_tasa, frequency=frequency)
+        return state.coupon_rate * state.capital_residual * float(years)
+
+    def average_life(self, settlement, day_count_basis, frequency=None):
+        """Vida media ponderada por los repagos de capital desde la liquidación (inclusive)"""
+        settlement = day_number(settlement)
+        k = np.searchsorted(self.fechas_capital, settlement, side='left')
+        montos = self.montos_capital[k:]
+        total_capital = montos.sum()
+        if total_capital <= 0:
+            return 0.0
+        years = year_fraction(settlement, self.fechas_capital[k:], day_count_basis,
+                              schedule=self.fechas_tasa, frequency=frequency)
+        return float(np.dot(montos, years) / total_capital)
+
+
+class ScheduleBook:
+    """Cronogramas de todos los bonos del store con un LRU de estados por (bono, liquidación)"""
+
+    def __init__(self, store, maxsize=4096):
+        self.store = store
+        self._schedules = {}
+        self._state = lru_cache(maxsize=maxsize)(self._compute_state)
+
+    def schedule(self, bono):
+        """Devuelve el cronograma del bono, armándolo la primera vez"""
+        schedule = self._schedules.get(bono)
+        if schedule is None:
+            schedule = self._schedules[bono] = BondSchedule.from_store(self.store, bono)
+        return schedule
+
+    def _compute_state(self, bono, settlement):
+        return self.schedule(bono).state(settlement)
+
+    def state(self, bono, settlement):
+        """Estado del cronograma del bono a la fecha de liquidación (memoizado)"""
+        return self._state(bono, day_number(settlement))
+
+    def cache_info(self):
+        return self._state.cache_info()
@@ -0,0 +1,384 @@
+"""Servicio HTTP/JSON de valuación: TIR desde precio, precio desde TIR y analíticas
+
+Uso: python -m bonos.service --puerto 9200 --procesos 4
+
+Endpoints (POST con un objeto o una lista de objetos JSON):
+    /tir       {"bono": ..., "precio": ..., "liquidacion": "AAAA-MM-DD"} -> TIR y precio limpio
+    /precio    {"bono": ..., "tir": ..., "liquidacion": ...}             -> precio sucio y limpio
+    /analisis  {"bono": ..., "precio": ..., "liquidacion": ...}          -> todas las medidas
+    GET /bonos, GET /salud, GET /metrics
+
+Las cotizaciones que llegan dentro de una ventana corta se juntan y se resuelven en una sola
+llamada al motor en lote. Con --procesos N cada proceso escucha el mismo puerto (SO_REUSEPORT)
+y todos comparten el store: las columnas del snapshot están mapeadas en memoria y los flujos
+rellenados se arman antes de crear los procesos.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import multiprocessing
+import signal
+import socket
+import sys
+
+import numpy as np
+
+from bonos.batch import COLUMNAS_RESULTADO, PaddedFlows, price_from_yield_universe, price_universe
+from bonos.metrics import METRICAS, count, count_many, timer
+
+# Ventana en segundos durante la que se juntan cotizaciones antes de resolverlas
+VENTANA_LOTE = 0.002
+
+# Cotizaciones por lote: al llegar a este tamaño se resuelve sin esperar la ventana
+MAX_LOTE = 4096
+
+# Tamaño máximo del cuerpo de una solicitud
+MAX_CUERPO = 16 * 1024 * 1024
+
+# Campos de cada endpoint de valuación
+CAMPOS_TIR = ['nombre_bono', 'fecha_liquidacion', 'precio', 'precio_limpio', 'tir', 'tir_anualizada',
+              'intereses_corridos']
+CAMPOS_PRECIO = ['nombre_bono', 'fecha_liquidacion', 'tir', 'precio', 'precio_limpio', 'intereses_corridos',
+                 'duracion_modificada', 'dv01']
+
+ESTADOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Junta los pedidos que llegan dentro de la ventana y los resuelve con una sola llamada
+
+    solve recibe la lista de ítems de todos los pedidos y devuelve un resultado por ítem. Corre
+    en el executor del loop para no frenar la lectura de otros pedidos mientras se resuelve.
+    """
+
+    def __init__(self, solve, window=VENTANA_LOTE, max_size=MAX_LOTE, executor=None):
+        self.solve = solve
+        self.window = window
+        self.max_size = max_size
+        self.executor = executor
+        self._pending = []
+        self._size = 0
+        self._timer = None
+        self._tasks = set()
+
+    def submit(self, items):
+        """Encola los ítems de un pedido; devuelve un future con sus resultados en orden"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((items, future))
+        self._size += len(items)
+        if self._size >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._size = self._pending, [], 0
+        if not pending:
+            return
+
+        # Se guarda la tarea para que no la recolecte el GC antes de terminar
+        task = asyncio.get_running_loop().create_task(self.resolve(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def resolve(self, pending):
+        """Resuelve el lote en el executor y reparte los resultados entre los pedidos"""
+        loop = asyncio.get_running_loop()
+        items = [item for batch, _ in pending for item in batch]
+        count_many((('servicio_lotes', 1), ('servicio_cotizaciones', len(items))))
+        try:
+            results = await loop.run_in_executor(self.executor, self.solve, items)
+        except Exception:
+            # Un ítem que rompe el lote no debe hacer fallar a los demás pedidos:
+            # se resuelve cada pedido por separado y solo falla el que lo contiene
+            count('servicio_lotes_fallidos')
+            for batch, future in pending:
+                try:
+                    result = await loop.run_in_executor(self.executor, self.solve, batch)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+
+        start = 0
+        for batch, future in pending:
+            if not future.done():
+                future.set_result(results[start:start + len(batch)])
+            start += len(batch)
+
+
+def json_value(value):
+    """Valor serializable: NaN en null, fechas en ISO y escalares de numpy en tipos de Python"""
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) or math.isinf(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else str(value.astype('datetime64[D]'))
+    return value
+
+
+class PricingService:
+    """Valuación por lotes sobre el store compilado, con un MicroBatcher por tipo de pedido"""
+
+    def __init__(self, store, settlement=None, day_count_basis='ACT/365', window=VENTANA_LOTE, padded=None):
+        self.store = store
+        self.settlement = settlement or datetime.date.today()
+        self.day_count_basis = day_count_basis
+        self.padded = padded if padded is not None else PaddedFlows(store.to_frame(), store.ajuste)
+        self.yields = MicroBatcher(lambda items: self.solve(items, 'precio'), window)
+        self.prices = MicroBatcher(lambda items: self.solve(items, 'tir'), window)
+
+    def parse_items(self, payload, value_key):
+        """Valida el cuerpo del pedido: un objeto o una lista de objetos con bono, valor y liquidación"""
+        single = isinstance(payload, dict)
+        items = [payload] if single else payload
+        if not isinstance(items, list) or not items:
+            raise HttpError(400, "Se esperaba un objeto o una lista no vacía de objetos")
+
+        parsed = []
+        for item in items:
+            if not isinstance(item, dict) or 'bono' not in item or value_key not in item:
+                raise HttpError(400, f"Cada cotización necesita 'bono' y '{value_key}'")
+            try:
+                value = float(item[value_key])
+                settlement = (datetime.date.fromisoformat(item['liquidacion'])
+                              if item.get('liquidacion') else self.settlement)
+            except (TypeError, ValueError):
+                raise HttpError(400, f"Valor o fecha inválidos en la cotización de {item['bono']}")
+            parsed.append((str(item['bono']), settlement, value))
+        return parsed, single
+
+    def solve(self, items, value_key):
+        """Resuelve un lote completo con price_universe o price_from_yield_universe"""
+        import pandas as pd
+
+        results = [{'bono': bono, 'error': "Bono desconocido" if bono not in self.padded.index
+                    else "Valor o fecha inválidos"} for bono, _, _ in items]
+        known = [i for i, (bono, settlement, value) in enumerate(items)
+                 if bono in self.padded.index and isinstance(settlement, datetime.date) and math.isfinite(value)]
+        if not known:
+            return results
+
+        quotes = pd.DataFrame({
+            'nombre_bono': np.array([items[i][0] for i in known], dtype=object),
+            'fecha_liquidacion': pd.to_datetime([items[i][1] for i in known]),
+            value_key: np.array([items[i][2] for i in known], dtype=np.float64),
+        })
+        with timer('servicio_lote'):
+            if value_key == 'precio':
+                frame = price_universe(self.padded, quotes, self.day_count_basis)
+            else:
+                frame = price_from_yield_universe(self.padded, quotes, self.day_count_basis)
+
+        columns = {c: frame[c].to_numpy() for c in COLUMNAS_RESULTADO}
+        for row, i in enumerate(known):
+            values = {c: json_value(columns[c][row]) for c in COLUMNAS_RESULTADO}
+            values['bono'] = values.pop('nombre_bono')
+            if values['tir'] is None or values['precio'] is None:
+                values['error'] = "No hay flujos de caja futuros para la fecha de liquidación"
+            results[i] = values
+        return results
+
+    async def dispatch(self, method, path, body):
+        """Atiende un pedido ya leído; devuelve (estado, cuerpo JSON o texto)"""
+        route = path.split('?')[0].rstrip('/') or '/'
+        if method == 'GET':
+            if route == '/salud':
+                return 200, {'estado': 'ok', 'bonos': len(self.store)}
+            if route == '/bonos':
+                return 200, [{'bono': b, 'tipo_bono': t, 'base_calculo': base, 'periodicidad': int(p)}
+                             for b, t, base, p in zip(self.store.nombres, self.store.tipos_bono,
+                                                      self.store.bases, self.store.periodicidades)]
+            if route == '/metrics':
+                return 200, METRICAS.to_prometheus()
+            raise HttpError(404, f"No existe {route}")
+
+        if route not in ('/tir', '/precio', '/analisis'):
+            raise HttpError(404, f"No existe {route}")
+        if method != 'POST':
+            raise HttpError(405, "Usar POST")
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            raise HttpError(400, "El cuerpo no es JSON válido")
+
+        if route == '/precio':
+            items, single = self.parse_items(payload, 'tir')
+            results = await self.prices.submit(items)
+            fields = CAMPOS_PRECIO
+        else:
+            items, single = self.parse_items(payload, 'precio')
+            results = await self.yields.submit(items)
+            fields = CAMPOS_TIR if route == '/tir' else COLUMNAS_RESULTADO
+
+        keys = ['bono'] + fields[1:] + ['error']
+        results = [{k: r[k] for k in keys if k in r} for r in results]
+        return 200, results[0] if single else results
+
+    async def handle(self, reader, writer):
+        """Conexión HTTP/1.1 con keep-alive: lee pedidos hasta que el cliente cierra"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HttpError as e:
+                    await write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+
+                count('servicio_solicitudes')
+                try:
+                    status, payload = await self.dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cliente caído o servidor cerrándose: se descarta la conexión
+            pass
+        finally:
+            writer.close()
+
+
+async def read_request(reader):
+    """Lee un pedido HTTP/1.1; devuelve (método, ruta, cuerpo, keep_alive) o None si se cerró"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Encabezados demasiado largos")
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, "Línea de pedido inválida")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+
+    if 'transfer-encoding' in headers:
+        raise HttpError(411, "Enviar el cuerpo con Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, "Content-Length inválido")
+    if length > MAX_CUERPO:
+        raise HttpError(413, "Cuerpo demasiado grande")
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return method.upper(), path, body, keep_alive
+
+async def write_response(writer, status, payload, keep_alive=True):
+    if isinstance(payload, str):
+        body, kind = payload.encode('utf-8'), 'text/plain; charset=utf-8'
+    else:
+        body, kind = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+    head = (f"HTTP/1.1 {status} {ESTADOS.get(status, '')}\r\n"
+            f"Content-Type: {kind}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+async def run_server(service, host='127.0.0.1', port=9200, reuse_port=False):
+    """Atiende el servicio hasta que se cancele"""
+    server = await asyncio.start_server(service.handle, host, port, reuse_port=reuse_port or None)
+    async with server:
+        await server.serve_forever()
+
+def worker_main(store, padded, options):
+    """Proceso de trabajo: comparte store y flujos rellenados con el proceso principal"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    service = PricingService(store, options['liquidacion'], options['base'], options['ventana'], padded)
+    try:
+        asyncio.run(run_server(service, options['host'], options['puerto'], options['reuse_port']))
+    except KeyboardInterrupt:
+        pass
+
+def serve(path='bonos_flujos.xlsx', host='127.0.0.1', port=9200, processes=1, settlement=None,
+          day_count_basis='ACT/365', window=VENTANA_LOTE, indices_path=None):
+    """Carga el store una vez y atiende con uno o varios procesos en el mismo puerto"""
+    from bonos.indices import load_indexed_store
+
+    # El store sale del snapshot mapeado en memoria y los flujos rellenados se arman acá:
+    # los procesos creados con fork comparten esas páginas en lugar de copiarlas
+    store, errores = load_indexed_store(path, indices_path)
+    for bono, error in errores.items():
+        print(f"{bono}: {error}", file=sys.stderr)
+    padded = PaddedFlows(store.to_frame(), store.ajuste)
+    options = {'host': host, 'puerto': port, 'liquidacion': settlement, 'base': day_count_basis,
+               'ventana': window, 'reuse_port': processes > 1}
+
+    if processes <= 1 or not hasattr(socket, 'SO_REUSEPORT') or \
+            'fork' not in multiprocessing.get_all_start_methods():
+        if processes > 1:
+            print("SO_REUSEPORT o fork no disponibles: se atiende con un solo proceso", file=sys.stderr)
+        options['reuse_port'] = False
+        worker_main(store, padded, options)
+        return
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=worker_main, args=(store, padded, options), daemon=True)
+               for _ in range(processes)]
+
+    # SIGTERM en el proceso principal también baja a los workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except (KeyboardInterrupt, SystemExit):
+        for worker in workers:
+            worker.terminate()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de valuación de bonos")
+    parser.add_argument('--planilla', default='bonos_flujos.xlsx')
+    parser.add_argument('--indices', help="fijaciones de CER, BADLAR y TAMAR para ajustar los bonos indexados")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=9200)
+    parser.add_argument('--procesos', type=int, default=1, help="procesos que atienden el mismo puerto")
+    parser.add_argument('--liquidacion', default=datetime.date.today().isoformat(),
+                        help="fecha de liquidación por defecto (AAAA-MM-DD)")
+    parser.add_argument('--base', default='ACT/365', help="base de cálculo de la TIR")
+    parser.add_argument('--ventana-ms', type=float, default=VENTANA_LOTE * 1000,
+                        help="milisegundos durante los que se juntan cotizaciones en un lote")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    serve(args.planilla, args.host, args.puerto, args.procesos,
+          datetime.date.fromisoformat(args.liquidacion), args.base, args.ventana_ms / 1000, args.indices)
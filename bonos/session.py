@@ -0,0 +1,96 @@
+import numpy as np
+
+from bonos.cashflows import CashFlows
+from bonos.daycount import days_per_year, normalize_basis, year_fraction
+from bonos.metrics import timed
+from bonos.risk import price_from_yield
+from bonos.schedule import day_number
+from bonos.solver import solve_ytm
+
+
+class SolverSession:
+    """Sesión de cálculo de un bono: conserva los flujos, los plazos y la última TIR resuelta
+
+    Cada cotización nueva arranca Newton desde la TIR anterior, así que un cambio chico de
+    precio converge en una o dos iteraciones. Si cambia la liquidación solo se recalculan los
+    plazos de los flujos que siguen vigentes.
+    """
+
+    def __init__(self, fechas, pago_capital_porcentaje, cupon_porcentaje, day_count_basis='ACT/365', guess=0.05):
+        fechas = np.asarray(fechas, dtype=np.int64)
+        order = np.argsort(fechas, kind='stable')
+        self.flujos = CashFlows(
+            fechas[order],
+            np.asarray(pago_capital_porcentaje, dtype=np.float64)[order],
+            np.asarray(cupon_porcentaje, dtype=np.float64)[order],
+        )
+        self.day_count_basis = day_count_basis
+        self.ytm = guess
+
+        self.settlement = None
+        self.vigentes = self.flujos[len(self.flujos):]
+        # Flujo 0: pago del precio en la liquidación; el resto, flujos futuros del bono
+        self.times = np.zeros(1)
+        self.amounts = np.zeros(1)
+
+    @classmethod
+    def from_frame(cls, bono_flows, day_count_basis='ACT/365'):
+        """Arma la sesión a partir de las filas de un bono en el DataFrame de flujos"""
+        return cls(
+            bono_flows['fecha'].values.astype('datetime64[D]').astype(np.int64),
+            bono_flows['pago_capital_porcentaje'].to_numpy(dtype=np.float64),
+            bono_flows['cupon_porcentaje'].to_numpy(dtype=np.float64),
+            day_count_basis,
+        )
+
+    @classmethod
+    def from_store(cls, store, bono, day_count_basis='ACT/365'):
+        """Arma la sesión de un bono a partir del store compilado"""
+        flows = store.bond_flows(bono)
+        return cls(flows.fechas, flows.pago_capital_porcentaje, flows.cupon_porcentaje, day_count_basis)
+
+    @timed('flujos_liquidacion')
+    def set_settlement(self, settlement):
+        """Mueve la fecha de liquidación recalculando solo los plazos de los flujos vigentes"""
+        settlement = day_number(settlement)
+        if settlement == self.settlement:
+            return self
+
+        vigentes = self.flujos.after(settlement)
+        fechas = vigentes.fechas
+        if normalize_basis(self.day_count_basis) in ('ACT/360', 'ACT/365F'):
+            # Bases ACT con divisor fijo: el plazo es la diferencia de días, sin pasar por fechas
+            times = (fechas - settlement) / days_per_year(self.day_count_basis)
+        else:
+            times = year_fraction(settlement, fechas, self.day_count_basis)
+
+        self.settlement = settlement
+        self.vigentes = vigentes
+        self.times = np.concatenate(([0.0], times))
+        self.amounts = np.concatenate(([0.0], vigentes.total))
+        return self
+
+    @property
+    def has_flows(self):
+        """Indica si quedan flujos futuros a la liquidación actual"""
+        return len(self.times) > 1
+
+    @timed('solver')
+    def solve(self, dirty_price, settlement=None, max_iterations=100, tolerance=1e-8):
+        """TIR efectiva anual para el precio sucio, arrancando desde la última TIR resuelta"""
+        if settlement is not None:
+            self.set_settlement(settlement)
+        if not self.has_flows:
+            raise ValueError("No hay flujos de caja futuros para la fecha de liquidación seleccionada")
+        self.amounts[0] = -dirty_price
+        self.ytm = solve_ytm(self.times, self.amounts, guess=self.ytm,
+                             max_iterations=max_iterations, tolerance=tolerance)
+        return self.ytm
+
+    def risk(self, ytm=None, accrued=0.0):
+        """Precio, duraciones, convexidad, DV01 y PV01 de los flujos futuros a la TIR dada (o la última)"""
+        return price_from_yield(self.times[1:], self.amounts[1:], self.ytm if ytm is None else ytm, accrued)
+
+    def cash_flows(self, dirty_price):
+        """Flujos a la liquidación actual con el precio como flujo inicial (como process_irregular_flows)"""
+        return self.vigentes.with_price(self.settlement, dirty_price, self.day_count_basis)
@@ -0,0 +1,171 @@
+import numpy as np
+
+from bonos.metrics import count, count_many
+
+# Límites del intervalo de búsqueda de la TIR
+TIR_MINIMA = -0.99
+TIR_MAXIMA = 2.0
+
+
+# Función para calcular valor presente y derivada en una sola pasada
+def pv_and_derivative(times, amounts, yield_rate):
+    """Calcula el valor presente de los flujos y su derivada respecto de la tasa"""
+    discount = np.exp(-times * np.log1p(yield_rate))
+    pv_flows = amounts * discount
+    pv = pv_flows.sum()
+    derivative = -(times * pv_flows).sum() / (1 + yield_rate)
+    return pv, derivative
+
+# Paso de Newton extra tras la convergencia: el criterio por paso deja errores del orden
+# de la tolerancia cerca de tasas negativas, donde la derivada es grande
+def polish(times, amounts, ytm):
+    """Aplica un paso de Newton más a una TIR ya convergida si el resultado es finito"""
+    pv, derivative = pv_and_derivative(times, amounts, ytm)
+    if pv == 0 or derivative == 0:
+        return ytm
+    polished = ytm - pv / derivative
+    return polished if np.isfinite(polished) else ytm
+
+# Función para resolver la TIR sobre arrays de tiempos y montos
+def solve_ytm(times, amounts, guess=0.05, low=TIR_MINIMA, high=TIR_MAXIMA, max_iterations=100, tolerance=1e-8):
+    """Resuelve la TIR con Newton-Raphson acotado: si el paso sale del intervalo se bisecta"""
+    times = np.ascontiguousarray(times, dtype=np.float64)
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+
+    pv_low, _ = pv_and_derivative(times, amounts, low)
+    pv_high, _ = pv_and_derivative(times, amounts, high)
+
+    # Sin cambio de signo no hay raíz en el intervalo: devolver el extremo
+    # hacia el que convergía la búsqueda binaria original
+    if pv_low == 0:
+        return low
+    if pv_high == 0:
+        return high
+    if (pv_low > 0) == (pv_high > 0):
+        count('solver_sin_raiz')
+        return low if pv_low < 0 else high
+
+    ytm = guess if low < guess < high else (low + high) / 2
+    iterations = bisections = 0
+    converged = True
+    for iterations in range(1, max_iterations + 1):
+        pv, derivative = pv_and_derivative(times, amounts, ytm)
+        if pv == 0:
+            break
+
+        # Achicar el intervalo manteniendo el cambio de signo
+        if (pv > 0) == (pv_low > 0):
+            low, pv_low = ytm, pv
+        else:
+            high = ytm
+
+        ytm_new = ytm - pv / derivative if derivative != 0 else np.nan
+        # Paso menor a la tolerancia: convergió (aunque el arranque ya fuera la raíz y el
+        # intervalo se haya cerrado sobre ella)
+        if abs(ytm_new - ytm) < tolerance:
+            ytm = polish(times, amounts, ytm_new)
+            break
+        if not low < ytm_new < high:
+            # El paso de Newton salió del intervalo: bisectar
+            bisections += 1
+            ytm_new = (low + high) / 2
+            if high - low < tolerance * 1e-6:
+                ytm = ytm_new
+                break
+
+        ytm = ytm_new
+    else:
+        converged = False
+
+    count_many((('solver_resoluciones', 1), ('solver_iteraciones', iterations),
+                ('solver_bisecciones', bisections), ('solver_sin_convergencia', 0 if converged else 1)))
+    return ytm
+
+# Versión matricial: una fila por bono, flujos rellenados con ceros
+def pv_and_derivative_matrix(times, amounts, yields):
+    """Calcula valor presente y derivada para cada fila de una matriz de flujos"""
+    discount = np.exp(-times * np.log1p(yields)[:, None])
+    pv_flows = amounts * discount
+    pv = pv_flows.sum(axis=1)
+    derivative = -(times * pv_flows).sum(axis=1) / (1 + yields)
+    return pv, derivative
+
+def polish_matrix(times, amounts, ytm):
+    """Versión matricial de polish: un paso de Newton más por fila"""
+    pv, derivative = pv_and_derivative_matrix(times, amounts, ytm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        polished = ytm - pv / derivative
+    return np.where(np.isfinite(polished), polished, ytm)
+
+def solve_ytm_matrix(times, amounts, guess=0.05, low=TIR_MINIMA, high=TIR_MAXIMA, max_iterations=100, tolerance=1e-8):
+    """Resuelve la TIR de todas las filas a la vez con el mismo Newton acotado de solve_ytm"""
+    times = np.ascontiguousarray(times, dtype=np.float64)
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    n_rows = times.shape[0]
+    all_times, all_amounts = times, amounts
+    by_step = np.zeros(n_rows, dtype=bool)
+
+    low = np.full(n_rows, low, dtype=np.float64)
+    high = np.full(n_rows, high, dtype=np.float64)
+    pv_low, _ = pv_and_derivative_matrix(times, amounts, low)
+    pv_high, _ = pv_and_derivative_matrix(times, amounts, high)
+
+    # Filas sin cambio de signo: mismo criterio que solve_ytm
+    result = np.full(n_rows, np.nan)
+    result = np.where((pv_low < 0) & (pv_high < 0), low, result)
+    result = np.where((pv_low > 0) & (pv_high > 0), high, result)
+    result = np.where(pv_high == 0, high, result)
+    result = np.where(pv_low == 0, low, result)
+
+    # Trabajar solo con las filas que siguen activas
+    rows = np.flatnonzero(np.isnan(result))
+    times, amounts = times[rows], amounts[rows]
+    low, high, pv_low = low[rows], high[rows], pv_low[rows]
+    guess = np.broadcast_to(np.asarray(guess, dtype=np.float64), (n_rows,))[rows]
+    ytm = np.where((low < guess) & (guess < high), guess, (low + high) / 2)
+
+    iterations = bisections = 0
+    for _ in range(max_iterations):
+        if rows.size == 0:
+            break
+        iterations += 1
+
+        pv, derivative = pv_and_derivative_matrix(times, amounts, ytm)
+        exact = pv == 0
+
+        # Achicar el intervalo manteniendo el cambio de signo
+        same_sign = (pv > 0) == (pv_low > 0)
+        low = np.where(same_sign, ytm, low)
+        pv_low = np.where(same_sign, pv, pv_low)
+        high = np.where(same_sign, high, ytm)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ytm_new = ytm - pv / derivative
+        inside = (low < ytm_new) & (ytm_new < high)
+        converged = np.abs(ytm_new - ytm) < tolerance
+        inside |= converged
+
+        # El paso de Newton salió del intervalo: bisectar
+        bisections += int(np.count_nonzero(~inside))
+        ytm_new = np.where(inside, ytm_new, (low + high) / 2)
+        converged |= ~inside & (high - low < tolerance * 1e-6)
+
+        result[rows[exact]] = ytm[exact]
+        converged &= ~exact
+        result[rows[converged]] = ytm_new[converged]
+        by_step[rows[converged]] = True
+
+        pending = ~(exact | converged)
+        if not pending.all():
+            rows, times, amounts = rows[pending], times[pending], amounts[pending]
+            low, high, pv_low = low[pending], high[pending], pv_low[pending]
+            ytm_new = ytm_new[pending]
+        ytm = ytm_new
+
+    result[rows] = ytm
+    refine = np.flatnonzero(by_step)
+    if refine.size:
+        result[refine] = polish_matrix(all_times[refine], all_amounts[refine], result[refine])
+    count_many((('solver_matricial_filas', n_rows), ('solver_matricial_iteraciones', iterations),
+                ('solver_matricial_bisecciones', bisections), ('solver_sin_convergencia', rows.size)))
+    return result
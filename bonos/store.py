@@ -0,0 +1,485 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from bonos.metrics import timed
+
+# Versión del formato del snapshot: cambiarla invalida los snapshots existentes
+VERSION_SNAPSHOT = 2
+
+COLUMNAS_NUMERICAS = ['tasa_cupon', 'cupon_porcentaje', 'pago_capital_porcentaje', 'flujo_total']
+
+# Flujos de un bono: fechas en días desde 1970-01-01 y las columnas float64 del store
+BondFlows = namedtuple('BondFlows', ['fechas'] + COLUMNAS_NUMERICAS)
+
+
+@timed('lectura_planilla')
+def read_raw_workbook(path):
+    """Lee la planilla sin encabezados probando varias estrategias de compatibilidad"""
+    import pandas as pd
+
+    flows_df = None
+
+    # Estrategia 1: openpyxl (más compatible con archivos modernos)
+    try:
+        flows_df = pd.read_excel(path, header=None, engine='openpyxl')
+    except:
+        pass
+
+    # Estrategia 2: xlrd (para archivos más antiguos)
+    if flows_df is None:
+        try:
+            flows_df = pd.read_excel(path, header=None, engine='xlrd')
+        except:
+            pass
+
+    # Estrategia 3: pandas por defecto
+    if flows_df is None:
+        try:
+            flows_df = pd.read_excel(path, header=None)
+        except:
+            pass
+
+    # Estrategia 4: con diferentes parámetros
+    if flows_df is None:
+        try:
+            flows_df = pd.read_excel(path, header=None, engine='openpyxl', na_values=[''])
+        except:
+            pass
+
+    # Estrategia 5: ignorar validaciones y formato
+    if flows_df is None:
+        try:
+            flows_df = pd.read_excel(path, header=None, engine='openpyxl',
+                                   na_values=['', ' ', 'N/A', 'n/a'],
+                                   keep_default_na=False)
+        except:
+            pass
+
+    # Estrategia 6: leer como texto puro
+    if flows_df is None:
+        try:
+            flows_df = pd.read_excel(path, header=None, engine='openpyxl',
+                                   dtype=str, na_values=[''])
+        except:
+            pass
+
+    if flows_df is None:
+        raise Exception("No se pudo cargar el archivo con ninguna estrategia")
+
+    return flows_df
+
+def parse_bond_types(raw_df):
+    """Extrae los tipos de bono de las celdas J6:J8 de la planilla ya leída"""
+    import pandas as pd
+
+    tipos_bonos_disponibles = []
+
+    # J6:J8 son las filas 6 a 8 (índices 5 a 7) de la columna J (índice 9)
+    if raw_df.shape[1] > 9:
+        for cell_value in raw_df.iloc[5:8, 9]:
+            if pd.isna(cell_value):
+                continue
+            tipo = str(cell_value).strip()
+            if tipo and tipo.lower() not in ['nan', 'none', '']:
+                tipos_bonos_disponibles.append(tipo)
+
+    if not tipos_bonos_disponibles:
+        tipos_bonos_disponibles = ["Todos"]  # Valor por defecto
+
+    return tipos_bonos_disponibles
+
+def parse_cell_dates(values):
+    """pd.to_datetime de cada valor con su propio formato; NaT si no es una fecha"""
+    import pandas as pd
+
+    values = pd.Index(values, dtype=object)
+    try:
+        return pd.Series(pd.to_datetime(values, errors='coerce', format='mixed'))
+    except (TypeError, ValueError):
+        # Zonas horarias mezcladas: valor por valor
+        return pd.Series([pd.to_datetime(value, errors='coerce') for value in values], dtype=object)
+
+def parse_cells(values):
+    """Convierte celdas como float(str(x).replace(',', '.')): vacías en 0; devuelve valores e inválidas"""
+    import pandas as pd
+
+    values = np.asarray(values, dtype=object)
+    invalid = np.zeros(len(values), dtype=bool)
+    if pd.api.types.infer_dtype(values, skipna=True) in ('floating', 'integer', 'mixed-integer-float'):
+        # Celdas que ya son números: float(str(x)) devuelve el mismo x
+        return np.where(pd.isna(values), 0.0, values).astype(np.float64), invalid
+
+    text = np.char.replace(values.astype(str), ',', '.')
+    stripped = np.char.strip(text)
+    empty = pd.isna(values) | (stripped == '') | (stripped == 'nan')
+    text = np.where(empty, '0', text)
+
+    try:
+        numbers = text.astype(np.float64)
+    except ValueError:
+        # Hay celdas que no son números: convertir cada texto distinto una sola vez
+        uniques, inverse = np.unique(text, return_inverse=True)
+        parsed = np.empty(len(uniques))
+        bad = np.zeros(len(uniques), dtype=bool)
+        for j, value in enumerate(uniques):
+            try:
+                parsed[j] = float(value)
+            except ValueError:
+                parsed[j], bad[j] = 0.0, True
+        numbers, invalid = parsed[inverse], bad[inverse]
+    return numbers, invalid
+
+def parse_bond_header(row):
+    """Base de cálculo, periodicidad, tipo e índice de la fila con el nombre del bono (columnas B a E)"""
+    import pandas as pd
+
+    # Extraer base de cálculo de la celda contigua (columna B)
+    try:
+        base_calculo_bono = str(row[1]).strip() if not pd.isna(row[1]) else "ACT/365"
+    except:
+        base_calculo_bono = "ACT/365"
+
+    # Extraer periodicidad de la siguiente celda (columna C)
+    try:
+        periodicidad = int(float(str(row[2]))) if not pd.isna(row[2]) and str(row[2]).strip() not in ['', 'nan'] else 12
+    except:
+        periodicidad = 12
+
+    # Extraer tipo de bono de la siguiente celda (columna D)
+    try:
+        tipo_bono = str(row[3]).strip() if not pd.isna(row[3]) else "Sin clasificar"
+    except:
+        tipo_bono = "Sin clasificar"
+
+    # Índice de ajuste opcional (columna E): CER, BADLAR+5, TAMAR+3;piso=20, ...
+    try:
+        indice = str(row[4]).strip() if len(row) > 4 and not pd.isna(row[4]) else ""
+    except:
+        indice = ""
+
+    return base_calculo_bono, periodicidad, tipo_bono, indice
+
+@timed('parseo_filas')
+def parse_flows(raw_df):
+    """Convierte la planilla cruda (nombre de bono seguido de filas con fecha) en un DataFrame de flujos
+
+    Cada valor distinto de la columna A se clasifica una sola vez: si su texto es una fecha la
+    fila es un flujo, si no es el nombre de un bono nuevo. Los datos de cabecera se propagan a
+    los flujos que siguen y las columnas numéricas se convierten en bloque.
+    """
+    import pandas as pd
+
+    if raw_df.shape[1] < 5 or len(raw_df) == 0:
+        return pd.DataFrame()
+
+    first = raw_df[0].to_numpy(dtype=object)
+    rows = np.flatnonzero(~pd.isna(first))
+    codes, uniques = pd.factorize(first[rows])
+
+    # Saltar celdas vacías o con solo espacios; el resto es fecha o nombre de bono
+    text = [str(value).strip() for value in uniques]
+    blank = np.array([not t or t.lower() in ['nan', 'none', ''] for t in text], dtype=bool)
+    is_date = parse_cell_dates(text).notna().to_numpy()
+    fechas = parse_cell_dates(uniques[is_date])
+    date_index = np.cumsum(is_date) - 1
+
+    # Números en la columna A llevan la conversión a nanosegundos, que deja afuera años
+    # como 9999: esas fechas se convierten de a una, como el resto de los valores raros
+    missing = np.flatnonzero(fechas.isna().to_numpy())
+    if len(missing):
+        values = uniques[is_date]
+        retried = [pd.to_datetime(values[i], errors='coerce') for i in missing]
+        if any(not pd.isna(date) for date in retried):
+            fechas = fechas.astype(object)
+            fechas.iloc[missing] = retried
+            fechas = pd.Series(list(fechas))
+
+    header_rows = rows[~blank[codes] & ~is_date[codes]]
+    flow_rows = rows[~blank[codes] & is_date[codes]]
+    flow_codes = codes[~blank[codes] & is_date[codes]]
+
+    # Cada flujo pertenece al último bono declarado antes que él; los que no tienen bono
+    # o cuya celda no se puede convertir a fecha se descartan
+    owner = np.searchsorted(header_rows, flow_rows) - 1
+    flow_dates = fechas.iloc[date_index[flow_codes]].reset_index(drop=True)
+    keep = (owner >= 0) & flow_dates.notna().to_numpy()
+    flow_rows, flow_dates, owner = flow_rows[keep], flow_dates[keep].reset_index(drop=True), owner[keep]
+    if len(flow_rows) == 0:
+        return pd.DataFrame()
+
+    headers = raw_df.iloc[header_rows, :5].to_numpy(dtype=object)
+    nombres = [str(value).strip() for value in headers[:, 0]]
+    bases, periodicidades, tipos, indices = zip(*(parse_bond_header(row) for row in headers))
+
+    # Nueva estructura: A=fecha, B=tasa_cupon, C=cupon, D=capital, E=total
+    values = raw_df.iloc[flow_rows, 1:5].to_numpy(dtype=object)
+    tasa_cupon, _ = parse_cells(values[:, 0])
+    cupon, _ = parse_cells(values[:, 1])
+    capital, _ = parse_cells(values[:, 2])
+    flujo_total, invalid = parse_cells(values[:, 3])
+    flujo_total = np.where(invalid, cupon + capital, flujo_total)
+
+    return pd.DataFrame({
+        'nombre_bono': [nombres[k] for k in owner],
+        'base_calculo': [bases[k] for k in owner],
+        'periodicidad': np.asarray(periodicidades, dtype=np.int64)[owner],
+        'tipo_bono': [tipos[k] for k in owner],
+        'indice': [indices[k] for k in owner],
+        'fecha': flow_dates,
+        'tasa_cupon': tasa_cupon,
+        'cupon_porcentaje': cupon,
+        'pago_capital_porcentaje': capital,
+        'flujo_total': flujo_total,
+    })
+
+
+class FlowStore:
+    """Flujos de todos los bonos compilados en arrays columnares con offsets por bono"""
+
+    def __init__(self, nombres, bases, periodicidades, tipos_bono, offsets, fechas,
+                 tasa_cupon, cupon_porcentaje, pago_capital_porcentaje, flujo_total,
+                 tipos_disponibles, sha1=None, indices=None, ajuste=None):
+        # Datos por bono
+        self.nombres = list(nombres)
+        self.bases = list(bases)
+        self.periodicidades = np.asarray(periodicidades, dtype=np.int64)
+        self.tipos_bono = list(tipos_bono)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        # Índice de ajuste del bono ('CER', 'BADLAR+5', ...; vacío si no ajusta)
+        self.indices = list(indices) if indices is not None else [''] * len(self.nombres)
+
+        # Datos por flujo: fechas como días desde 1970-01-01
+        self.fechas = fechas
+        self.tasa_cupon = tasa_cupon
+        self.cupon_porcentaje = cupon_porcentaje
+        self.pago_capital_porcentaje = pago_capital_porcentaje
+        self.flujo_total = flujo_total
+
+        self.tipos_disponibles = list(tipos_disponibles)
+        # SHA-1 del archivo de origen (None si el store no salió de un archivo)
+        self.sha1 = sha1
+        # Coeficientes de los bonos ajustados por CER/UVA (IndexAdjustment; None sin ajuste)
+        self.ajuste = ajuste
+        self.index = {nombre: i for i, nombre in enumerate(self.nombres)}
+        self._frame = None
+
+    def __len__(self):
+        return len(self.nombres)
+
+    @classmethod
+    @timed('construccion_flujos')
+    def from_frame(cls, flows_df, tipos_disponibles):
+        """Compila un DataFrame de flujos agrupando las filas de cada bono de forma contigua"""
+        import pandas as pd
+
+        if len(flows_df) == 0:
+            empty = np.zeros(0)
+            return cls([], [], [], [], [0], np.zeros(0, dtype=np.int64),
+                       empty, empty, empty, empty, tipos_disponibles)
+
+        codes, nombres = pd.factorize(flows_df['nombre_bono'])
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(nombres))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        first = order[offsets[:-1]]
+
+        fechas = flows_df['fecha'].values.astype('datetime64[D]').astype(np.int64)[order]
+        numeric = {c: flows_df[c].to_numpy(dtype=np.float64)[order] for c in COLUMNAS_NUMERICAS}
+
+        return cls(
+            [str(n) for n in nombres],
+            [str(b) for b in flows_df['base_calculo'].to_numpy(dtype=object)[first]],
+            flows_df['periodicidad'].to_numpy(dtype=np.int64)[first],
+            [str(t) for t in flows_df['tipo_bono'].to_numpy(dtype=object)[first]],
+            offsets, fechas,
+            numeric['tasa_cupon'], numeric['cupon_porcentaje'],
+            numeric['pago_capital_porcentaje'], numeric['flujo_total'],
+            tipos_disponibles,
+            indices=([str(i) for i in flows_df['indice'].to_numpy(dtype=object)[first]]
+                     if 'indice' in flows_df.columns else None)
+        )
+
+    def to_frame(self, codes=None):
+        """Reconstruye el DataFrame de flujos con el formato que usa la aplicación
+
+        Con codes (índices de bono) arma solo el de esos bonos, sin pasar por el completo.
+        """
+        if codes is not None:
+            return self._build_frame(np.asarray(codes, dtype=np.int64))
+        if self._frame is None:
+            self._frame = self._build_frame(None)
+        return self._frame
+
+    def _build_frame(self, codes):
+        import pandas as pd
+
+        if codes is None:
+            rows, owner = slice(None), np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        else:
+            rows, owner = self.flow_rows(codes)
+            owner = codes[owner]
+        return pd.DataFrame({
+            'nombre_bono': np.asarray(self.nombres, dtype=object)[owner],
+            'base_calculo': np.asarray(self.bases, dtype=object)[owner],
+            'periodicidad': self.periodicidades[owner],
+            'tipo_bono': np.asarray(self.tipos_bono, dtype=object)[owner],
+            'indice': np.asarray(self.indices, dtype=object)[owner],
+            'fecha': pd.to_datetime(np.asarray(self.fechas[rows]).astype('datetime64[D]')),
+            'tasa_cupon': np.asarray(self.tasa_cupon[rows]),
+            'cupon_porcentaje': np.asarray(self.cupon_porcentaje[rows]),
+            'pago_capital_porcentaje': np.asarray(self.pago_capital_porcentaje[rows]),
+            'flujo_total': np.asarray(self.flujo_total[rows]),
+        })
+
+    def bond_flows(self, bono):
+        """Columnas de flujos de un bono (vistas de las del store)"""
+        i = self.index[bono]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return BondFlows(*(getattr(self, name)[start:end] for name in BondFlows._fields))
+
+    def flow_rows(self, codes):
+        """Filas de flujos de los bonos dados (por índice), en orden, y la posición en codes de cada una"""
+        codes = np.asarray(codes, dtype=np.int64)
+        starts = self.offsets[codes]
+        counts = self.offsets[codes + 1] - starts
+        owner = np.repeat(np.arange(len(codes)), counts)
+        # Dentro de cada segmento la fila avanza de a uno desde el inicio del bono
+        first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = starts[owner] + np.arange(int(counts.sum())) - first[owner]
+        return rows, owner
+
+    def save(self, directory, key):
+        """Guarda el snapshot: un .npy por columna y los datos por bono en meta.json"""
+        os.makedirs(directory, exist_ok=True)
+
+        # Cada columna se escribe aparte y reemplaza el archivo entero: un store abierto sobre
+        # el snapshot anterior sigue leyendo sus columnas, y sin meta.json el snapshot a medio
+        # escribir no se usa
+        try:
+            os.remove(os.path.join(directory, 'meta.json'))
+        except FileNotFoundError:
+            pass
+        for name in ['offsets', 'fechas'] + COLUMNAS_NUMERICAS:
+            tmp = os.path.join(directory, f'{name}.npy.tmp')
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp, os.path.join(directory, f'{name}.npy'))
+
+        meta = dict(key)
+        meta.update({
+            'nombres': self.nombres,
+            'bases': self.bases,
+            'periodicidades': self.periodicidades.tolist(),
+            'tipos_bono': self.tipos_bono,
+            'indices': self.indices,
+            'tipos_disponibles': self.tipos_disponibles,
+        })
+        # meta.json se escribe al final: si existe, el snapshot está completo
+        write_snapshot_meta(directory, meta)
+
+    @classmethod
+    @timed('apertura_snapshot')
+    def load(cls, directory, meta):
+        """Abre un snapshot mapeando las columnas en memoria en lugar de leerlas"""
+        columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                   for name in ['offsets', 'fechas'] + COLUMNAS_NUMERICAS}
+        return cls(
+            meta['nombres'], meta['bases'], meta['periodicidades'], meta['tipos_bono'],
+            np.asarray(columns['offsets']), columns['fechas'],
+            columns['tasa_cupon'], columns['cupon_porcentaje'],
+            columns['pago_capital_porcentaje'], columns['flujo_total'],
+            meta['tipos_disponibles'], meta.get('sha1'), meta.get('indices')
+        )
+
+
+def file_hash(path):
+    """Calcula el SHA-1 del contenido del archivo"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def snapshot_dir(path):
+    """Directorio del snapshot compilado de una planilla"""
+    folder, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, '.cache_bonos', os.path.splitext(filename)[0])
+
+def read_snapshot_meta(directory):
+    """Lee meta.json del snapshot o devuelve None si no existe o está dañado"""
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_snapshot_meta(directory, meta):
+    """Escribe meta.json de forma atómica"""
+    tmp = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(directory, 'meta.json'))
+
+def open_snapshot(path, stat, extra=None):
+    """Abre el snapshot compilado del archivo si sigue vigente; None si hay que regenerarlo
+
+    extra son datos adicionales de la clave (además del archivo) que deben coincidir.
+    """
+    directory = snapshot_dir(path)
+    meta = read_snapshot_meta(directory)
+    if meta is None or meta.get('version') != VERSION_SNAPSHOT:
+        return None
+    if any(meta.get(k) != v for k, v in (extra or {}).items()):
+        return None
+
+    # Camino rápido: misma fecha de modificación y tamaño
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return FlowStore.load(directory, meta)
+
+    # La fecha cambió pero el contenido puede ser el mismo
+    if meta.get('sha1') == file_hash(path):
+        meta['mtime_ns'], meta['size'] = stat.st_mtime_ns, stat.st_size
+        try:
+            write_snapshot_meta(directory, meta)
+        except OSError:
+            pass
+        return FlowStore.load(directory, meta)
+    return None
+
+def save_snapshot(store, path, stat, extra=None):
+    """Guarda el snapshot de un store compilado desde el archivo (si se puede escribir)"""
+    key = {'version': VERSION_SNAPSHOT, 'mtime_ns': stat.st_mtime_ns,
+           'size': stat.st_size, 'sha1': file_hash(path)}
+    key.update(extra or {})
+    store.sha1 = key['sha1']
+    try:
+        store.save(snapshot_dir(path), key)
+    except OSError:
+        # Sin permisos de escritura: seguir sin snapshot
+        pass
+
+@timed('carga_planilla')
+def load_store(path='bonos_flujos.xlsx'):
+    """Carga los flujos desde el snapshot compilado o, si la planilla cambió, la parsea y lo regenera
+
+    También acepta el CSV de bonos_irregulares_ejemplo.csv y Parquet con el mismo esquema.
+    """
+    stat = os.stat(path)
+    store = open_snapshot(path, stat)
+    if store is not None:
+        return store
+
+    # CSV y Parquet se compilan por bloques, sin pasar por un DataFrame completo
+    if os.path.splitext(path)[1].lower() in ('.csv', '.txt', '.parquet', '.pq'):
+        from bonos.ingest import ingest_file
+
+        return ingest_file(path, snapshot_dir(path))[0]
+
+    raw_df = read_raw_workbook(path)
+    store = FlowStore.from_frame(parse_flows(raw_df), parse_bond_types(raw_df))
+    save_snapshot(store, path, stat)
+    return store
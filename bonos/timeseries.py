@@ -0,0 +1,182 @@
+import numpy as np
+
+from bonos.batch import COLUMNAS_RESULTADO
+from bonos.daycount import year_fraction
+from bonos.metrics import timed
+from bonos.risk import price_from_yield
+from bonos.schedule import BondSchedule
+from bonos.solver import solve_ytm_matrix
+
+# Días entre las TIR que se resuelven primero para arrancar las demás
+DIAS_POR_MUESTRA = 16
+
+
+def series_days(start, end, holidays=None):
+    """Días hábiles entre start y end (ambos inclusive) como días desde 1970-01-01"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    days = days[np.is_busday(days, holidays=holidays or [])]
+    return days.astype(np.int64)
+
+def price_vector(prices, days):
+    """Precio sucio de cada día: constante, array alineado con los días o Series por fecha
+
+    Con una Series, los días sin precio toman el último precio anterior.
+    """
+    if np.ndim(prices) == 0:
+        return np.full(len(days), float(prices))
+    if hasattr(prices, 'index'):
+        import pandas as pd
+
+        series = pd.Series(np.asarray(prices, dtype=np.float64),
+                           index=pd.to_datetime(prices.index).values.astype('datetime64[D]'))
+        series = series[~series.index.duplicated(keep='last')].sort_index()
+        return series.reindex(days.astype('datetime64[D]'), method='ffill').to_numpy(dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) != len(days):
+        raise ValueError(f"Se esperaban {len(days)} precios, uno por día hábil, y hay {len(prices)}")
+    return prices
+
+
+def schedule_series(schedule, days, base_calculo='ACT/365', periodicidad=12, day_count_basis='ACT/365'):
+    """Estado de un bono para cada día (días ordenados) y sus flujos futuros por día
+
+    El estado del cronograma avanza con los días: como las fechas están ordenadas, una sola
+    búsqueda ordenada ubica para cada día el último cupón, la tasa vigente y el capital
+    amortizado sin volver a recorrer los flujos.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    fechas = schedule.fechas
+
+    # Estado a cada día: último cupón con tasa anterior al día, tasa vigente y capital residual
+    # (k = -1 antes del primer cupón: toma el 0 agregado al final)
+    k = np.searchsorted(schedule.fechas_tasa, days, side='left') - 1
+    coupon_rate = np.append(schedule.tasas, 0.0)[k]
+    last_coupon = np.where(k >= 0, np.append(schedule.fechas_tasa, 0)[k], days)
+    paid = np.searchsorted(fechas, days, side='left')
+    capital_residual = (100.0 - schedule.amortizacion[paid]) * schedule.coefficients(days)
+
+    # Próximo pago de cupón desde cada día (inclusive)
+    j = np.searchsorted(schedule.fechas_cupon, days, side='left')
+    next_coupon = np.append(schedule.fechas_cupon, 0)[j].astype('datetime64[D]')
+    next_coupon = np.where(j < len(schedule.fechas_cupon), next_coupon, np.datetime64('NaT', 'D'))
+
+    accrual_years = year_fraction(last_coupon, days, base_calculo,
+                                  schedule=schedule.fechas_tasa, frequency=periodicidad)
+
+    # Flujos desde cada día (inclusive), alineados a la izquierda: la fila del día d tiene en
+    # la columna j el flujo paid[d] + j, así las columnas de flujos ya pagados no se recorren
+    n_flows = len(fechas)
+    width = n_flows - int(paid[0]) if len(days) else 0
+    position = paid[:, None] + np.arange(width)[None, :]
+    exists = position < n_flows
+    position = np.minimum(position, n_flows - 1)
+    flow_dates = fechas[position]
+    capital = np.where(exists, schedule.capital[position], 0.0)
+    nominal = np.where(exists, schedule.capital_nominal[position], 0.0)
+
+    years = year_fraction(days[:, None], flow_dates, day_count_basis,
+                          schedule=schedule.fechas_tasa, frequency=periodicidad)
+    future = exists & (flow_dates > days[:, None])
+
+    # Vida media: repagos de capital nominal desde el día (inclusive)
+    total_capital = nominal.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_life = np.where(total_capital > 0, (nominal * years).sum(axis=1) / total_capital, 0.0)
+
+    return {
+        'times': np.where(future, years, 0.0),
+        'amounts': np.where(future, capital + schedule.cupon[position], 0.0),
+        'accrued': coupon_rate * capital_residual * accrual_years,
+        'capital_residual': capital_residual,
+        'average_life': average_life,
+        'next_coupon': next_coupon,
+    }
+
+def solve_series(times, amounts, price):
+    """TIR de cada día con el precio como flujo inicial (NaN si no hay precio o flujos)
+
+    La TIR cambia poco de un día al siguiente: se resuelve primero un día de cada
+    DIAS_POR_MUESTRA y la interpolación entre ellos es el punto de partida del resto, que
+    converge en una o dos iteraciones.
+    """
+    ytm = np.full(len(price), np.nan)
+    rows = np.flatnonzero((amounts != 0).any(axis=1) & np.isfinite(price))
+    if len(rows) == 0:
+        return ytm
+
+    solve_times = np.column_stack((np.zeros(len(rows)), times[rows]))
+    solve_amounts = np.column_stack((-price[rows], amounts[rows]))
+    sample = np.unique(np.append(np.arange(0, len(rows), DIAS_POR_MUESTRA), len(rows) - 1))
+    sampled = solve_ytm_matrix(solve_times[sample], solve_amounts[sample])
+    guess = np.interp(np.arange(len(rows)), sample, sampled)
+    ytm[rows] = solve_ytm_matrix(solve_times, solve_amounts, guess=guess)
+    return ytm
+
+def series_results(state, price, ytm, periodicidad):
+    """Medidas de cada día a partir del estado del bono, el precio sucio y la TIR"""
+    accrued = state['accrued']
+    risk = price_from_yield(state['times'], state['amounts'], ytm, accrued)
+
+    clean_price = price - accrued
+    technical_value = state['capital_residual'] + accrued
+    with np.errstate(divide='ignore', invalid='ignore'):
+        parity = np.where(technical_value != 0, clean_price / technical_value, 0.0)
+
+    return {
+        'precio': price,
+        'precio_limpio': clean_price,
+        'tir': ytm,
+        'tir_anualizada': periodicidad * ((1 + ytm) ** (1.0 / periodicidad) - 1),
+        'duracion_macaulay': risk.macaulay,
+        'duracion_modificada': risk.modified,
+        'convexidad': risk.convexity,
+        'dv01': risk.dv01,
+        'pv01': risk.pv01,
+        'intereses_corridos': accrued,
+        'capital_residual': state['capital_residual'],
+        'valor_tecnico': technical_value,
+        'paridad': parity,
+        'vida_media': state['average_life'],
+        'proximo_cupon': state['next_coupon'],
+    }
+
+
+def bond_series(store, bono, start, end, prices, day_count_basis='ACT/365', holidays=None):
+    """TIR, intereses corridos, paridad, capital residual y duraciones de un bono por día hábil
+
+    prices es un precio constante, una Series de precios por fecha o un array con un precio
+    por día hábil. Solo se devuelven los días anteriores al último flujo del bono.
+    """
+    return universe_series(store, {bono: prices}, start, end, day_count_basis, holidays)
+
+@timed('serie_diaria')
+def universe_series(store, prices, start, end, day_count_basis='ACT/365', holidays=None):
+    """Series diarias de varios bonos: prices es un dict bono -> precios o un DataFrame con
+    una columna por bono y las fechas como índice"""
+    import pandas as pd
+
+    days = series_days(start, end, holidays)
+    if isinstance(prices, pd.DataFrame):
+        prices = {bono: prices[bono] for bono in prices.columns}
+
+    frames = []
+    for bono, bond_prices in prices.items():
+        i = store.index[bono]
+        schedule = BondSchedule.from_store(store, bono)
+        bond_days = days[days < schedule.fechas[-1]] if len(schedule.fechas) else days[:0]
+        if len(bond_days) == 0:
+            continue
+
+        periodicidad = int(store.periodicidades[i])
+        state = schedule_series(schedule, bond_days, store.bases[i], periodicidad, day_count_basis)
+        price = price_vector(bond_prices, days)[:len(bond_days)]
+        ytm = solve_series(state['times'], state['amounts'], price)
+
+        values = series_results(state, price, ytm, periodicidad)
+        values['nombre_bono'] = np.full(len(bond_days), bono, dtype=object)
+        values['fecha_liquidacion'] = bond_days.astype('datetime64[D]')
+        frames.append(pd.DataFrame(values, columns=COLUMNAS_RESULTADO))
+
+    if not frames:
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,42 @@
+"""Datos compartidos por los tests: la planilla de ejemplo y un universo sintético chico"""
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.batch import PaddedFlows
+from bonos.store import load_store
+
+from benchmarks.run import LIQUIDACION
+from benchmarks.universe import generate_quotes, generate_universe
+
+PLANILLA = 'bonos_flujos.xlsx'
+
+
+@pytest.fixture(scope='session')
+def workbook(tmp_path_factory):
+    """Copia de la planilla: el snapshot se escribe junto a la copia y no en el repositorio"""
+    path = tmp_path_factory.mktemp('planilla') / PLANILLA
+    shutil.copy(PLANILLA, path)
+    return str(path)
+
+@pytest.fixture(scope='session')
+def store(workbook):
+    return load_store(workbook)
+
+@pytest.fixture(scope='session')
+def quotes(store):
+    """Una cotización por bono de la planilla al 2025-06-02"""
+    return pd.DataFrame({'nombre_bono': store.nombres, 'fecha_liquidacion': '2025-06-02',
+                         'precio': np.linspace(70.0, 98.0, len(store))})
+
+@pytest.fixture(scope='session')
+def universe():
+    """Universo sintético (bases ACT/365, ACT/360 y 30/360) y cotizaciones a LIQUIDACION"""
+    flows_df = generate_universe(200, seed=1)
+    return flows_df, generate_quotes(flows_df, LIQUIDACION, seed=1)
+
+@pytest.fixture(scope='session')
+def padded(universe):
+    return PaddedFlows(universe[0])
@@ -0,0 +1,29 @@
+"""Caché de resultados en memoria y en disco"""
+import datetime
+
+from bonos.cache import ResultCache
+from bonos.core import BondTerms, analyze_bond
+from bonos.schedule import ScheduleBook
+from bonos.session import SolverSession
+
+
+def test_cache_returns_same_result_from_memory_and_disk(store, tmp_path):
+    bono = store.nombres[0]
+    i = store.index[bono]
+    terms = BondTerms(store.bases[i], int(store.periodicidades[i]))
+    settlement = datetime.date(2025, 6, 2)
+    schedules = ScheduleBook(store)
+    expected = analyze_bond(SolverSession.from_store(store, bono), schedules.schedule(bono), settlement, 95.0, terms)
+
+    path = str(tmp_path / 'resultados.sqlite')
+    cache = ResultCache(path)
+    session = SolverSession.from_store(store, bono)
+    assert cache.analyze(store, bono, session, schedules.schedule(bono), settlement, 95.0, terms) == expected
+    assert cache.analyze(store, bono, session, schedules.schedule(bono), settlement, 95.0 + 1e-9, terms) == expected
+    cache.close()
+
+    # Otro proceso abre la misma base: acierto en disco
+    other = ResultCache(path)
+    assert other.analyze(store, bono, session, schedules.schedule(bono), settlement, 95.0, terms) == expected
+    assert other.stats()['aciertos_disco'] == 1
+    other.close()
@@ -0,0 +1,105 @@
+"""Curva cero: bootstrapping, actualización incremental, nodos inválidos y spreads"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.curve import ZeroCurve
+
+LIQUIDACION = '2025-01-01'
+
+
+def bond_flows(nombre, vencimiento, tasa, cuotas=1):
+    """Flujos semestrales ACT/365 desde 2024-01-01; las últimas cuotas amortizan en partes iguales"""
+    fechas = pd.date_range('2024-01-01', vencimiento, freq='6MS')
+    capital = np.zeros(len(fechas))
+    capital[-cuotas:] = 100.0 / cuotas
+    residual = 100.0 - np.concatenate(([0.0], np.cumsum(capital)[:-1]))
+    cupon = np.concatenate(([0.0], tasa * residual[1:] * np.diff(fechas).astype('timedelta64[D]').astype(float) / 365.0))
+    return pd.DataFrame({
+        'nombre_bono': nombre, 'base_calculo': 'ACT/365', 'periodicidad': 2, 'tipo_bono': 'Test',
+        'fecha': fechas, 'tasa_cupon': np.where(np.arange(len(fechas)) > 0, tasa, 0.0),
+        'cupon_porcentaje': cupon, 'pago_capital_porcentaje': capital, 'flujo_total': cupon + capital,
+    })
+
+@pytest.fixture(scope='module')
+def flows_df():
+    return pd.concat([
+        bond_flows('A1', '2026-01-01', 0.05),
+        bond_flows('A2', '2026-01-01', 0.06),
+        bond_flows('A3', '2026-01-01', 0.07),
+        bond_flows('B', '2028-01-01', 0.06),
+        bond_flows('C', '2030-01-01', 0.06, cuotas=4),
+    ], ignore_index=True)
+
+QUOTES = {'A1': 100.0, 'A2': 100.5, 'A3': 101.0, 'B': 99.0, 'C': 98.0}
+
+
+@pytest.mark.parametrize('interpolation', ['log_linear', 'monotone_convex'])
+def test_pillars_reprice(flows_df, interpolation):
+    curve = ZeroCurve(flows_df, QUOTES, LIQUIDACION, interpolation=interpolation)
+    assert curve.pillars == ['A1', 'B', 'C']
+    for bono in curve.pillars:
+        assert curve.price(bono) == pytest.approx(QUOTES[bono], abs=1e-8)
+        assert curve.z_spread(bono) == pytest.approx(0.0, abs=1e-8)
+
+@pytest.mark.parametrize('interpolation', ['log_linear', 'monotone_convex'])
+def test_update_quote_matches_fresh_curve(flows_df, interpolation):
+    curve = ZeroCurve(flows_df, QUOTES, LIQUIDACION, interpolation=interpolation)
+    curve.discount_factors
+    curve.update_quote('B', 97.5)
+    fresh = ZeroCurve(flows_df, dict(QUOTES, B=97.5), LIQUIDACION, interpolation=interpolation)
+    assert np.allclose(curve.node_logs, fresh.node_logs, atol=1e-10)
+    assert np.allclose(curve.discount_factors, fresh.discount_factors, atol=1e-10)
+
+def test_invalid_pillar_is_replaced_by_next_valid_bond(flows_df):
+    curve = ZeroCurve(flows_df, QUOTES, LIQUIDACION)
+    curve.discount_factors
+    curve.update_quote('A2', np.nan)
+    curve.update_quote('A1', np.nan)
+    fresh = ZeroCurve(flows_df, {'A3': 101.0, 'B': 99.0, 'C': 98.0}, LIQUIDACION)
+    assert curve.pillars == ['A3', 'B', 'C']
+    assert np.allclose(curve.node_logs, fresh.node_logs, atol=1e-10)
+    assert np.allclose(curve.discount_factors, fresh.discount_factors, atol=1e-10)
+
+def test_invalid_pillar_without_replacement_resolves_later_nodes(flows_df):
+    curve = ZeroCurve(flows_df, {'A1': 100.0, 'B': 99.0, 'C': 98.0}, LIQUIDACION)
+    curve.discount_factors
+    curve.update_quote('A1', -1.0)
+    fresh = ZeroCurve(flows_df, {'B': 99.0, 'C': 98.0}, LIQUIDACION)
+    assert curve.pillars == ['B', 'C']
+    assert np.allclose(curve.node_logs, fresh.node_logs, atol=1e-10)
+    assert curve.price('C') == pytest.approx(98.0, abs=1e-8)
+    assert np.allclose(curve.discount_factors, fresh.discount_factors, atol=1e-10)
+
+def test_spreads_of_off_curve_bond(flows_df):
+    curve = ZeroCurve(flows_df, QUOTES, LIQUIDACION)
+    row = curve.padded.index['A3']
+    spread = curve.z_spread('A3')
+    shifted = curve.flows.amounts[row] * curve.discount_factors[row] * np.exp(-spread * curve.flows.times[row])
+    assert shifted.sum() == pytest.approx(QUOTES['A3'], abs=1e-8)
+    assert np.isfinite(curve.i_spread('A3'))
+
+def test_monotone_convex_update_only_resolves_nearby_nodes(monkeypatch):
+    vencimientos = pd.date_range('2025-07-01', '2034-01-01', freq='6MS')
+    flows_df = pd.concat([bond_flows(f'N{i}', v, 0.05 + 0.001 * i) for i, v in enumerate(vencimientos)],
+                         ignore_index=True)
+    quotes = {f'N{i}': 100.0 - 0.3 * i for i in range(len(vencimientos))}
+    curve = ZeroCurve(flows_df, quotes, LIQUIDACION, interpolation='monotone_convex')
+
+    solved = []
+    original = ZeroCurve._solve_node
+    monkeypatch.setattr(ZeroCurve, '_solve_node', lambda self, k, full: solved.append(k) or original(self, k, full))
+    curve.update_quote('N14', 94.0)
+    assert min(solved) >= 10
+    monkeypatch.undo()
+    fresh = ZeroCurve(flows_df, dict(quotes, N14=94.0), LIQUIDACION, interpolation='monotone_convex')
+    assert np.allclose(curve.node_logs, fresh.node_logs, atol=1e-10)
+
+def test_z_spread_is_bracketed_for_distressed_prices(flows_df):
+    curve = ZeroCurve(flows_df, QUOTES, LIQUIDACION)
+    row = curve.padded.index['C']
+    for price in (5.0, 150.0):
+        spread = curve.z_spread('C', price)
+        shifted = curve.flows.amounts[row] * curve.discount_factors[row] * np.exp(-spread * curve.flows.times[row])
+        assert shifted.sum() == pytest.approx(price, abs=1e-8)
+    assert np.isfinite(curve.z_spread('C', 1e6))
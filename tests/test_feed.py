@@ -0,0 +1,28 @@
+"""Feed de cotizaciones: última cotización por bono y revaluación"""
+import asyncio
+import datetime
+
+import numpy as np
+
+from bonos.feed import Quote, QuoteFeed, replay_source
+
+LIQUIDACION = datetime.date(2025, 6, 2)
+
+
+def test_feed_keeps_last_quote_per_bond(store, tmp_path):
+    bono = store.nombres[0]
+    path = tmp_path / 'ticks.csv'
+    path.write_text(f"{bono};90\n{bono};91\nNO EXISTE;90\n", encoding='utf-8')
+
+    async def run():
+        feed = QuoteFeed(store, LIQUIDACION)
+        async for quote in replay_source(str(path)):
+            feed.push(quote)
+        return feed, dict(feed._pending)
+
+    feed, pending = asyncio.run(run())
+    assert feed.recibidas == 3
+    assert pending[bono].precio == 91.0
+    result = feed.price(Quote(bono, 91.0, None, 0.0))
+    assert result.error is None and np.isfinite(result.analytics.tir)
+    assert feed.price(pending['NO EXISTE']).error == "Bono desconocido"
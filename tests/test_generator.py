@@ -0,0 +1,56 @@
+"""Flujos generados desde condiciones de emisión"""
+import datetime
+
+import numpy as np
+import pytest
+
+from bonos.generator import IssueTerms, generate_flows, load_terms
+
+
+def test_generated_flows():
+    d = datetime.date
+    bullet = generate_flows(IssueTerms('B', d(2024, 1, 15), d(2027, 1, 15), 0.08))
+    assert bullet.fechas[0] == np.datetime64('2024-01-15', 'D').astype(np.int64)
+    assert bullet.pago_capital_porcentaje.sum() == pytest.approx(100.0)
+    assert len(bullet.fechas) == 7
+
+    lineal = generate_flows(IssueTerms('L', d(2024, 1, 15), d(2027, 1, 15), 0.08, amortizacion='lineal', cuotas=4))
+    assert lineal.pago_capital_porcentaje[-4:] == pytest.approx([25.0] * 4)
+    # Cupón sobre el capital residual: el último paga sobre 25
+    years = (lineal.fechas[-1] - lineal.fechas[-2]) / 365.0
+    assert lineal.cupon_porcentaje[-1] == pytest.approx(0.08 * 25.0 * years)
+
+    with pytest.raises(ValueError):
+        generate_flows(IssueTerms('X', d(2024, 1, 15), d(2023, 1, 15), 0.08))
+
+def test_first_coupon_off_the_regular_grid():
+    d = datetime.date
+    day = lambda *args: np.datetime64(d(*args), 'D').astype(np.int64)
+    # Primer cupón corto fuera de la grilla: la grilla sigue desde él y cierra con un período corto
+    short = generate_flows(IssueTerms('S', d(2024, 1, 15), d(2025, 6, 30), 0.08, primer_cupon=d(2024, 3, 10)))
+    assert list(short.fechas[1:]) == [day(2024, 3, 10), day(2024, 9, 10), day(2025, 3, 10), day(2025, 6, 30)]
+    assert short.cupon_porcentaje[1] == pytest.approx(0.08 * 100.0 * 55 / 365.0)
+
+    # Con stub final largo el último período absorbe el resto
+    long = generate_flows(IssueTerms('L', d(2024, 1, 15), d(2025, 6, 30), 0.08, stub='largo_final',
+                                     primer_cupon=d(2024, 9, 10)))
+    assert list(long.fechas[1:]) == [day(2024, 9, 10), day(2025, 6, 30)]
+
+    with pytest.raises(ValueError):
+        generate_flows(IssueTerms('X', d(2024, 1, 15), d(2025, 6, 30), 0.08, primer_cupon=d(2024, 1, 1)))
+
+def test_load_terms_snapshot(tmp_path):
+    path = tmp_path / 'condiciones.csv'
+    path.write_text("nombre_bono;emision;vencimiento;tasa_cupon;amortizacion;cuotas\n"
+                    "A;2024-01-15;2027-01-15;0,08;bullet;\nB;2024-03-01;2030-03-01;0,05;lineal;6\n",
+                    encoding='utf-8')
+    store = load_terms(str(path))
+    assert store.nombres == ['A', 'B']
+
+    # Un bono se genera solo; el snapshot se escribe al armar el store completo
+    assert len(store.bond_flows('B').fechas) == 13
+    assert 'fechas' not in vars(store) and load_terms(str(path)).sha1 == store.sha1
+    assert len(store.to_frame()) == 7 + 13
+    reopened = load_terms(str(path))
+    assert isinstance(reopened.fechas, np.memmap)
+    assert np.array_equal(reopened.flujo_total, store.flujo_total)
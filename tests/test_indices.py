@@ -0,0 +1,107 @@
+"""Índices: lectura de la especificación, fijaciones con caché y proyección de bonos CER y variables"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.batch import PaddedFlows, price_universe
+from bonos.generator import IssueTerms, store_from_terms
+from bonos.indices import IndexSeries, IndexSet, load_indices, parse_index_spec, project_store
+from bonos.schedule import BondSchedule, day_number
+from bonos.timeseries import bond_series
+
+
+def days(start, end):
+    return np.arange(day_number(start), day_number(end) + 1)
+
+@pytest.fixture
+def indices():
+    """CER creciendo 0,1% diario y BADLAR que pasa de 30% a 40% el 2025-01-01"""
+    cer_days = days('2023-06-01', '2026-12-31')
+    cer = IndexSeries('CER', cer_days, 100.0 * 1.001 ** np.arange(len(cer_days)), 'nivel')
+    badlar = IndexSeries('BADLAR', [day_number('2023-06-01'), day_number('2025-01-01')], [0.30, 0.40], 'tasa')
+    return IndexSet([cer, badlar])
+
+def issue(**options):
+    d = datetime.date
+    return IssueTerms('X', d(2024, 1, 1), d(2026, 1, 1), 0.04, periodicidad=2, **options)
+
+
+def test_parse_index_spec():
+    spec = parse_index_spec('BADLAR+5;piso=20;techo=60;rezago=5;promedio=0')
+    assert spec.indice == 'BADLAR'
+    assert spec.margen == pytest.approx(0.05)
+    assert (spec.piso, spec.techo) == pytest.approx((0.20, 0.60))
+    assert (spec.rezago, spec.promedio) == (5, False)
+    assert parse_index_spec('TAMAR-1,5').margen == pytest.approx(-0.015)
+    assert parse_index_spec('') is None
+    with pytest.raises(ValueError):
+        parse_index_spec('BADLAR;tope=3')
+
+def test_fixings_are_cached(indices):
+    start = days('2024-01-01', '2024-01-10')
+    first = indices.fixings('CER', start)
+    assert indices.cache_info()[:2] == (0, len(start))
+    assert np.array_equal(indices.fixings('CER', start), first)
+    assert indices.cache_info()[:2] == (len(start), len(start))
+    assert first == pytest.approx(100.0 * 1.001 ** (start - day_number('2023-06-01')))
+
+def test_cer_projection(indices):
+    store = store_from_terms([issue(indice='CER')])
+    projected, errores = project_store(store, indices)
+    assert errores == {}
+    fechas = np.asarray(store.fechas)
+    lagged = indices.lagged(fechas, 10)
+    factor = 1.001 ** (lagged - lagged[0])
+    assert np.allclose(projected.cupon_porcentaje, np.asarray(store.cupon_porcentaje) * factor)
+    assert np.allclose(projected.pago_capital_porcentaje, np.asarray(store.pago_capital_porcentaje) * factor)
+    assert projected.sha1 is None or '|' in projected.sha1
+
+def test_cer_parity_uses_adjusted_residual(indices):
+    # Amortiza 50 nominal el 2025-07-01: al 2025-09-15 queda 50 nominal ajustado por CER
+    store = store_from_terms([issue(indice='CER', amortizacion='lineal', cuotas=2)])
+    projected, _ = project_store(store, indices)
+    settlement, last_coupon, price = day_number('2025-09-15'), day_number('2025-07-01'), 80.0
+    lagged = indices.lagged([day_number('2024-01-01'), settlement], 10)
+    coefficient = 1.001 ** (lagged[1] - lagged[0])
+    residual = 50.0 * coefficient
+    accrued = 0.04 * residual * (settlement - last_coupon) / 365.0
+    parity = (price - accrued) / (residual + accrued)
+    assert coefficient > 1.5
+
+    quotes = pd.DataFrame({'nombre_bono': ['X'], 'fecha_liquidacion': ['2025-09-15'], 'precio': [price]})
+    result = price_universe(PaddedFlows(projected.to_frame(), projected.ajuste), quotes).iloc[0]
+    assert result['capital_residual'] == pytest.approx(residual)
+    assert result['intereses_corridos'] == pytest.approx(accrued)
+    assert result['paridad'] == pytest.approx(parity)
+
+    schedule = BondSchedule.from_store(projected, 'X')
+    assert schedule.amortizacion[-1] == pytest.approx(100.0)
+    assert schedule.state(settlement).capital_residual == pytest.approx(residual)
+    assert schedule.accrued_interest(settlement, 'ACT/365') == pytest.approx(accrued)
+    series = bond_series(projected, 'X', '2025-09-15', '2025-09-15', price)
+    assert series['paridad'].iloc[0] == pytest.approx(parity)
+
+def test_floating_rate_projection_with_floor_and_cap(indices):
+    store = store_from_terms([issue(indice='BADLAR+5;techo=42;rezago=0;promedio=0')])
+    projected, _ = project_store(store, indices)
+    fechas = np.asarray(store.fechas)
+    rate = np.where(fechas[:-1] >= day_number('2025-01-01'), 0.42, 0.35)
+    years = np.diff(fechas) / 365.0
+    assert np.allclose(projected.tasa_cupon[1:], rate)
+    assert np.allclose(projected.cupon_porcentaje[1:], rate * 100.0 * years)
+
+def test_projection_errors_keep_sheet_flows(indices):
+    store = store_from_terms([issue(indice='UVA')])
+    projected, errores = project_store(store, indices)
+    assert list(errores) == ['X']
+    assert np.array_equal(projected.cupon_porcentaje, store.cupon_porcentaje)
+
+def test_load_indices_csv(tmp_path):
+    path = tmp_path / 'indices.csv'
+    path.write_text("indice;fecha;valor\nCER;2024-01-01;100\nCER;2024-01-03;101\nBADLAR;2024-01-01;35,5\n",
+                    encoding='utf-8')
+    indices = load_indices(str(path))
+    assert indices.series['CER'].values_at(days('2024-01-01', '2024-01-03')) == pytest.approx([100, 100, 101])
+    assert indices.series['BADLAR'].values_at([day_number('2024-02-01')]) == pytest.approx([0.355])
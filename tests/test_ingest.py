@@ -0,0 +1,34 @@
+"""Ingesta por bloques de CSV al store compilado"""
+import shutil
+
+import pytest
+
+from bonos.ingest import ingest_file
+from bonos.store import load_store, snapshot_dir
+
+
+def test_csv_ingest(tmp_path):
+    path = tmp_path / 'ejemplo.csv'
+    shutil.copy('bonos_irregulares_ejemplo.csv', path)
+    store, report = ingest_file(str(path))
+    frame = store.to_frame()
+    assert report.filas == report.validas == len(frame)
+    assert set(frame['nombre_bono']) == set(store.nombres)
+    # Cada bono queda ordenado por fecha y con la tasa de cupón inferida
+    for bono, group in frame.groupby('nombre_bono'):
+        assert group['fecha'].is_monotonic_increasing
+    assert (frame.loc[frame['cupon_porcentaje'] > 0, 'tasa_cupon'] > 0).all()
+    assert load_store(str(path)).nombres == store.nombres
+
+def test_merged_store_keeps_file_snapshot(store, tmp_path):
+    path = tmp_path / 'ejemplo.csv'
+    shutil.copy('bonos_irregulares_ejemplo.csv', path)
+    with pytest.raises(ValueError):
+        ingest_file(str(path), store=store)
+    with pytest.raises(ValueError):
+        ingest_file(str(path), snapshot_dir(str(path)), store=store)
+
+    merged, _ = ingest_file(str(path), str(tmp_path / 'universo'), store=store)
+    alone = load_store(str(path))
+    assert merged.nombres[:len(store)] == store.nombres
+    assert set(alone.nombres) == set(merged.nombres) - set(store.nombres)
@@ -0,0 +1,24 @@
+"""Duraciones por plazo clave"""
+import numpy as np
+
+from bonos.batch import PaddedFlows, QuoteFlows, price_universe, read_quotes
+from bonos.krd import key_rate_durations, tenor_weights
+
+
+def test_key_rate_durations_sum_and_bump(store, quotes):
+    flows_df = store.to_frame()
+    krd = key_rate_durations(flows_df, quotes)
+    batch = price_universe(flows_df, quotes)
+    assert np.allclose(krd['krd_total'], batch['duracion_macaulay'])
+    assert np.allclose(key_rate_durations(flows_df, quotes, dv01=True)['dv01_total'], batch['pv01'])
+
+    # Contra un shock chico de la tasa continua con la forma del peso de cada plazo
+    padded = PaddedFlows(flows_df)
+    bonos, settlement, _ = read_quotes(quotes, 'precio')
+    flows = QuoteFlows(padded, bonos, settlement)
+    rate = np.log1p(batch['tir'].to_numpy())[:, None]
+    weights = tenor_weights(flows.times, (0.5, 1.0, 2.0, 5.0, 10.0))
+    base = (flows.amounts * np.exp(-flows.times * rate)).sum(axis=1)
+    for k, column in enumerate(['krd_6m', 'krd_1a', 'krd_2a', 'krd_5a', 'krd_10a']):
+        bumped = (flows.amounts * np.exp(-flows.times * (rate + 1e-6 * weights[..., k]))).sum(axis=1)
+        assert np.allclose(-(bumped - base) / 1e-6 / base, krd[column], atol=1e-5)
@@ -0,0 +1,31 @@
+"""Riesgo de carteras y escalera de flujos"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.batch import price_universe
+from bonos.portfolio import Portfolio
+
+LIQUIDACION = '2025-06-02'
+
+
+def test_portfolio_weights_and_ladder(store, quotes):
+    prices = dict(zip(quotes['nombre_bono'], quotes['precio']))
+    holdings = [(store.nombres[0], 1000.0), (store.nombres[1], 3000.0), (store.nombres[0], 1000.0)]
+    portfolio = Portfolio(store, holdings)
+    risk = portfolio.risk(LIQUIDACION, prices)
+    batch = price_universe(store.to_frame(), quotes).set_index('nombre_bono')
+
+    value = np.array([2000.0 * prices[store.nombres[0]], 3000.0 * prices[store.nombres[1]]]) / 100.0
+    weights = value / value.sum()
+    assert risk.valor_mercado == pytest.approx(value.sum())
+    assert risk.duracion_modificada == pytest.approx(
+        np.dot(weights, batch.loc[list(store.nombres[:2]), 'duracion_modificada']))
+    assert risk.dv01 == pytest.approx(np.dot([20.0, 30.0], batch.loc[list(store.nombres[:2]), 'dv01']))
+
+    ladder = portfolio.ladder(LIQUIDACION, 'Y')
+    frame = store.to_frame()
+    future = frame[frame['fecha'] > pd.Timestamp(LIQUIDACION)]
+    nominal = {store.nombres[0]: 20.0, store.nombres[1]: 30.0}
+    expected = sum((future.loc[future['nombre_bono'] == b, 'flujo_total'] * n).sum() for b, n in nominal.items())
+    assert ladder['flujo_total'].sum() == pytest.approx(expected)
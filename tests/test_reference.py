@@ -0,0 +1,55 @@
+"""Resultados contra el set dorado de XIRR y contra la implementación original de la calculadora"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.batch import price_from_yield_universe, price_universe
+from bonos.daycount import year_fraction
+from bonos.schedule import BondSchedule, day_to_date
+from bonos.solver import solve_ytm, solve_ytm_matrix
+
+from benchmarks import reference
+from benchmarks.golden import TOLERANCIA_GOLDEN, XIRR_GOLDEN
+from benchmarks.run import LIQUIDACION, TOLERANCIAS, loader_stages, max_errors, single_bond_stages
+
+
+@pytest.mark.parametrize('descripcion, fechas, flujos, esperado, base', XIRR_GOLDEN, ids=[g[0] for g in XIRR_GOLDEN])
+def test_xirr_golden(descripcion, fechas, flujos, esperado, base):
+    dates = np.array(fechas, dtype='datetime64[D]')
+    times = year_fraction(dates[0], dates, base)
+    assert abs(solve_ytm(times, flujos) - esperado) < TOLERANCIA_GOLDEN
+    assert abs(solve_ytm_matrix(times[None, :], np.asarray(flujos, dtype=float)[None, :])[0] - esperado) < TOLERANCIA_GOLDEN
+
+def test_batch_and_single_bond_match_reference(universe, padded):
+    flows_df, quotes = universe
+    batch = price_universe(padded, quotes)
+    _, comparison = single_bond_stages(flows_df, quotes, 60)
+    errors = max_errors(batch, comparison)
+    for column, tolerance in TOLERANCIAS.items():
+        assert errors[column] <= tolerance, column
+        assert errors[f'{column}_bono'] <= tolerance, column
+
+def test_price_from_yield_reproduces_price(universe, padded):
+    _, quotes = universe
+    batch = price_universe(padded, quotes)
+    repriced = price_from_yield_universe(padded, quotes.assign(tir=batch['tir'].to_numpy()))
+    assert np.nanmax(np.abs(repriced['precio'] - quotes['precio'])) < 1e-6
+
+def test_schedule_functions_match_reference(universe, padded):
+    flows_df, quotes = universe
+    grouped = dict(tuple(flows_df.groupby('nombre_bono', sort=False)))
+    settlement = pd.Timestamp(LIQUIDACION).date()
+    for _, row in price_universe(padded, quotes.head(40)).iterrows():
+        bono_flows = grouped[row['nombre_bono']]
+        next_coupon = BondSchedule.from_frame(bono_flows).state(settlement).next_coupon
+        next_coupon = pd.Timestamp(day_to_date(next_coupon)) if next_coupon is not None else None
+        assert next_coupon == reference.find_next_coupon_date(bono_flows, settlement)
+        # El lote mide la vida media en ACT/365 para todos los bonos
+        assert row['vida_media'] == pytest.approx(
+            reference.calculate_average_life(bono_flows, settlement, 'ACT/365'), abs=1e-12)
+        assert row['paridad'] == reference.calculate_parity(row['precio_limpio'], row['valor_tecnico'])
+
+def test_workbook_loader_matches_reference(universe, tmp_path):
+    flows_df, _ = universe
+    _, equal = loader_stages(flows_df, str(tmp_path))
+    assert equal
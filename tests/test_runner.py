@@ -0,0 +1,74 @@
+"""Corrida en lote: particiones en paralelo, manifiesto y reanudación"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos import runner
+from bonos.batch import PaddedFlows, price_universe
+from bonos.runner import MANIFIESTO, iter_partitions, part_name, run, value_partition
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def quotes_file(store, tmp_path):
+    rng = np.random.default_rng(0)
+    n = 250
+    quotes = pd.DataFrame({
+        'nombre_bono': rng.choice(list(store.nombres) + ['NO EXISTE'], n),
+        'fecha_liquidacion': (np.datetime64('2024-06-01') + rng.integers(0, 900, n)).astype(str),
+        'precio': rng.uniform(60, 100, n).round(2),
+    })
+    path = tmp_path / 'cotizaciones.parquet'
+    quotes.to_parquet(path, index=False)
+    return str(path), quotes
+
+def test_run_matches_price_universe(workbook, store, quotes_file, tmp_path):
+    path, quotes = quotes_file
+    directory = str(tmp_path / 'salida')
+    manifest = run(path, directory, workbook, processes=2, rows=60)
+
+    assert manifest['completa'] and manifest['filas'] == len(quotes)
+    assert len(pd.read_parquet(directory)) == len(quotes)
+    results = pd.concat([pd.read_parquet(os.path.join(directory, part_name(i))) for i in range(5)], ignore_index=True)
+    assert (results['nombre_bono'] == quotes['nombre_bono']).all()
+
+    known = (quotes['nombre_bono'] != 'NO EXISTE').to_numpy()
+    expected = price_universe(store.to_frame(), quotes[known])
+    for column in ('tir', 'duracion_macaulay', 'intereses_corridos', 'paridad', 'vida_media'):
+        assert np.allclose(results.loc[known, column], expected[column], equal_nan=True), column
+    assert (results.loc[~known, 'error'] == "Bono desconocido").all()
+
+def test_resume_skips_written_partitions(workbook, quotes_file, tmp_path):
+    path, quotes = quotes_file
+    directory = str(tmp_path / 'salida')
+    run(path, directory, workbook, processes=1, rows=100)
+    complete = pd.read_parquet(directory)
+
+    # Corrida interrumpida: falta la última parte y el manifiesto no la registra
+    with open(os.path.join(directory, MANIFIESTO), encoding='utf-8') as f:
+        manifest = json.load(f)
+    os.remove(os.path.join(directory, part_name(2)))
+    written = os.path.getmtime(os.path.join(directory, part_name(0)))
+
+    with pytest.raises(SystemExit):
+        run(path, directory, workbook, processes=1, rows=100)
+    with pytest.raises(SystemExit):
+        run(path, directory, workbook, processes=1, rows=50, resume=True)
+
+    resumed = run(path, directory, workbook, processes=1, rows=100, resume=True)
+    assert sorted(resumed['partes']) == sorted(manifest['partes'])
+    assert os.path.getmtime(os.path.join(directory, part_name(0))) == written
+    assert pd.read_parquet(directory).equals(complete)
+
+def test_partition_is_valued_in_blocks(store, quotes_file, monkeypatch):
+    path, _ = quotes_file
+    padded = PaddedFlows(store.to_frame())
+    quotes = next(iter_partitions(path, 1000))
+    whole = value_partition(padded, quotes)
+    # Bloques de pocas cotizaciones: mismo resultado fila por fila
+    monkeypatch.setattr(runner, 'ELEMENTOS_POR_BLOQUE', 7 * padded.dates.shape[1])
+    assert value_partition(padded, quotes).equals(whole)
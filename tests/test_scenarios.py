@@ -0,0 +1,16 @@
+"""Cubo de escenarios de tasa y fecha"""
+import numpy as np
+
+from bonos.batch import price_from_yield_universe, price_universe
+from bonos.scenarios import scenario_cube
+
+LIQUIDACION = '2025-06-02'
+
+
+def test_scenario_cube_matches_price_from_yield(store, quotes):
+    flows_df = store.to_frame()
+    yields = price_universe(flows_df, quotes)['tir'].to_numpy()
+    cube = scenario_cube(flows_df, dict(zip(store.nombres, yields)), [-100, 0, 100], [LIQUIDACION], max_workers=1)
+    for j, shock in enumerate([-0.01, 0.0, 0.01]):
+        expected = price_from_yield_universe(flows_df, quotes.assign(tir=yields + shock))['precio']
+        assert np.allclose(cube.precios[:, 0, j], expected, rtol=1e-6)
@@ -0,0 +1,56 @@
+"""Servicio de valuación: lotes por ventana, bonos desconocidos y salud"""
+import asyncio
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonos.batch import price_universe
+from bonos.service import PricingService
+
+LIQUIDACION = datetime.date(2025, 6, 2)
+
+
+def test_service_batches_requests(store):
+    service = PricingService(store, LIQUIDACION, window=0.01)
+    bono = store.nombres[0]
+
+    async def run():
+        requests = [service.dispatch('POST', '/tir', json.dumps({'bono': bono, 'precio': 90 + i}).encode())
+                    for i in range(5)]
+        requests.append(service.dispatch('POST', '/analisis', json.dumps([{'bono': 'NO EXISTE', 'precio': 90}]).encode()))
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(run())
+    assert all(status == 200 for status, _ in responses)
+    quotes = pd.DataFrame({'nombre_bono': bono, 'fecha_liquidacion': LIQUIDACION, 'precio': 90.0 + np.arange(5)})
+    expected = price_universe(store.to_frame(), quotes)['tir']
+    assert [payload['tir'] for _, payload in responses[:5]] == pytest.approx(expected.tolist())
+    assert responses[5][1] == [{'bono': 'NO EXISTE', 'error': "Bono desconocido"}]
+
+    status, health = asyncio.run(service.dispatch('GET', '/salud', b''))
+    assert (status, health['bonos']) == (200, len(store))
+
+def test_bad_item_fails_only_its_request(store):
+    service = PricingService(store, LIQUIDACION, window=0.01)
+    bono = store.nombres[0]
+    original = service.solve
+
+    def solve(items, value_key):
+        if any(value == 13 for _, _, value in items):
+            raise RuntimeError("ítem inválido")
+        return original(items, value_key)
+
+    service.yields.solve = lambda items: solve(items, 'precio')
+
+    async def run():
+        requests = [service.dispatch('POST', '/tir', json.dumps({'bono': bono, 'precio': precio}).encode())
+                    for precio in (90, 13, 'NaN')]
+        return await asyncio.gather(*requests, return_exceptions=True)
+
+    good, bad, nan = asyncio.run(run())
+    assert good[0] == 200 and good[1]['tir'] is not None
+    assert isinstance(bad, RuntimeError)
+    assert nan == (200, {'bono': bono, 'error': "Valor o fecha inválidos"})
@@ -0,0 +1,34 @@
+"""Store compilado: snapshot y reescritura con lectores abiertos"""
+import os
+import shutil
+
+import numpy as np
+
+from bonos.store import FlowStore, load_store, parse_bond_types, parse_flows, read_raw_workbook, snapshot_dir
+
+
+def test_snapshot_matches_workbook(workbook, store):
+    raw = read_raw_workbook(workbook)
+    parsed = parse_flows(raw)
+    reopened = load_store(workbook)
+    assert isinstance(reopened.fechas, np.memmap)
+    assert reopened.nombres == store.nombres
+    assert np.allclose(reopened.to_frame()['flujo_total'].to_numpy(), store.to_frame()['flujo_total'].to_numpy())
+    assert len(reopened.to_frame()) == len(parsed)
+    assert reopened.tipos_disponibles == parse_bond_types(raw)
+
+def test_save_keeps_open_snapshot_readable(tmp_path):
+    path = tmp_path / 'bonos_flujos.xlsx'
+    shutil.copy('bonos_flujos.xlsx', path)
+    load_store(str(path))
+    opened = load_store(str(path))
+    fechas = np.array(opened.fechas)
+    offsets = opened.offsets.copy()
+
+    # Otro proceso regenera el snapshot con menos filas: el store abierto sigue leyendo el anterior
+    frame = opened.to_frame()
+    shorter = FlowStore.from_frame(frame[frame['nombre_bono'] == opened.nombres[0]], opened.tipos_disponibles)
+    shorter.save(snapshot_dir(str(path)), {'version': 0})
+    assert np.array_equal(np.array(opened.fechas), fechas)
+    assert np.array_equal(opened.offsets, offsets)
+    assert not any(name.endswith('.tmp') for name in os.listdir(snapshot_dir(str(path))))
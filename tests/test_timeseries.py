@@ -0,0 +1,15 @@
+"""Series diarias de TIR, duraciones y paridad"""
+import numpy as np
+import pandas as pd
+
+from bonos.batch import price_universe
+from bonos.timeseries import bond_series
+
+
+def test_bond_series_matches_batch(store):
+    bono = store.nombres[0]
+    series = bond_series(store, bono, '2025-06-02', '2025-06-13', 95.0)
+    quotes = pd.DataFrame({'nombre_bono': bono, 'fecha_liquidacion': series['fecha_liquidacion'], 'precio': 95.0})
+    batch = price_universe(store.to_frame(), quotes)
+    for column in ('tir', 'duracion_macaulay', 'intereses_corridos', 'capital_residual', 'paridad', 'vida_media'):
+        assert np.allclose(series[column], batch[column], equal_nan=True), column